@@ -1,7 +1,12 @@
 import customtkinter as ctk
 import os
 from PIL import Image
-from dct import jpg_compression
+from dct.color import is_gray
+from dct.preview import CompressionPreview
+from dct.stats import CompressionStats
+from dct.thumbnail import thumbnail_scale
+from dct.worker import CompressionJob, CompressionWorker
+from dct.jpeg import BLOCK_SIZE, encode_jpeg
 from io import BytesIO
 import math
 
@@ -234,8 +239,20 @@ class HomePage(ctk.CTkFrame):
 
 
 class ImageViewerPage(ctk.CTkFrame):
+    # Chroma subsampling of color images
+    SUBSAMPLING = "4:2:0"
+    # Fastest DCT backend on this machine, see dct.backends
+    BACKEND = "auto"
+    # Delay after the last movement of the slider before compressing again
+    DEBOUNCE_MS = 30
+    # Interval between two checks of the progress of the compression
+    POLL_MS = 50
+    # Width of the displayed images
+    DISPLAY_WIDTH = 500
+
     def __init__(self, parent, controller):
         super().__init__(parent)
+        self.controller = controller
         self.filename = ""
 
         # Back to home page button
@@ -244,7 +261,7 @@ class ImageViewerPage(ctk.CTkFrame):
             text="← Go Back",
             width=140,
             height=28,
-            command=lambda: controller.switch_to_page("HomePage"),
+            command=self._go_back,
         )
         go_back_button.place(relx=0.02, rely=0.02, anchor="nw")
 
@@ -269,6 +286,35 @@ class ImageViewerPage(ctk.CTkFrame):
         self.compressed_image_label = ctk.CTkLabel(frame, text="")
         self.compressed_image_label.grid(row=0, column=1, padx=20, pady=10)
 
+        # Slider to change d, with its current value
+        slider_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        slider_frame.grid(row=1, column=0, columnspan=2, pady=10)
+
+        self.d_label = ctk.CTkLabel(
+            slider_frame, text="d =", width=80, font=("Roboto", 16)
+        )
+        self.d_label.grid(row=0, column=0, padx=10)
+
+        self.d_slider = ctk.CTkSlider(
+            slider_frame, width=500, command=self._on_d_changed
+        )
+        self.d_slider.grid(row=0, column=1, padx=10)
+
+        # Progress of the compression, which can be cancelled
+        self.progress_bar = ctk.CTkProgressBar(slider_frame, width=500)
+        self.progress_bar.grid(row=1, column=1, padx=10, pady=10)
+        self.progress_bar.set(0)
+
+        self.cancel_button = ctk.CTkButton(
+            slider_frame,
+            text="Cancel",
+            width=80,
+            height=28,
+            state="disabled",
+            command=self.cancel_job,
+        )
+        self.cancel_button.grid(row=1, column=0, padx=10, pady=10)
+
         # Info about the image and params
         self.info_label = ctk.CTkLabel(
             self,
@@ -279,59 +325,194 @@ class ImageViewerPage(ctk.CTkFrame):
         )
         self.info_label.place(relx=0.5, rely=0.98, anchor="s")
 
+        # Callback of the last slider movement, not yet run
+        self._pending_update = None
+
+        # Compression runs on a background thread, its progress is polled
+        self.worker = CompressionWorker()
+        self.job = None
+        self._polling = False
+        self.preview = None
+        self.result = None
+
     def set_image(self, image, f, d):
         # Save image path as class attribute to set default
         # name for compressed image when saving it
         self.image_path = image
+        self.f = f
 
-        # Open image with PIL
-        img = Image.open(image)
-        # Some test images have 3 channels even though they are gray scale
-        # forcing a conversion to gray scale removes superfluous channels
-        img = img.convert("L")
-        width, height = img.size
+        # d goes from 0 to 2F - 2, one step for each value
+        self._cancel_pending_update()
+        max_d = max(2 * f - 2, 1)
+        self.d_slider.configure(from_=0, to=max_d, number_of_steps=max_d)
+        self.d_slider.set(d)
+        self.d_label.configure(text=f"d = {d}")
 
-        # Compress image
-        self.compressed_image = jpg_compression(img, f, d)
+        # The coefficients of the previous image can't be used anymore
+        self.preview = None
+        self.result = None
 
-        # Print info on screen
-        self.info_label.configure(
-            text=f"Image size: {width}x{height} \t\t"
-            + f"Params: F = {f}, d = {d} \t"
-            + f"Original size (.bmp): {self._bytes_to_string(os.path.getsize(image))} \t\t"
-            + f"Compressed size (.jpg): {self._bytes_to_string(self._get_image_size_in_bytes(self.compressed_image))}"
-        )
+        self._start_job(lambda job: self._open_and_compress(job, image, f, d))
 
-        # Resize images
-        max_img_width = 500
-        scale_factor = max_img_width / width
+    def _on_d_changed(self, value):
+        d = int(round(value))
+        self.d_label.configure(text=f"d = {d}")
 
-        resized_img = img.resize(
-            (math.floor(width * scale_factor), math.floor(height * scale_factor)),
-            Image.NEAREST,
+        # Only compress again once the slider stops for a moment
+        self._cancel_pending_update()
+        self._pending_update = self.after(
+            self.DEBOUNCE_MS, lambda: self.update_compressed_image(d)
         )
 
-        resized_compressed_image = self.compressed_image.resize(
-            (math.floor(width * scale_factor), math.floor(height * scale_factor)),
-            Image.NEAREST,
-        )
+    def _cancel_pending_update(self):
+        if self._pending_update is not None:
+            self.after_cancel(self._pending_update)
+            self._pending_update = None
 
-        ctk_img = ctk.CTkImage(
-            light_image=resized_img, dark_image=resized_img, size=resized_img.size
-        )
+    def update_compressed_image(self, d):
+        self._pending_update = None
+
+        # Without the coefficients of the image, compress it from the start
+        if self.preview is None:
+            image, f = self.image_path, self.f
+            self._start_job(lambda job: self._open_and_compress(job, image, f, d))
+        else:
+            preview = self.preview
+            self._start_job(lambda job: self._compress(job, preview, d, 0.0))
+
+    def _start_job(self, func):
+        # The new job supersedes the running one
+        self.job = self.worker.submit(CompressionJob(func))
+        self.progress_bar.set(0)
+        self.cancel_button.configure(state="normal")
+        if not self._polling:
+            self._polling = True
+            self.after(self.POLL_MS, self._poll_job)
+
+    def cancel_job(self):
+        self._cancel_pending_update()
+        self.worker.cancel()
+
+    def _go_back(self):
+        self.cancel_job()
+        self.controller.switch_to_page("HomePage")
+
+    def _poll_job(self):
+        job = self.job
+        self.progress_bar.set(job.progress)
+
+        if job.done or job.cancelled:
+            self._polling = False
+            self.cancel_button.configure(state="disabled")
+            self._finish_job(job)
+        else:
+            self.after(self.POLL_MS, self._poll_job)
+
+    def _finish_job(self, job):
+        if job.cancelled:
+            self.info_label.configure(text="Compression cancelled.")
+            return
+        if job.error is not None:
+            self.info_label.configure(text=f"ERROR: {job.error}")
+            return
+
+        result = job.result
+        if result["preview"] is not self.preview:
+            # First compression of the image: display original image
+            self.preview = result["preview"]
+            resized_img = self._resize(self.preview.image)
+            ctk_img = ctk.CTkImage(
+                light_image=resized_img, dark_image=resized_img, size=resized_img.size
+            )
+            self.original_image_label.configure(image=ctk_img)
+
+        self.result = result
+
+        # Display compressed image
+        resized_compressed_image = self._resize(result["thumbnail"])
         ctk_compressed_img = ctk.CTkImage(
             light_image=resized_compressed_image,
             dark_image=resized_compressed_image,
             size=resized_compressed_image.size,
         )
+        self.compressed_image_label.configure(image=ctk_compressed_img)
 
-        # Display original image
-        self.original_image_label.configure(image=ctk_img)
+        # Print info on screen
+        width, height = self.preview.image.size
+        throughput = width * height / 1e6 / job.elapsed
+        self.info_label.configure(
+            text=f"Image size: {width}x{height} \t\t"
+            + f"Params: F = {self.f}, d = {result['d']} \t"
+            + f"Original size (.bmp): {self._bytes_to_string(os.path.getsize(self.image_path))} \t\t"
+            + f"Compressed size (.jpg): {self._bytes_to_string(len(result['jpeg_data']))} \t\t"
+            + f"Time: {job.elapsed:.2f} s ({throughput:.1f} MP/s)\n"
+            + f"Stages: {result['stats']}"
+        )
 
-        # Display compressed image
-        self.compressed_image_label.configure(image=ctk_compressed_img)
+    # The methods below run on the worker thread, they must not touch the widgets
+
+    def _open_and_compress(self, job, image, f, d):
+        # Open image with PIL
+        img = Image.open(image).convert("RGB")
+        # Some test images have 3 channels even though they are gray scale
+        # a conversion to gray scale removes superfluous channels
+        if is_gray(img):
+            img = img.convert("L")
+
+        # Keep the pixels and the DCT coefficients of the blocks, so that
+        # changing d only needs the inverse DCT. The memory tracing stops
+        # even if the job is cancelled while the preview is built
+        with CompressionStats(memory=True) as stats:
+            preview = CompressionPreview(
+                img,
+                f,
+                subsampling=self.SUBSAMPLING,
+                backend=self.BACKEND,
+                progress=job.stage(0.0, 0.5),
+                stats=stats,
+            )
+            return self._compress(job, preview, d, 0.5, stats)
+
+    def _compress(self, job, preview, d, start, stats=None):
+        # Time and memory of each stage, shown with the other info
+        if stats is None:
+            stats = CompressionStats(memory=True)
+
+        try:
+            # The displayed image is downscaled, so it is decoded from the low
+            # frequencies of the blocks only, at about the display width
+            k = thumbnail_scale(preview.f, preview.image.size[0], self.DISPLAY_WIDTH)
+            thumbnail = preview.thumbnail(d, k, stats=stats)
+            jpeg_data = self._encode_jpeg(
+                preview, d, progress=job.stage(start, 0.9), stats=stats
+            )
+        finally:
+            stats.stop()
+
+        return {
+            "preview": preview,
+            "d": d,
+            "thumbnail": thumbnail,
+            "jpeg_data": jpeg_data,
+            "stats": stats,
+        }
+
+    def _resize(self, img):
+        # Resize images
+        max_img_width = self.DISPLAY_WIDTH
+        width, height = img.size
+        scale_factor = max_img_width / width
+
+        return img.resize(
+            (math.floor(width * scale_factor), math.floor(height * scale_factor)),
+            Image.NEAREST,
+        )
 
     def save_image(self):
+        # Nothing to save until the first compression is done
+        if self.result is None:
+            return
+
         # Open file browser to save image
         path = ctk.filedialog.asksaveasfilename(
             defaultextension=".jpg",
@@ -341,15 +522,27 @@ class ImageViewerPage(ctk.CTkFrame):
         )
         # If user selected a path to save image to
         if path:
-            self.compressed_image.save(
-                path, "JPEG", quality=100, subsampling=0, optimize=True
+            with open(path, "wb") as file:
+                file.write(self.result["jpeg_data"])
+
+    def _encode_jpeg(self, preview, d, progress, stats):
+        # With 8x8 blocks the DCT coefficients are written directly, the
+        # compressed image is never decoded at full size
+        if not preview.color and preview.f == BLOCK_SIZE:
+            with stats.stage("encode_jpeg"):
+                return encode_jpeg(preview.coefficients(d))
+
+        # Other block sizes and color images can't be stored in a JPEG file
+        # this way, let PIL encode the compressed pixels with the same chroma
+        # subsampling used for the compression
+        compressed_image = preview.compress(d, progress=progress, stats=stats)
+        subsampling = self.SUBSAMPLING if preview.color else 0
+        with stats.stage("encode_jpeg"):
+            buffer = BytesIO()
+            compressed_image.save(
+                buffer, "JPEG", quality=100, subsampling=subsampling, optimize=True
             )
-
-    def _get_image_size_in_bytes(self, img, format="JPEG"):
-        buffer = BytesIO()
-        # Simulate saving file to get its size
-        img.save(buffer, format=format)
-        return len(buffer.getvalue())
+            return buffer.getvalue()
 
     def _bytes_to_string(self, bytes):
         if bytes > 1e6:
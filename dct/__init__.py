@@ -1,4 +1,43 @@
-from .dct1D import dct_1D, idct_1D, build_dct_orthobasis
+from .dct1D import (
+    dct_1D,
+    idct_1D,
+    build_dct_orthobasis,
+    DCTPlan,
+    get_dct_plan,
+    dct_plan_cache_info,
+    clear_dct_plan_cache,
+)
 from .dct2D import dct_2D, idct_2D
-from .image_compress import jpg_compression
-
+from .fast_dct import fast_dct_1D, fast_idct_1D, fast_dct_2D, fast_idct_2D
+from .butterfly import aan_dct_8x8, aan_idct_8x8, islow_dct_8x8, islow_idct_8x8
+from .truncated import triangle_indices, truncated_dct_2D, truncated_idct_2D
+from .backends import (
+    register_backend,
+    available_backends,
+    get_backend,
+    select_backend,
+)
+from .image_compress import jpg_compression, compute_coefficients, reconstruct_image
+from .color import color_jpg_compression, is_gray
+from .jpeg import encode_jpeg, save_jpeg, progressive_prefix, compress_to_jpeg
+from .streaming import compress_bmp_file
+from .sweep import rd_sweep
+from .metrics import (
+    mse,
+    psnr,
+    block_ssim,
+    estimate_mse,
+    estimate_psnr,
+    estimate_block_ssim,
+    compression_metrics,
+)
+from .adaptive import (
+    adaptive_jpg_compression,
+    adaptive_coefficients,
+    select_block_d,
+    diagonal_energies,
+)
+from .preview import CompressionPreview
+from .thumbnail import thumbnail_blocks, thumbnail_from_coefficients, thumbnail_scale
+from .worker import CompressionJob, CompressionWorker, JobCancelled
+from .stats import CompressionStats
@@ -0,0 +1,319 @@
+"""
+Command line tool compressing batches of images to JPEG files.
+
+Example:
+    python -m dct "photos/**/*.bmp" -F 8 -d 6 -o compressed/
+
+A JSON object is printed on a line for each file, followed by a summary line
+with the totals of the batch. With --stats the record of each file also has
+the time (and with --stats memory the peak allocation) of each stage.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+from .color import SUBSAMPLING
+from .jpeg import compress_to_jpeg
+from .stats import NO_STATS, CompressionStats
+
+# File of the output directory recording the parameters of each output
+MANIFEST_NAME = ".compressit.json"
+
+
+def _quality_to_d(f, quality):
+    """
+    Maps a quality in [1, 100] to the parameter d, 100 keeping all the
+    2F - 1 diagonals of coefficients.
+    """
+    return math.ceil(quality / 100 * (2 * f - 1))
+
+
+def _compress_file(src, dst, f, d, subsampling, progressive, backend, stats=None):
+    """
+    Compresses the image at path src to the JPEG file dst.
+
+    Args:
+        stats (str, optional): "time" or "memory" to add the statistics of
+                                each stage to the record, see --stats.
+
+    Returns:
+        record (dict): statistics of the compression of the file.
+    """
+    collector = NO_STATS
+    if stats is not None:
+        collector = CompressionStats(memory=stats == "memory")
+
+    start = time.perf_counter()
+    try:
+        with Image.open(src) as image:
+            width, height = image.size
+            data = compress_to_jpeg(
+                image, f, d, subsampling, progressive, backend, collector
+            )
+
+        # Write to a temporary file first, so an interrupted run never leaves
+        # a truncated output that looks up to date
+        with collector.stage("write"):
+            tmp = dst + ".tmp"
+            with open(tmp, "wb") as file:
+                file.write(data)
+            os.replace(tmp, dst)
+    finally:
+        if stats is not None:
+            collector.stop()
+    seconds = time.perf_counter() - start
+
+    megapixels = width * height / 1e6
+    record = {
+        "status": "ok",
+        "input": src,
+        "output": dst,
+        "width": width,
+        "height": height,
+        "megapixels": megapixels,
+        "seconds": seconds,
+        "mp_per_s": megapixels / seconds,
+        "bytes_in": os.path.getsize(src),
+        "bytes_out": len(data),
+    }
+    if stats is not None:
+        record["stages"] = collector.as_dict()
+    return record
+
+
+def _load_manifest(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _up_to_date(src, dst, params, recorded):
+    """
+    Tells if dst exists, is newer than src and was compressed with the
+    same parameters, recorded being the ones of the manifest.
+    """
+    return (
+        recorded == params
+        and os.path.exists(dst)
+        and os.path.getmtime(dst) >= os.path.getmtime(src)
+    )
+
+
+def _glob_root(pattern):
+    """
+    Returns the directory of a glob pattern before its first wildcard, the
+    files matching it being under it.
+    """
+    root = os.path.dirname(pattern)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root
+
+
+def _find_inputs(patterns):
+    """
+    Expands the glob patterns to the list of files matching them, without
+    duplicates and in a stable order.
+
+    Returns:
+        inputs (list): (path, relative path) of each file, the relative path
+                        being the one from the directory of its pattern before
+                        the first wildcard, kept under the output directory.
+    """
+    paths = {}
+    for pattern in patterns:
+        root = _glob_root(pattern)
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(path):
+                relative = os.path.relpath(path, root or os.curdir)
+                paths.setdefault(os.path.realpath(path), (path, relative))
+    return list(paths.values())
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m dct",
+        description="Compress images to JPEG files with the block DCT.",
+    )
+    parser.add_argument("inputs", nargs="+", help="glob patterns of the images")
+    parser.add_argument(
+        "-o", "--output-dir", required=True, help="directory of the JPEG files"
+    )
+    parser.add_argument(
+        "-F", "--block-size", type=int, default=8, help="size of the blocks"
+    )
+    level = parser.add_mutually_exclusive_group(required=True)
+    level.add_argument(
+        "-d", type=int, help="first diagonal of coefficients to cut, in [0, 2F - 1]"
+    )
+    level.add_argument(
+        "-q", "--quality", type=int, help="quality in [1, 100], sets d from F"
+    )
+    parser.add_argument(
+        "--subsampling",
+        choices=list(SUBSAMPLING),
+        default="4:2:0",
+        help="chroma subsampling of color images",
+    )
+    parser.add_argument(
+        "--progressive",
+        action="store_true",
+        help="write progressive JPEG files, sending the coefficients one "
+        + "diagonal at a time",
+    )
+    parser.add_argument(
+        "--backend", default="scipy", help="DCT backend, see dct.backends"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of processes compressing files in parallel",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="compress files even if up to date"
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="time",
+        choices=["time", "memory"],
+        help="add the time of each stage to the records, "
+        + "and their peak allocation with --stats memory (slower)",
+    )
+    args = parser.parse_args(argv)
+
+    f = args.block_size
+    if f < 1:
+        parser.error("F must be a positive integer.")
+    if args.quality is not None:
+        if not 1 <= args.quality <= 100:
+            parser.error("the quality must be in [1, 100].")
+        args.d = _quality_to_d(f, args.quality)
+    if not 0 <= args.d <= 2 * f - 1:
+        parser.error(f"d must be in [0, {2 * f - 1}].")
+    if args.workers < 1:
+        parser.error("the number of workers must be positive.")
+
+    return args
+
+
+def main(argv=None):
+    """
+    Runs the command line tool.
+
+    Args:
+        argv (list, optional): command line arguments, sys.argv[1:] by default.
+
+    Returns:
+        exit_code (int): 0 if all the files were compressed, 1 otherwise.
+    """
+    args = _parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def emit(record):
+        print(json.dumps(record), flush=True)
+
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+    params = [args.block_size, args.d, args.subsampling, args.progressive]
+
+    # Outputs keep the directories of the inputs below their pattern, the
+    # manifest records them by path relative to the output directory
+    outputs = {}
+    for src, relative in _find_inputs(args.inputs):
+        name = os.path.splitext(relative)[0] + ".jpg"
+        outputs.setdefault(os.path.normpath(name), []).append(src)
+
+    # Files to compress, skipping the ones whose output is up to date, and
+    # failing the ones that would overwrite each other (x.bmp and x.png)
+    jobs = []
+    records = []
+    n_skipped = 0
+    for name, sources in outputs.items():
+        dst = os.path.join(args.output_dir, name)
+        if len(sources) > 1:
+            for src in sources:
+                others = ", ".join(sorted(set(sources) - {src}))
+                record = {"status": "error", "input": src, "output": dst}
+                record["error"] = f"Same output as {others}."
+                records.append(record)
+                emit(record)
+            continue
+        src = sources[0]
+        if not args.force and _up_to_date(src, dst, params, manifest.get(name)):
+            emit({"status": "skipped", "input": src, "output": dst})
+            n_skipped += 1
+        else:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            jobs.append((src, dst))
+
+    start = time.perf_counter()
+
+    def collect(src, dst, run):
+        name = os.path.relpath(dst, args.output_dir)
+        try:
+            record = run()
+            manifest[name] = params
+        except Exception as e:
+            record = {"status": "error", "input": src, "output": dst, "error": str(e)}
+            manifest.pop(name, None)
+        records.append(record)
+        emit(record)
+
+    job_args = (*params, args.backend, args.stats)
+    try:
+        if args.workers == 1 or len(jobs) <= 1:
+            for src, dst in jobs:
+                collect(src, dst, lambda: _compress_file(src, dst, *job_args))
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futures = {
+                    pool.submit(_compress_file, src, dst, *job_args): (src, dst)
+                    for src, dst in jobs
+                }
+                for future in as_completed(futures):
+                    collect(*futures[future], future.result)
+    finally:
+        # Even after an interruption, the files done so far are not redone
+        if jobs:
+            _save_manifest(manifest_path, manifest)
+
+    seconds = time.perf_counter() - start
+    done = [record for record in records if record["status"] == "ok"]
+    megapixels = sum((record["megapixels"] for record in done), 0.0)
+    emit(
+        {
+            "status": "summary",
+            "compressed": len(done),
+            "skipped": n_skipped,
+            "failed": len(records) - len(done),
+            "megapixels": megapixels,
+            "seconds": seconds,
+            "mp_per_s": megapixels / seconds if seconds > 0 else 0.0,
+            "bytes_in": sum(record["bytes_in"] for record in done),
+            "bytes_out": sum(record["bytes_out"] for record in done),
+        }
+    )
+
+    return 0 if len(done) == len(records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import numpy as np
+from functools import lru_cache
+from .image_compress import compute_coefficients, reconstruct_image
+from .stats import NO_STATS
+
+# Number of classes of the worth of the diagonals when looking for the
+# threshold meeting the error budget, log-spaced
+_WORTH_BINS = 1024
+
+# Number of blocks whose squared coefficients are summed at once
+_ENERGY_CHUNK = 1024
+
+
+@lru_cache(maxsize=None)
+def _diagonal_indicator(f):
+    """
+    Builds the F^2 x (2F - 1) matrix whose column k is 1 on the coefficients
+    (flattened row by row) of the anti-diagonal i + j = k and 0 elsewhere.
+    """
+    i, j = np.indices((f, f))
+    indicator = (i + j).reshape(-1, 1) == np.arange(2 * f - 1)
+    indicator = indicator.astype(np.float64)
+    indicator.flags.writeable = False
+    return indicator
+
+
+def diagonal_energies(coeff):
+    """
+    Computes the energy of each anti-diagonal of DCT coefficients of every
+    block, all the blocks at once.
+
+    Args:
+        coeff (np.ndarray): array of shape (..., F, F) of DCT coefficients.
+
+    Returns:
+        energies (np.ndarray): array of shape (..., 2F - 1), the sum of the
+                                squares of the coefficients with i + j = k
+                                for each k.
+    """
+    f = coeff.shape[-1]
+    indicator = _diagonal_indicator(f)
+    flat = coeff.reshape(-1, f * f)
+    energies = np.empty((len(flat), 2 * f - 1))
+
+    # Squares of a chunk of blocks at a time, which stay in cache for the sum
+    squares = np.empty((min(len(flat), _ENERGY_CHUNK), f * f))
+    for start in range(0, len(flat), _ENERGY_CHUNK):
+        chunk = flat[start : start + _ENERGY_CHUNK]
+        np.square(chunk, out=squares[: len(chunk)])
+        np.matmul(
+            squares[: len(chunk)],
+            indicator,
+            out=energies[start : start + _ENERGY_CHUNK],
+        )
+
+    return energies.reshape(*coeff.shape[:-2], 2 * f - 1)
+
+
+def select_block_d(coeff, target_psnr):
+    """
+    Chooses the parameter d of each block so that the whole image reaches
+    about the target PSNR while keeping as few coefficients as possible.
+
+    Since the DCT is orthonormal, cutting the diagonal k of a block adds its
+    energy to the squared error of the block (Parseval's theorem), and saves
+    its coefficients. The worth of a diagonal is its energy per coefficient,
+    raised to the worth of the later diagonals of the block, since the kept
+    diagonals of a block come first. All the diagonals worth more than a
+    threshold are kept, the highest threshold whose error fits the budget of
+    the target PSNR being found from a histogram of the worths, in a couple of
+    passes over the energies. Flat blocks end up with small values of d and
+    detailed blocks with large ones. The DC coefficient of every block is
+    kept, since a block without it is black. Like dct.sweep.rd_sweep, the error
+    budget leaves room for the rounding of the pixels, about 1/12 per pixel.
+
+    Args:
+        coeff (np.ndarray): array of shape (n_rows, n_cols, F, F) of DCT
+                            coefficients of the blocks, with nothing cut.
+        target_psnr (float): PSNR to reach, in dB.
+
+    Returns:
+        d_map (np.ndarray): integer array of shape (n_rows, n_cols) with the
+                            parameter d of each block, in [1, 2F - 1].
+    """
+    f = coeff.shape[-1]
+    energies = diagonal_energies(coeff)
+
+    # Squared error allowed to the cut coefficients of all the blocks
+    mse = 255**2 / 10 ** (target_psnr / 10)
+    budget = energies[..., 0].size * f * f * max(mse - 1 / 12, 0)
+    total = energies.sum()
+    if total <= budget:
+        return np.ones(coeff.shape[:-2], dtype=np.int64)
+
+    # Energy per coefficient of each diagonal, made non-increasing along
+    # the diagonals of a block (a loop over the few diagonals is faster than
+    # an accumulation along the short last axis)
+    i, j = np.indices((f, f))
+    worth = (energies / np.bincount((i + j).ravel())).astype(np.float32)
+    for k in range(2 * f - 3, -1, -1):
+        np.maximum(worth[..., k], worth[..., k + 1], out=worth[..., k])
+
+    # Log-spaced classes of worth, the diagonals with no energy in the lowest
+    # one, and error if only the classes >= b are kept
+    positive = worth > 0
+    log_worth = np.log2(worth, out=np.zeros_like(worth), where=positive)
+    high = log_worth.max()
+    low = max(log_worth[positive].min(), high - 64)
+    log_worth -= low
+    log_worth *= _WORTH_BINS / max(high - low, 1e-12)
+    np.clip(log_worth, 0, _WORTH_BINS - 1, out=log_worth)
+    classes = log_worth.astype(np.int32)
+    # The DC coefficients are always kept
+    classes[..., 0] = _WORTH_BINS - 1
+    saved = np.bincount(
+        classes.ravel(), weights=energies.ravel(), minlength=_WORTH_BINS
+    )
+    error = total - np.cumsum(saved[::-1])[::-1]
+
+    # The error grows with the threshold, take the highest one in the budget
+    threshold = max(np.count_nonzero(error <= budget) - 1, 0)
+    return np.count_nonzero(classes >= threshold, axis=-1)
+
+
+def adaptive_coefficients(image, f, target_psnr, backend="scipy", stats=None):
+    """
+    Computes the DCT coefficients of the blocks of a gray scale image, cut
+    with a value of d chosen for each block by select_block_d. The
+    coefficients can be encoded with dct.jpeg.encode_jpeg when F = 8.
+
+    Args:
+        image (PIL.Image): the image to be compressed.
+        f (int): size of the blocks to subdivide the image into.
+        target_psnr (float): PSNR to reach, in dB.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                            the stages, the choice of d is the "select_d" stage.
+
+    Returns:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F) of
+                            DCT coefficients.
+        d_map (np.ndarray): parameter d of each block, see select_block_d.
+    """
+    if stats is None:
+        stats = NO_STATS
+
+    # All the coefficients, then the cut of each block
+    coefficients = compute_coefficients(image, f, 2 * f - 1, backend, stats=stats)
+    with stats.stage("select_d"):
+        d_map = select_block_d(coefficients, target_psnr)
+    with stats.stage("cut"):
+        i, j = np.indices((f, f))
+        coefficients[i + j >= d_map[..., None, None]] = 0
+
+    return coefficients, d_map
+
+
+def adaptive_jpg_compression(image, f, target_psnr, backend="scipy", stats=None):
+    """
+    Compresses a gray scale image like jpg_compression, but with a value of d
+    chosen for each block to reach about the target PSNR with as few
+    coefficients as possible, see select_block_d. For the same PSNR the
+    compressed image has far fewer nonzero coefficients than with a single d
+    for all the blocks, since flat regions need few of them.
+
+    Args:
+        image (PIL.Image): the image to be compressed.
+        f (int): size of the blocks to subdivide the image into.
+        target_psnr (float): PSNR to reach, in dB.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                            the stages, see adaptive_coefficients.
+
+    Returns:
+        compressed_image (PIL.Image): the compressed image, whose info["d_map"]
+                            is the array of shape (n_rows, n_cols) of the
+                            parameter d of each block.
+    """
+    coefficients, d_map = adaptive_coefficients(image, f, target_psnr, backend, stats)
+    compressed_image = reconstruct_image(coefficients, backend, stats=stats)
+    compressed_image.info["d_map"] = d_map
+    return compressed_image
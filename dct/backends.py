@@ -0,0 +1,330 @@
+import numpy as np
+import json
+import os
+import time
+from functools import lru_cache
+from scipy.fft import dct, idct
+from .butterfly import aan_dct_8x8, aan_idct_8x8, islow_dct_8x8, islow_idct_8x8
+from .dct1D import get_dct_plan
+from .dct2D import dct_2D, idct_2D
+from .fast_dct import fast_dct_2D, fast_idct_2D
+
+# Largest matrix (in number of elements) the fused backend accepts, its
+# Kronecker basis has the square of this number of elements
+FUSED_MAX_SIZE = 1024
+
+# Number of matrices the fused backend transforms at once when working in
+# place, through a buffer of this many flattened matrices
+_FUSED_CHUNK = 1024
+
+# File where the results of the calibration of the "auto" backend are stored
+TUNING_FILE = os.environ.get(
+    "COMPRESSIT_TUNING_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "compressit", "backends.json"),
+)
+
+
+class TransformBackend:
+    """
+    A way of computing the 2D DCT and IDCT of a stack of matrices.
+
+    Attributes:
+        name (str): name the backend is registered with.
+        forward (callable): function forward(x, out=None) computing the
+                            orthonormal 2D DCT of every matrix lying on the last
+                            two axes of x, written in out if given.
+        inverse (callable): function inverse(x, out=None) computing the
+                            orthonormal 2D IDCT of every matrix lying on the last
+                            two axes of x, written in out if given.
+        exact (bool): False for backends approximating the DCT beyond floating
+                            point errors, like the fixed-point "islow" backend,
+                            which "auto" never selects.
+    """
+
+    def __init__(self, name, forward, inverse, exact=True):
+        self.name = name
+        self.forward = forward
+        self.inverse = inverse
+        self.exact = exact
+
+    def __repr__(self):
+        return f"TransformBackend({self.name!r})"
+
+
+# Registered backends, by name
+_backends = {}
+
+# Fastest backend for each (shape, dtype), found by calibration
+_tuning = None
+
+
+def register_backend(name, forward, inverse, exact=True):
+    """
+    Registers a new transform backend, replacing any backend with the same name.
+
+    Args:
+        name (str): name of the backend, used to select it.
+        forward (callable): function forward(x, out=None) computing the
+                            orthonormal 2D DCT of every matrix lying on the last
+                            two axes of x, written in out if given.
+        inverse (callable): function inverse(x, out=None) computing the
+                            orthonormal 2D IDCT of every matrix lying on the last
+                            two axes of x, written in out if given.
+        exact (bool, optional): False if the backend only approximates the DCT,
+                            so that "auto" never selects it.
+
+    Returns:
+        backend (TransformBackend): the registered backend.
+    """
+    backend = TransformBackend(name, forward, inverse, exact)
+    _backends[name] = backend
+    return backend
+
+
+def available_backends():
+    """
+    Returns the names of all registered backends.
+    """
+    return list(_backends)
+
+
+def get_backend(name, shape=None, dtype=np.float64):
+    """
+    Returns the backend registered with the given name. The special name
+    "auto" selects the fastest backend for the given matrix shape and dtype,
+    see select_backend.
+
+    Args:
+        name (str): name of the backend, or "auto".
+        shape (tuple, optional): shape of the matrices, needed by "auto".
+        dtype (numpy.dtype, optional): data type of the matrices, used by "auto".
+
+    Returns:
+        backend (TransformBackend): the requested backend.
+    """
+    if name == "auto":
+        if shape is None:
+            raise ValueError('Backend "auto" needs the shape of the matrices.')
+        return select_backend(shape, dtype)
+
+    if name not in _backends:
+        raise ValueError(
+            f"Unknown backend {name!r}, choose one of {available_backends()} or 'auto'."
+        )
+    return _backends[name]
+
+
+def _load_tuning():
+    """
+    Reads the calibration results from TUNING_FILE. A missing or
+    unreadable file just means that nothing was calibrated yet.
+    """
+    try:
+        with open(TUNING_FILE) as file:
+            tuning = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return tuning if isinstance(tuning, dict) else {}
+
+
+def _save_tuning(tuning):
+    """
+    Writes the calibration results to TUNING_FILE. Failing to write it
+    only means the calibration will be done again by the next process.
+    """
+    try:
+        os.makedirs(os.path.dirname(TUNING_FILE), exist_ok=True)
+        tmp_path = TUNING_FILE + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(tuning, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, TUNING_FILE)
+    except OSError:
+        pass
+
+
+def calibrate(shape, dtype=np.float64, n_reps=5):
+    """
+    Measures how long each registered backend takes to transform and
+    inverse transform a stack of random matrices of the given shape.
+
+    Args:
+        shape (tuple): shape (M, N) of the matrices.
+        dtype (numpy.dtype, optional): data type of the matrices.
+        n_reps (int, optional): number of timed repetitions, the best one is kept.
+
+    Returns:
+        timings (dict): best time in seconds for each exact backend that
+                        supports the shape. Backends raising ValueError are
+                        left out.
+    """
+    M, N = shape
+    # Enough matrices to make the timing meaningful, at least one
+    n_matrices = max(1, 2**16 // (M * N))
+    x = np.random.default_rng(0).random((n_matrices, M, N)).astype(dtype)
+
+    timings = {}
+    for name, backend in _backends.items():
+        if not backend.exact:
+            continue
+        try:
+            # Warm up: builds bases and caches
+            backend.inverse(backend.forward(x))
+        except ValueError:
+            continue
+
+        best = float("inf")
+        for _ in range(n_reps):
+            start = time.perf_counter()
+            backend.inverse(backend.forward(x))
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+
+    return timings
+
+
+def select_backend(shape, dtype=np.float64):
+    """
+    Returns the fastest backend on this machine for matrices of the given shape
+    and dtype. The first time a (shape, dtype) pair is requested the backends
+    are calibrated and the winner is stored in TUNING_FILE, later calls and
+    later processes reuse it.
+
+    Args:
+        shape (tuple or int): shape (M, N) of the matrices, or F for F x F blocks.
+        dtype (numpy.dtype, optional): data type of the matrices.
+
+    Returns:
+        backend (TransformBackend): the fastest backend.
+    """
+    global _tuning
+
+    if isinstance(shape, int):
+        shape = (shape, shape)
+    key = f"{shape[0]}x{shape[1]}:{np.dtype(dtype).name}"
+
+    if _tuning is None:
+        _tuning = _load_tuning()
+
+    name = _tuning.get(key)
+    if name not in _backends:
+        timings = calibrate(shape, dtype)
+        name = min(timings, key=timings.get)
+
+        # Merge with results written meanwhile by other processes
+        _tuning = _load_tuning()
+        _tuning[key] = name
+        _save_tuning(_tuning)
+
+    return _backends[name]
+
+
+def _store(y, out):
+    """
+    Copies the result of a transform to out, if given.
+    """
+    if out is None:
+        return y
+    out[...] = y
+    return out
+
+
+def _scipy_2D(transform, x, out):
+    """
+    Applies a SciPy transform along the last two axes of x. With out, the
+    transform runs in place in it (overwrite_x), so no intermediate array
+    is allocated.
+    """
+    if out is None:
+        return transform(transform(x, norm="ortho", axis=-1), norm="ortho", axis=-2)
+
+    if out is not x:
+        out[...] = x
+    y = transform(out, norm="ortho", axis=-1, overwrite_x=True)
+    y = transform(y, norm="ortho", axis=-2, overwrite_x=True)
+    # SciPy may still return a new array, for non-contiguous inputs
+    if not np.may_share_memory(y, out):
+        out[...] = y
+    return out
+
+
+def _scipy_dct(x, out=None):
+    return _scipy_2D(dct, x, out)
+
+
+def _scipy_idct(x, out=None):
+    return _scipy_2D(idct, x, out)
+
+
+# Floating point inputs keep their precision, integers are promoted to float64
+def _matmul_dct(x, out=None):
+    return dct_2D(x, out=out, dtype=np.result_type(x.dtype, 1.0))
+
+
+def _matmul_idct(x, out=None):
+    return idct_2D(x, out=out, dtype=np.result_type(x.dtype, 1.0))
+
+
+def _fft_dct(x, out=None):
+    return _store(fast_dct_2D(x), out)
+
+
+def _fft_idct(x, out=None):
+    return _store(fast_idct_2D(x), out)
+
+
+@lru_cache(maxsize=16)
+def _kron_basis(M, N, dtype):
+    """
+    Computes the (MN) x (MN) matrix K = D_M ⊗ D_N, which applies the whole
+    2D DCT to a M x N matrix flattened row by row: vec(D_M X D_N^T) = K vec(X).
+    """
+    K = np.kron(get_dct_plan(M, dtype).D, get_dct_plan(N, dtype).D)
+    K.flags.writeable = False
+    return K
+
+
+def _fused_transform(x, inverse, out=None):
+    M, N = x.shape[-2:]
+    if M * N > FUSED_MAX_SIZE:
+        raise ValueError(
+            f"The fused backend only supports matrices up to {FUSED_MAX_SIZE} elements."
+        )
+
+    # Floating point inputs keep their precision, integers are promoted to float64
+    K = _kron_basis(M, N, np.result_type(x.dtype, 1.0))
+
+    # A single matrix product transforms all the flattened matrices
+    flat = x.reshape(*x.shape[:-2], M * N)
+    basis = K if inverse else K.T
+    if out is x and out.flags.c_contiguous:
+        # In place, matmul would copy the whole input first: transform the
+        # matrices a chunk at a time through a small buffer instead
+        rows = out.reshape(-1, M * N)
+        buffer = np.empty((min(len(rows), _FUSED_CHUNK), M * N), dtype=K.dtype)
+        for start in range(0, len(rows), _FUSED_CHUNK):
+            chunk = rows[start : start + _FUSED_CHUNK]
+            np.matmul(chunk, basis, out=buffer[: len(chunk)])
+            chunk[...] = buffer[: len(chunk)]
+        return out
+    if out is not None and out.flags.c_contiguous:
+        np.matmul(flat, basis, out=out.reshape(flat.shape))
+        return out
+    y = flat @ basis
+    return _store(y.reshape(x.shape), out)
+
+
+def _fused_dct(x, out=None):
+    return _fused_transform(x, inverse=False, out=out)
+
+
+def _fused_idct(x, out=None):
+    return _fused_transform(x, inverse=True, out=out)
+
+
+register_backend("scipy", _scipy_dct, _scipy_idct)
+register_backend("matmul", _matmul_dct, _matmul_idct)
+register_backend("fused", _fused_dct, _fused_idct)
+register_backend("fft", _fft_dct, _fft_idct)
+# Butterflies specialized for 8 x 8 blocks, see dct.butterfly
+register_backend("aan", aan_dct_8x8, aan_idct_8x8)
+register_backend("islow", islow_dct_8x8, islow_idct_8x8, exact=False)
@@ -0,0 +1,452 @@
+import math
+import numpy as np
+
+# Size of the blocks the butterflies transform
+BUTTERFLY_SIZE = 8
+
+# Number of blocks transformed at a time, so that the intermediate rows of
+# the butterflies stay in the CPU cache
+CHUNK_BLOCKS = 256
+
+# Fixed-point precision of the integer transforms, the same as libjpeg's
+# "islow" DCT (jfdctint.c and jidctint.c): the constants have CONST_BITS
+# fractional bits, the output of the first pass keeps PASS1_BITS more bits
+CONST_BITS = 13
+PASS1_BITS = 2
+
+# Constants of the integer butterflies, FIX(x) = round(x * 2^CONST_BITS)
+FIX_0_298631336 = 2446
+FIX_0_390180644 = 3196
+FIX_0_541196100 = 4433
+FIX_0_765366865 = 6270
+FIX_0_899976223 = 7373
+FIX_1_175875602 = 9633
+FIX_1_501321110 = 12299
+FIX_1_847759065 = 15137
+FIX_1_961570560 = 16069
+FIX_2_053119869 = 16819
+FIX_2_562915447 = 20995
+FIX_3_072711026 = 25172
+
+# Multipliers of the AAN butterflies, written in libjpeg (jfdctflt.c and
+# jidctflt.c) with 9 decimal digits, computed here in full precision
+_F_0_382683433 = math.cos(6 * math.pi / 16)
+_F_0_541196100 = math.cos(2 * math.pi / 16) - math.cos(6 * math.pi / 16)
+_F_0_707106781 = math.cos(4 * math.pi / 16)
+_F_1_082392200 = 2 * (math.cos(2 * math.pi / 16) - math.cos(6 * math.pi / 16))
+_F_1_306562965 = math.cos(2 * math.pi / 16) + math.cos(6 * math.pi / 16)
+_F_1_414213562 = math.sqrt(2)
+_F_1_847759065 = 2 * math.cos(2 * math.pi / 16)
+_F_2_613125930 = 2 * (math.cos(2 * math.pi / 16) + math.cos(6 * math.pi / 16))
+
+# Scale factors of the AAN butterflies: the k-th output of the forward
+# butterfly is the k-th orthonormal DCT coefficient times sqrt(8) * AAN_SCALE[k]
+AAN_SCALE = np.array(
+    [1.0] + [math.sqrt(2) * math.cos(k * math.pi / 16) for k in range(1, 8)]
+)
+
+# Scaling of the 2D coefficients, applied once after (or before) both passes
+_AAN_FORWARD_SCALE = 1 / (8 * np.outer(AAN_SCALE, AAN_SCALE))
+_AAN_INVERSE_SCALE = np.outer(AAN_SCALE, AAN_SCALE) / 8
+
+
+def _aan_forward_1D(d):
+    """
+    Arai-Agui-Nakajima butterfly of the 8-point DCT, as in libjpeg's jfdctflt.c:
+    5 multiplications and 29 additions for 8 samples. The outputs are
+    scaled by AAN_SCALE.
+
+    Args:
+        d (list): the 8 samples, arrays of the same shape.
+
+    Returns:
+        out (list): the 8 scaled coefficients.
+    """
+    tmp0, tmp7 = d[0] + d[7], d[0] - d[7]
+    tmp1, tmp6 = d[1] + d[6], d[1] - d[6]
+    tmp2, tmp5 = d[2] + d[5], d[2] - d[5]
+    tmp3, tmp4 = d[3] + d[4], d[3] - d[4]
+
+    # Even part
+    tmp10, tmp13 = tmp0 + tmp3, tmp0 - tmp3
+    tmp11, tmp12 = tmp1 + tmp2, tmp1 - tmp2
+    z1 = (tmp12 + tmp13) * _F_0_707106781
+    out0, out4 = tmp10 + tmp11, tmp10 - tmp11
+    out2, out6 = tmp13 + z1, tmp13 - z1
+
+    # Odd part
+    tmp10 = tmp4 + tmp5
+    tmp11 = tmp5 + tmp6
+    tmp12 = tmp6 + tmp7
+    z5 = (tmp10 - tmp12) * _F_0_382683433
+    z2 = _F_0_541196100 * tmp10 + z5
+    z4 = _F_1_306562965 * tmp12 + z5
+    z3 = tmp11 * _F_0_707106781
+    z11, z13 = tmp7 + z3, tmp7 - z3
+    out5, out3 = z13 + z2, z13 - z2
+    out1, out7 = z11 + z4, z11 - z4
+
+    return [out0, out1, out2, out3, out4, out5, out6, out7]
+
+
+def _aan_inverse_1D(c):
+    """
+    Arai-Agui-Nakajima butterfly of the 8-point IDCT, as in libjpeg's
+    jidctflt.c. The inputs must be scaled by AAN_SCALE.
+
+    Args:
+        c (list): the 8 scaled coefficients, arrays of the same shape.
+
+    Returns:
+        out (list): the 8 samples.
+    """
+    # Even part
+    tmp10, tmp11 = c[0] + c[4], c[0] - c[4]
+    tmp13 = c[2] + c[6]
+    tmp12 = (c[2] - c[6]) * _F_1_414213562 - tmp13
+    tmp0, tmp3 = tmp10 + tmp13, tmp10 - tmp13
+    tmp1, tmp2 = tmp11 + tmp12, tmp11 - tmp12
+
+    # Odd part
+    z13, z10 = c[5] + c[3], c[5] - c[3]
+    z11, z12 = c[1] + c[7], c[1] - c[7]
+    tmp7 = z11 + z13
+    tmp11 = (z11 - z13) * _F_1_414213562
+    z5 = (z10 + z12) * _F_1_847759065
+    tmp10 = _F_1_082392200 * z12 - z5
+    tmp12 = z5 - _F_2_613125930 * z10
+    tmp6 = tmp12 - tmp7
+    tmp5 = tmp11 - tmp6
+    tmp4 = tmp10 + tmp5
+
+    return [
+        tmp0 + tmp7,
+        tmp1 + tmp6,
+        tmp2 + tmp5,
+        tmp3 - tmp4,
+        tmp3 + tmp4,
+        tmp2 - tmp5,
+        tmp1 - tmp6,
+        tmp0 - tmp7,
+    ]
+
+
+def _descale(x, n):
+    """
+    Divides integers by 2^n rounding to the nearest, like libjpeg's DESCALE.
+    """
+    return (x + (1 << (n - 1))) >> n
+
+
+def _islow_forward_1D(d, last):
+    """
+    Integer butterfly of the 8-point DCT of libjpeg's jfdctint.c (Loeffler,
+    Ligtenberg and Moschytz), 12 multiplications and 32 additions. The first
+    pass keeps PASS1_BITS more bits than its inputs, the last pass removes them.
+
+    Args:
+        d (list): the 8 samples, int64 arrays of the same shape.
+        last (bool): True for the second pass.
+
+    Returns:
+        out (list): the 8 coefficients, scaled up by sqrt(8).
+    """
+    shift = CONST_BITS + PASS1_BITS if last else CONST_BITS - PASS1_BITS
+
+    tmp0, tmp7 = d[0] + d[7], d[0] - d[7]
+    tmp1, tmp6 = d[1] + d[6], d[1] - d[6]
+    tmp2, tmp5 = d[2] + d[5], d[2] - d[5]
+    tmp3, tmp4 = d[3] + d[4], d[3] - d[4]
+
+    # Even part
+    tmp10, tmp13 = tmp0 + tmp3, tmp0 - tmp3
+    tmp11, tmp12 = tmp1 + tmp2, tmp1 - tmp2
+    if last:
+        out0 = _descale(tmp10 + tmp11, PASS1_BITS)
+        out4 = _descale(tmp10 - tmp11, PASS1_BITS)
+    else:
+        out0 = (tmp10 + tmp11) << PASS1_BITS
+        out4 = (tmp10 - tmp11) << PASS1_BITS
+    z1 = (tmp12 + tmp13) * FIX_0_541196100
+    out2 = _descale(z1 + tmp13 * FIX_0_765366865, shift)
+    out6 = _descale(z1 - tmp12 * FIX_1_847759065, shift)
+
+    # Odd part
+    z1, z2 = tmp4 + tmp7, tmp5 + tmp6
+    z3, z4 = tmp4 + tmp6, tmp5 + tmp7
+    z5 = (z3 + z4) * FIX_1_175875602
+    tmp4 = tmp4 * FIX_0_298631336
+    tmp5 = tmp5 * FIX_2_053119869
+    tmp6 = tmp6 * FIX_3_072711026
+    tmp7 = tmp7 * FIX_1_501321110
+    z1 = z1 * -FIX_0_899976223
+    z2 = z2 * -FIX_2_562915447
+    z3 = z3 * -FIX_1_961570560 + z5
+    z4 = z4 * -FIX_0_390180644 + z5
+    out7 = _descale(tmp4 + z1 + z3, shift)
+    out5 = _descale(tmp5 + z2 + z4, shift)
+    out3 = _descale(tmp6 + z2 + z3, shift)
+    out1 = _descale(tmp7 + z1 + z4, shift)
+
+    return [out0, out1, out2, out3, out4, out5, out6, out7]
+
+
+def _islow_inverse_1D(c, shift):
+    """
+    Integer butterfly of the 8-point IDCT of libjpeg's jidctint.c.
+
+    Args:
+        c (list): the 8 coefficients, int64 arrays of the same shape.
+        shift (int): number of bits the outputs are scaled down by.
+
+    Returns:
+        out (list): the 8 samples.
+    """
+    # Even part
+    z1 = (c[2] + c[6]) * FIX_0_541196100
+    tmp2 = z1 - c[6] * FIX_1_847759065
+    tmp3 = z1 + c[2] * FIX_0_765366865
+    tmp0 = (c[0] + c[4]) << CONST_BITS
+    tmp1 = (c[0] - c[4]) << CONST_BITS
+    tmp10, tmp13 = tmp0 + tmp3, tmp0 - tmp3
+    tmp11, tmp12 = tmp1 + tmp2, tmp1 - tmp2
+
+    # Odd part
+    tmp0, tmp1, tmp2, tmp3 = c[7], c[5], c[3], c[1]
+    z1, z2 = tmp0 + tmp3, tmp1 + tmp2
+    z3, z4 = tmp0 + tmp2, tmp1 + tmp3
+    z5 = (z3 + z4) * FIX_1_175875602
+    tmp0 = tmp0 * FIX_0_298631336
+    tmp1 = tmp1 * FIX_2_053119869
+    tmp2 = tmp2 * FIX_3_072711026
+    tmp3 = tmp3 * FIX_1_501321110
+    z1 = z1 * -FIX_0_899976223
+    z2 = z2 * -FIX_2_562915447
+    z3 = z3 * -FIX_1_961570560 + z5
+    z4 = z4 * -FIX_0_390180644 + z5
+    tmp0 += z1 + z3
+    tmp1 += z2 + z4
+    tmp2 += z2 + z3
+    tmp3 += z1 + z4
+
+    return [
+        _descale(tmp10 + tmp3, shift),
+        _descale(tmp11 + tmp2, shift),
+        _descale(tmp12 + tmp1, shift),
+        _descale(tmp13 + tmp0, shift),
+        _descale(tmp13 - tmp0, shift),
+        _descale(tmp12 - tmp1, shift),
+        _descale(tmp11 - tmp2, shift),
+        _descale(tmp10 - tmp3, shift),
+    ]
+
+
+def _check_blocks(x):
+    if x.shape[-2:] != (BUTTERFLY_SIZE, BUTTERFLY_SIZE):
+        raise ValueError(
+            f"The butterfly transforms only support {BUTTERFLY_SIZE}x"
+            + f"{BUTTERFLY_SIZE} matrices, got {x.shape[-2]}x{x.shape[-1]}."
+        )
+
+
+def _butterfly_pass(t, butterfly, axis):
+    """
+    Applies a 1D butterfly along the first or the second axis of a (8, 8, n)
+    array, returning a new array.
+    """
+    if axis == 0:
+        return np.stack(butterfly([t[i] for i in range(BUTTERFLY_SIZE)]))
+    return np.stack(butterfly([t[:, i] for i in range(BUTTERFLY_SIZE)]), axis=1)
+
+
+def _separable(x, out, dtype, prepare, first, second, finish, columns_first=False):
+    """
+    Applies the 2D transform made of a 1D butterfly on the rows (or the
+    columns) of every 8 x 8 matrix of x followed by another one in the
+    other direction, CHUNK_BLOCKS matrices at a time.
+
+    Each chunk is copied to a (8, 8, n_blocks) array with the matrices on the
+    last axis, so that every step of a butterfly is a single operation on a
+    contiguous row of the values of all the matrices.
+
+    Args:
+        x (np.ndarray): array of shape (..., 8, 8).
+        out (np.ndarray): array with the same shape as x receiving the result,
+                            or None to allocate it.
+        dtype (np.dtype): type of the result.
+        prepare (callable): converts the (8, 8, n_blocks) view of a chunk to the
+                            C-contiguous array the butterflies work on.
+        first, second (callable): 1D butterflies of the two passes, taking and
+                            returning lists of 8 arrays.
+        finish (callable): converts the result of the second pass before it
+                            is stored.
+        columns_first (bool, optional): whether the first pass is on the columns.
+
+    Returns:
+        out (np.ndarray): the result.
+    """
+    _check_blocks(x)
+    if out is None:
+        out = np.empty(x.shape, dtype=dtype)
+
+    # The chunks are slices of the flattened stack of matrices, which needs
+    # a copy of out when it is not contiguous enough
+    flat_out = out.view()
+    try:
+        flat_out.shape = (-1, BUTTERFLY_SIZE, BUTTERFLY_SIZE)
+    except AttributeError:
+        out[...] = _separable(
+            x, None, dtype, prepare, first, second, finish, columns_first
+        )
+        return out
+    flat = x.reshape(-1, BUTTERFLY_SIZE, BUTTERFLY_SIZE)
+
+    # Axis 0 of the chunks runs along the columns, axis 1 along the rows
+    axes = (0, 1) if columns_first else (1, 0)
+    for start in range(0, len(flat), CHUNK_BLOCKS):
+        t = prepare(flat[start : start + CHUNK_BLOCKS].transpose(1, 2, 0))
+        t = _butterfly_pass(t, first, axes[0])
+        t = _butterfly_pass(t, second, axes[1])
+        flat_out[start : start + CHUNK_BLOCKS] = finish(t).transpose(2, 0, 1)
+
+    return out
+
+
+def _float_type(x):
+    return np.result_type(x.dtype, 1.0)
+
+
+def aan_dct_8x8(x, out=None):
+    """
+    Computes the orthonormal 2D DCT of every 8 x 8 matrix of x with the
+    Arai-Agui-Nakajima butterflies, vectorized over all the matrices: each
+    butterfly step is a single NumPy operation on one row (or column) of
+    samples of all the matrices. The AAN scale factors of both passes are
+    folded into a single multiplication at the end.
+
+    Args:
+        x (np.ndarray): array of shape (..., 8, 8). Floating point inputs keep
+                        their precision, integers are promoted to float64.
+        out (np.ndarray, optional): array with the same shape as x receiving
+                                    the coefficients, can be x itself.
+
+    Returns:
+        c (np.ndarray): array with the same shape as x containing the DCT
+                        coefficients.
+    """
+    x = np.asarray(x)
+    dtype = _float_type(x)
+    scale = _AAN_FORWARD_SCALE[..., None].astype(dtype)
+
+    def finish(t):
+        t *= scale
+        return t
+
+    return _separable(
+        x,
+        out,
+        dtype,
+        lambda chunk: np.asarray(chunk, dtype=dtype, order="C"),
+        _aan_forward_1D,
+        _aan_forward_1D,
+        finish,
+    )
+
+
+def aan_idct_8x8(c, out=None):
+    """
+    Computes the orthonormal 2D IDCT of every 8 x 8 matrix of c with the
+    Arai-Agui-Nakajima butterflies, see aan_dct_8x8. The coefficients are
+    scaled by the AAN factors before the butterflies.
+
+    Args:
+        c (np.ndarray): array of shape (..., 8, 8) of DCT coefficients.
+        out (np.ndarray, optional): array with the same shape as c receiving
+                                    the samples, can be c itself.
+
+    Returns:
+        x (np.ndarray): array with the same shape as c containing the samples.
+    """
+    c = np.asarray(c)
+    dtype = _float_type(c)
+    scale = _AAN_INVERSE_SCALE[..., None].astype(dtype)
+
+    def prepare(chunk):
+        t = np.array(chunk, dtype=dtype, order="C")
+        t *= scale
+        return t
+
+    return _separable(
+        c, out, dtype, prepare, _aan_inverse_1D, _aan_inverse_1D, lambda t: t
+    )
+
+
+def islow_dct_8x8(x, out=None):
+    """
+    Computes the 2D DCT of every 8 x 8 matrix of x in integer fixed-point
+    arithmetic, with the butterflies of libjpeg's "islow" DCT. The samples
+    are rounded to integers and all the steps are exact integer operations,
+    so the result is the same on every platform. It approximates the
+    orthonormal DCT to a fraction of a unit: the coefficients are multiples
+    of 1/8, like the output of libjpeg before quantization.
+
+    Args:
+        x (np.ndarray): array of shape (..., 8, 8) of samples.
+        out (np.ndarray, optional): array with the same shape as x receiving
+                                    the coefficients, can be x itself.
+
+    Returns:
+        c (np.ndarray): float array with the same shape as x containing the
+                        DCT coefficients.
+    """
+    x = np.asarray(x)
+    return _separable(
+        x,
+        out,
+        _float_type(x),
+        _to_integers,
+        lambda d: _islow_forward_1D(d, last=False),
+        lambda d: _islow_forward_1D(d, last=True),
+        # The butterflies compute 8 times the orthonormal coefficients
+        lambda t: t / 8,
+    )
+
+
+def islow_idct_8x8(c, out=None):
+    """
+    Computes the 2D IDCT of every 8 x 8 matrix of c in integer fixed-point
+    arithmetic, with the butterflies of libjpeg's "islow" IDCT, see
+    islow_dct_8x8. The coefficients are rounded to multiples of 1/8 and the
+    samples to integers. The columns are transformed first, like in libjpeg.
+
+    Args:
+        c (np.ndarray): array of shape (..., 8, 8) of DCT coefficients.
+        out (np.ndarray, optional): array with the same shape as c receiving
+                                    the samples, can be c itself.
+
+    Returns:
+        x (np.ndarray): float array with the same shape as c containing the
+                        (integer) samples.
+    """
+    c = np.asarray(c)
+    # The coefficients have 3 more bits than libjpeg's, removed at the end
+    # along with the 3 bits of the 8 x 8 normalization
+    return _separable(
+        c,
+        out,
+        _float_type(c),
+        lambda chunk: _to_integers(chunk * 8),
+        lambda d: _islow_inverse_1D(d, CONST_BITS - PASS1_BITS),
+        lambda d: _islow_inverse_1D(d, CONST_BITS + PASS1_BITS + 3 + 3),
+        lambda t: t,
+        columns_first=True,
+    )
+
+
+def _to_integers(x):
+    """
+    Rounds an array to the nearest int64 values, in a C-contiguous array.
+    """
+    if not np.issubdtype(x.dtype, np.integer):
+        x = np.rint(x)
+    return np.asarray(x, dtype=np.int64, order="C")
@@ -0,0 +1,298 @@
+import numpy as np
+from PIL import Image
+from .backends import get_backend
+from .image_compress import (
+    _subdivide_image,
+    _diagonal_mask,
+    _inverse_blocks,
+    _run_bands,
+    _sub_progress,
+)
+from .stats import NO_STATS
+
+# Chroma subsampling modes, as (vertical, horizontal) subsampling factors
+# of the Cb and Cr planes with respect to the Y plane
+SUBSAMPLING = {
+    "4:4:4": (1, 1),
+    "4:2:2": (1, 2),
+    "4:2:0": (2, 2),
+}
+
+
+def is_gray(image):
+    """
+    Tells if all the pixels of an RGB image have three equal channels, such
+    images being compressed as gray scale ones.
+
+    Args:
+        image (PIL.Image or np.ndarray): the RGB image.
+
+    Returns:
+        gray (bool): True if the image is gray scale.
+    """
+    pixels = np.asarray(image)
+    return bool(
+        (pixels[..., 0] == pixels[..., 1]).all()
+        and (pixels[..., 1] == pixels[..., 2]).all()
+    )
+
+
+def _per_channel(value, name):
+    """
+    Expands a parameter given for all the channels to a (Y, Cb, Cr) tuple.
+    """
+    if np.ndim(value) == 0:
+        return (int(value),) * 3
+    if len(value) != 3:
+        raise ValueError(f"{name} must be an integer or a (Y, Cb, Cr) triple.")
+    return tuple(int(v) for v in value)
+
+
+def _pad_to_multiple(plane, fy, fx):
+    """
+    Pads a plane repeating its last row and column, so that its height is a
+    multiple of fy and its width a multiple of fx.
+    """
+    height, width = plane.shape
+    pad_y, pad_x = -height % fy, -width % fx
+    if pad_y or pad_x:
+        plane = np.pad(plane, ((0, pad_y), (0, pad_x)), mode="edge")
+    return plane
+
+
+def _downsample(plane, fy, fx):
+    """
+    Subsamples a plane by averaging each fy x fx group of pixels.
+    """
+    if (fy, fx) == (1, 1):
+        return plane
+    plane = _pad_to_multiple(plane, fy, fx)
+
+    # Sum of the strided sub-planes, one for each pixel of the groups
+    total = np.zeros((plane.shape[0] // fy, plane.shape[1] // fx), dtype=np.uint16)
+    for i in range(fy):
+        for j in range(fx):
+            total += plane[i::fy, j::fx]
+
+    # Rounded average
+    n = fy * fx
+    return ((total + n // 2) // n).astype(np.uint8)
+
+
+def _upsample(plane, fy, fx, shape):
+    """
+    Brings a subsampled plane back to the given shape by repeating each pixel
+    fy times vertically and fx times horizontally.
+    """
+    plane = plane.repeat(fy, axis=0).repeat(fx, axis=1)
+    return plane[: shape[0], : shape[1]]
+
+
+def _forward_planes(planes, fs, backend="scipy", progress=None, stats=NO_STATS):
+    """
+    Computes the DCT coefficients of the blocks of several planes. The planes
+    with the same F are batched: the blocks of all of them are transformed by a
+    single forward DCT.
+
+    Args:
+        planes (list): 2D uint8 arrays of the planes.
+        fs (list): size of the blocks of each plane.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        progress (callable, optional): progress callback, see jpg_compression.
+        stats (CompressionStats, optional): collector of the time of the
+                                            "subdivide" and "forward_dct" stages.
+
+    Returns:
+        groups (list): a (F, coeff, layout) tuple for each distinct F, where
+                        coeff is a (n_blocks, F, F) array with the coefficients
+                        of the blocks of all the planes with that F, one plane
+                        after the other, and layout lists the (index, n_rows,
+                        n_cols) of these planes.
+    """
+    groups = []
+    sizes = sorted(set(fs))
+
+    for index, f in enumerate(sizes):
+        indices = [i for i in range(len(planes)) if fs[i] == f]
+
+        # Blocks of all the planes with this F, one after the other
+        with stats.stage("subdivide"):
+            views = [_subdivide_image(planes[i], f)[0] for i in indices]
+            blocks = [view.reshape(-1, f, f) for view in views]
+            blocks = np.concatenate(blocks, dtype=np.float64)
+
+        transform = get_backend(backend, (f, f), np.float64)
+
+        def forward(start, stop):
+            with stats.stage("forward_dct"):
+                transform.forward(blocks[start:stop], out=blocks[start:stop])
+
+        _run_bands(len(blocks), forward, _sub_progress(progress, index, len(sizes)))
+        coeff = blocks
+
+        layout = [(i, *view.shape[:2]) for i, view in zip(indices, views)]
+        groups.append((f, coeff, layout))
+
+    return groups
+
+
+def _inverse_planes(
+    groups, ds, backend="scipy", overwrite=False, progress=None, stats=NO_STATS
+):
+    """
+    Rebuilds the compressed planes from the coefficients returned by
+    _forward_planes, each block keeping the coefficients given by the d of
+    its own plane. There is a single inverse DCT for each F.
+
+    Args:
+        groups (list): coefficients of the planes, as returned by _forward_planes.
+        ds (list): parameter d of each plane.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        overwrite (bool, optional): if True, the coefficients are used as
+                                    workspace and their content is lost.
+        progress (callable, optional): progress callback, see jpg_compression.
+        stats (CompressionStats, optional): collector of the time of the "cut",
+                                    "inverse_dct", "round_clip" and "rebuild"
+                                    stages.
+
+    Returns:
+        compressed_planes (list): 2D uint8 arrays of the compressed planes,
+                                    cropped to a whole number of blocks.
+    """
+    compressed = [None] * len(ds)
+
+    for index, (f, coeff, layout) in enumerate(groups):
+        with stats.stage("cut"):
+            if not overwrite:
+                coeff = coeff.copy()
+
+            # Cut the coefficients of each plane with its own d
+            start = 0
+            for i, n_rows, n_cols in layout:
+                stop = start + n_rows * n_cols
+                coeff[start:stop, _diagonal_mask(f, ds[i])] = 0
+                start = stop
+
+        pixels = np.empty(coeff.shape, dtype=np.uint8)
+        _run_bands(
+            len(coeff),
+            lambda start, stop: _inverse_blocks(
+                coeff[start:stop],
+                backend,
+                out=pixels[start:stop],
+                overwrite=True,
+                stats=stats,
+            ),
+            _sub_progress(progress, index, len(groups)),
+        )
+
+        # Put the blocks of each plane back in their place
+        with stats.stage("rebuild"):
+            start = 0
+            for i, n_rows, n_cols in layout:
+                stop = start + n_rows * n_cols
+                out = np.empty((n_rows * f, n_cols * f), dtype=np.uint8)
+                out_blocks, _, _ = _subdivide_image(out, f)
+                out_blocks[...] = pixels[start:stop].reshape(n_rows, n_cols, f, f)
+                compressed[i] = out
+                start = stop
+
+    return compressed
+
+
+def _compress_planes(planes, fs, ds, backend="scipy", stats=NO_STATS):
+    """
+    Compresses several planes like jpg_compression, batching the planes
+    with the same F, see _forward_planes and _inverse_planes.
+
+    Returns:
+        compressed_planes (list): 2D uint8 arrays of the compressed planes,
+                                    cropped to a whole number of blocks.
+    """
+    groups = _forward_planes(planes, fs, backend, stats=stats)
+    return _inverse_planes(groups, ds, backend, overwrite=True, stats=stats)
+
+
+def _split_planes(image, fs, subsampling):
+    """
+    Converts an image to the Y, Cb and Cr planes to compress. The Y plane is
+    cropped to a whole number of blocks, the chroma planes are subsampled and
+    padded to a whole number of blocks.
+    """
+    if subsampling not in SUBSAMPLING:
+        raise ValueError(
+            f"Unknown subsampling {subsampling!r}, "
+            + f"expected one of {', '.join(SUBSAMPLING)}."
+        )
+    fy, fx = SUBSAMPLING[subsampling]
+
+    ycbcr = np.asarray(image.convert("RGB").convert("YCbCr"))
+
+    # Pixels that do not fit in a whole block of the Y plane are discarded
+    height = ycbcr.shape[0] // fs[0] * fs[0]
+    width = ycbcr.shape[1] // fs[0] * fs[0]
+    ycbcr = ycbcr[:height, :width]
+
+    planes = [ycbcr[..., 0]]
+    for channel, f_chroma in zip((1, 2), fs[1:]):
+        plane = _downsample(ycbcr[..., channel], fy, fx)
+        planes.append(_pad_to_multiple(plane, f_chroma, f_chroma))
+
+    return planes
+
+
+def _merge_planes(planes, subsampling):
+    """
+    Converts the compressed Y, Cb and Cr planes back to an RGB image.
+    """
+    fy, fx = SUBSAMPLING[subsampling]
+    y, cb, cr = planes
+    cb, cr = (_upsample(plane, fy, fx, y.shape) for plane in (cb, cr))
+
+    channels = [Image.fromarray(plane) for plane in (y, cb, cr)]
+    return Image.merge("YCbCr", channels).convert("RGB")
+
+
+def color_jpg_compression(
+    image, f, d, subsampling="4:2:0", backend="scipy", stats=None
+):
+    """
+    Compresses a color image like jpg_compression does for gray scale images.
+    The image is converted to the YCbCr color space, the chroma planes (Cb and
+    Cr) are subsampled, then the three planes are compressed with the block
+    DCT and converted back to RGB. The luma plane (Y) is compressed exactly
+    like jpg_compression would compress it as a gray scale image.
+
+    The chroma planes are padded to a whole number of blocks repeating their
+    border, so the compressed image has the size of the compressed Y plane.
+    With "4:2:0" subsampling each chroma plane has a quarter of the pixels,
+    so the DCT has half the work of three full planes.
+
+    Args:
+        image (PIL.Image): the image to be compressed.
+        f (int or tuple): size of the blocks, either the same for all the
+                    channels or a (Y, Cb, Cr) triple.
+        d (int or tuple): parameter that determines how many coefficients to
+                    keep, either the same for all the channels or a (Y, Cb, Cr)
+                    triple.
+        subsampling (str, optional): chroma subsampling, one of "4:4:4",
+                    "4:2:2" and "4:2:0" (default).
+        backend (str, optional): name of the transform backend, see dct.backends.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                    the stages, see jpg_compression. The color conversions are
+                    the "to_ycbcr" and "to_rgb" stages.
+
+    Returns:
+        compressed_image (PIL.Image): the compressed image in RGB mode.
+    """
+    if stats is None:
+        stats = NO_STATS
+
+    fs = _per_channel(f, "f")
+    ds = _per_channel(d, "d")
+
+    with stats.stage("to_ycbcr"):
+        planes = _split_planes(image, fs, subsampling)
+    planes = _compress_planes(planes, fs, ds, backend, stats)
+    with stats.stage("to_rgb"):
+        return _merge_planes(planes, subsampling)
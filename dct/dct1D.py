@@ -1,8 +1,13 @@
 import numpy as np
-import math
+import threading
+from functools import lru_cache
+from numpy.lib.array_utils import normalize_axis_index
 
+# Maximum number of DCT plans kept in memory at the same time
+PLAN_CACHE_SIZE = 32
 
-def build_dct_orthobasis(N):
+
+def build_dct_orthobasis(N, dtype=np.float64):
     """
     Computes the Discrete Cosine Transform (DCT) orthonormal basis
     matrix of size N x N. This is done by sampling the cosine function
@@ -11,65 +16,212 @@ def build_dct_orthobasis(N):
 
     Args:
         N (int): size of the required DCT matrix.
+        dtype (numpy.dtype, optional): data type of the matrix. The cosines
+                                        are always computed in float64, then
+                                        rounded to dtype.
 
     Returns:
         D (numpy.ndarray): NxN matrix containing the orthonormal basis
                             vectors for DCT.
     """
 
-    # Initializing matrix that will hold the orthonormal basis vectors
-    D = np.empty((N, N))
-
     # Normalization vector to make each w_k an orthonormal base vector
-    alpha = np.zeros(N)
+    alpha = np.full(N, N ** (-0.5) * np.sqrt(2))  # √2/√N
     alpha[0] = N ** (-0.5)  # 1/√N
-    alpha[1:] = N ** (-0.5) * math.sqrt(2)  # √2/√N
 
-    # Looping through frequencies
-    for k in range(N):
-        # Sampling cosine at frequency k in N equidistant points and normalizing
-        for i in range(N):
-            D[k, i] = alpha[k] * math.cos(k * math.pi * (2 * i + 1) / (2 * N))
+    # Frequencies as a column, sampling points as a row
+    k = np.arange(N).reshape(N, 1)
+    i = np.arange(N).reshape(1, N)
+
+    # Sampling cosine at every frequency k in N equidistant points at once
+    # and normalizing, row k of D is the k-th basis vector
+    D = alpha.reshape(N, 1) * np.cos(k * np.pi * (2 * i + 1) / (2 * N))
+
+    return D.astype(dtype, copy=False)
+
+
+class DCTPlan:
+    """
+    Precomputed data needed to apply the manual DCT to vectors of size N.
+    A plan holds the orthonormal basis and the scratch buffers used by the
+    transforms, so that repeated transforms of the same size only cost the
+    matrix products. Plans should be obtained through get_dct_plan, which
+    caches them.
+
+    Attributes:
+        N (int): size of the vectors the plan transforms.
+        dtype (numpy.dtype): data type of the basis.
+        D (numpy.ndarray): read-only NxN orthonormal DCT basis.
+    """
+
+    def __init__(self, N, dtype=np.float64):
+        self.N = N
+        self.dtype = np.dtype(dtype)
+        self.D = build_dct_orthobasis(N, self.dtype)
+        self.D.flags.writeable = False
+
+        # Scratch buffers are per thread, so that a plan can be shared
+        self._local = threading.local()
+
+    def scratch(self, shape, dtype=None, name="tmp"):
+        """
+        Returns a scratch buffer of the given shape, reused between calls
+        made from the same thread. Only one buffer per name and data type is
+        kept, grown to the largest size requested so far. Its content is undefined.
+
+        Args:
+            shape (tuple): shape of the required buffer.
+            dtype (numpy.dtype, optional): data type of the buffer, defaults
+                                            to the plan's data type.
+            name (str, optional): name of the buffer, buffers with different
+                                    names can be used at the same time.
+
+        Returns:
+            buffer (numpy.ndarray): the scratch buffer.
+        """
+        dtype = self.dtype if dtype is None else np.dtype(dtype)
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        size = int(np.prod(shape))
+        key = (name, dtype)
+        if key not in buffers or buffers[key].size < size:
+            buffers[key] = np.empty(size, dtype=dtype)
+        return buffers[key][:size].reshape(shape)
+
+    def __repr__(self):
+        return f"DCTPlan(N={self.N}, dtype={self.dtype})"
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _cached_dct_plan(N, dtype):
+    return DCTPlan(N, dtype)
+
+
+def get_dct_plan(N, dtype=np.float64):
+    """
+    Returns the DCT plan for vectors of size N. Plans are kept in a
+    bounded LRU cache, so the basis is only computed the first time
+    a size is requested.
+
+    Args:
+        N (int): size of the vectors to transform.
+        dtype (numpy.dtype, optional): data type of the basis.
+
+    Returns:
+        plan (DCTPlan): the plan for size N.
+    """
+    return _cached_dct_plan(int(N), np.dtype(dtype))
+
+
+def dct_plan_cache_info():
+    """
+    Returns the statistics of the DCT plan cache as a named tuple
+    (hits, misses, maxsize, currsize).
+    """
+    return _cached_dct_plan.cache_info()
+
+
+def clear_dct_plan_cache():
+    """
+    Removes all plans from the DCT plan cache and resets its statistics.
+    """
+    _cached_dct_plan.cache_clear()
+
+
+def _apply_basis(x, B, axis, out=None, dtype=None):
+    """
+    Multiplies the vectors of x along the given axis by the matrix B,
+    meaning that y[..., k, ...] = sum_i B[k, i] * x[..., i, ...].
+    All the vectors are transformed by a single matrix product.
+
+    Args:
+        x (numpy.ndarray): array of any rank.
+        B (numpy.ndarray): N x N matrix, N must match the length of the axis.
+        axis (int): axis along which to apply B.
+        out (numpy.ndarray, optional): array with the same shape as x
+                                        receiving the result.
+        dtype (numpy.dtype, optional): data type the product is computed in,
+                                        by default the common type of x and B.
+
+    Returns:
+        y (numpy.ndarray): array with the same shape as x.
+    """
+    axis = normalize_axis_index(axis, x.ndim)
+
+    # Along the last axis each vector is a row of x
+    if axis == x.ndim - 1:
+        return np.matmul(x, B.T, out=out, dtype=dtype)
 
-    return D
+    # Otherwise bring the axis second to last, where each vector is a column,
+    # so that no copy is needed and the product is broadcast on the others
+    moved_out = None if out is None else np.moveaxis(out, axis, -2)
+    y = np.matmul(B, np.moveaxis(x, axis, -2), out=moved_out, dtype=dtype)
+    return np.moveaxis(y, -2, axis)
 
 
-def dct_1D(f, D=None):
+def dct_1D(f, D=None, plan=None, axis=-1, out=None, dtype=None):
     """
     Computes the Discrete Cosine Transform (DCT) of a one variable function f,
     represented by a vector of its samples at N equidistant points.
+    If f has more than one dimension, the DCT is computed for every vector
+    along the given axis, like scipy.fft.dct does.
 
     Args:
-        f (numpy.ndarray): vector of samples of the function f.
+        f (numpy.ndarray): vector of samples of the function f, or array of any
+                            rank containing such vectors along axis.
         D (numpy.ndarray, optional): orthonormal basis for DCT transform.
-                                      If not provided, it will be computed.
+                                      If not provided, it will be taken from plan.
+        plan (DCTPlan, optional): plan for DCT transform. If neither D nor plan
+                                  are provided, it will be taken from the cache.
+        axis (int, optional): axis along which the DCT is computed. Default is -1.
+        out (numpy.ndarray, optional): array with the same shape as f receiving
+                                        the coefficients, no new array is allocated.
+        dtype (numpy.dtype, optional): data type of the computation and of the
+                                        coefficients, e.g. np.float32 for a
+                                        faster transform using half the memory.
+                                        The plan is taken from the cache for
+                                        this type. By default float64, or the
+                                        type of D or plan if given.
 
     Returns:
-        c (numpy.ndarray): vector of DCT coefficients.
+        c (numpy.ndarray): vector (or array) of DCT coefficients.
     """
+    f = np.asarray(f)
     if D is None:
-        # Computing orthonormal basis for DCP transform
-        D = build_dct_orthobasis(len(f))
+        if plan is None:
+            plan = get_dct_plan(f.shape[axis], dtype or np.float64)
+        D = plan.D
     # Dot product of each basis vector and function's samples vector
-    c = D @ f
+    c = _apply_basis(f, D, axis, out, dtype)
     return c
 
 
-def idct_1D(c, D=None):
+def idct_1D(c, D=None, plan=None, axis=-1, out=None, dtype=None):
     """
     Computes the Inverse Discrete Cosine Transform (IDCT) of a
-    vector of DCT coefficients c.
+    vector of DCT coefficients c. If c has more than one dimension,
+    the IDCT is computed for every vector along the given axis.
 
     Args:
-        c (numpy.ndarray): vector of DCT coefficients.
+        c (numpy.ndarray): vector of DCT coefficients, or array of any rank
+                            containing such vectors along axis.
         D (numpy.ndarray, optional): orthonormal basis for DCT transform.
-                                      If not provided, it will be computed.
+                                      If not provided, it will be taken from plan.
+        plan (DCTPlan, optional): plan for DCT transform. If neither D nor plan
+                                  are provided, it will be taken from the cache.
+        axis (int, optional): axis along which the IDCT is computed. Default is -1.
+        out (numpy.ndarray, optional): array with the same shape as c receiving
+                                        the samples, no new array is allocated.
+        dtype (numpy.dtype, optional): data type of the computation and of the
+                                        samples, see dct_1D.
     Returns:
-        f (numpy.ndarray): vector of N samples of the reconstructed function f,
-                            where N is the length of c.
+        f (numpy.ndarray): vector (or array) of N samples of the reconstructed
+                            function f, where N is the length of c along axis.
     """
+    c = np.asarray(c)
     if D is None:
-        D = build_dct_orthobasis(len(c))
+        if plan is None:
+            plan = get_dct_plan(c.shape[axis], dtype or np.float64)
+        D = plan.D
     # Dot product of each basis vector and DCT coefficients vector
-    f = D.T @ c
+    f = _apply_basis(c, D.T, axis, out, dtype)
     return f
@@ -1,59 +1,176 @@
-from .dct1D import dct_1D, idct_1D, build_dct_orthobasis
+import numpy as np
+from numpy.lib.array_utils import normalize_axis_tuple
+from .dct1D import get_dct_plan
 
 
-def dct_2D(f):
+def _get_plans(shape, plan, dtype=np.float64):
     """
-    Computes the Discrete Cosine Transform (DCT) of a 2D matrix representing
-    the sampled values of a function in two variables. It is done by applying
-    the DCT 1D to each column and each row of the matrix.
+    Returns the plans to transform the columns and the rows of a M x N matrix.
 
     Args:
-        f (np.ndarray): A 2D numpy array representing the sampled values of a function.
+        shape (tuple): shape (M, N) of the matrix.
+        plan (DCTPlan or tuple, optional): a single plan, used for both
+                                            columns and rows of a square
+                                            matrix, or a pair of plans
+                                            (columns plan, rows plan).
+                                            Missing plans are taken from the cache.
+        dtype (numpy.dtype, optional): data type of the plans taken from
+                                        the cache.
 
     Returns:
-        np.ndarray: A 2D numpy array containing the DCT coefficients.
+        col_plan (DCTPlan): plan of size M, used on the columns.
+        row_plan (DCTPlan): plan of size N, used on the rows.
     """
-    c = f.copy()
-    N = f.shape[0]
+    M, N = shape
 
-    # Precompute the orthonormal basis for efficiency
-    D = build_dct_orthobasis(N)
+    if plan is None:
+        col_plan, row_plan = get_dct_plan(M, dtype), get_dct_plan(N, dtype)
+    elif isinstance(plan, tuple):
+        col_plan, row_plan = plan
+    else:
+        col_plan, row_plan = plan, plan
 
-    # DCT_1D for each column
-    for i in range(N):
-        c[:, i] = dct_1D(c[:, i], D)
+    if col_plan.N != M or row_plan.N != N:
+        raise ValueError(
+            f"DCT plans of size {col_plan.N}x{row_plan.N} "
+            + f"can't transform a {M}x{N} matrix."
+        )
 
-    # DCT_1D for each row
-    for i in range(N):
-        c[i, :] = dct_1D(c[i, :], D)
-    return c
+    return col_plan, row_plan
 
 
-def idct_2D(c):
+def _transform_2D(x, plan, axes, inverse, out=None, dtype=None):
     """
-    Computes the Inverse Discrete Cosine Transform (IDCT) of a 2D matrix representing
-    the DCT coefficients of a function in two variables. It is done by appling the
-    IDCT 1D to each column and each row of the coefficients matrix.
+    Applies the 2D DCT (or IDCT) to the M x N matrices of x lying on the
+    given pair of axes. The axes are moved last, so that the transform of
+    the whole stack of matrices is two broadcast matrix products:
+    D_M @ x @ D_N^T for the DCT and D_M^T @ x @ D_N for the IDCT.
+    The result is written in out if given. If dtype is given, both products
+    are computed in that type.
+    """
+    x = np.asarray(x)
+    axes = normalize_axis_tuple(axes, x.ndim)
+    if len(axes) != 2:
+        raise ValueError("The 2D transform needs exactly two axes.")
+
+    # View of x with the matrices on the last two axes
+    moved = np.moveaxis(x, axes, (-2, -1))
+    col_plan, row_plan = _get_plans(moved.shape[-2:], plan, dtype or np.float64)
+
+    col_basis = col_plan.D.T if inverse else col_plan.D
+    row_basis = row_plan.D if inverse else row_plan.D.T
+
+    # 1D transform of each column, the intermediate result goes in a scratch buffer
+    tmp = col_plan.scratch(moved.shape, dtype or np.result_type(col_plan.D, x))
+    np.matmul(col_basis, moved, out=tmp, dtype=dtype)
+
+    # 1D transform of each row
+    moved_out = None if out is None else np.moveaxis(out, axes, (-2, -1))
+    y = np.matmul(tmp, row_basis, out=moved_out, dtype=dtype)
+
+    if out is not None:
+        return out
+    return np.moveaxis(y, (-2, -1), axes)
+
+
+def _backend_transform_2D(x, axes, backend, inverse, out=None, dtype=None):
+    """
+    Applies the 2D DCT (or IDCT) of a registered backend to the matrices
+    of x lying on the given pair of axes. The result is written in out if given.
+    If dtype is given, x is converted to it before the transform.
+    """
+    # Imported here since the backends module is built on top of this one
+    from .backends import get_backend
+
+    x = np.asarray(x, dtype=dtype)
+    axes = normalize_axis_tuple(axes, x.ndim)
+    if len(axes) != 2:
+        raise ValueError("The 2D transform needs exactly two axes.")
+
+    moved = np.moveaxis(x, axes, (-2, -1))
+    selected = get_backend(backend, moved.shape[-2:], np.result_type(x.dtype, 1.0))
+    moved_out = None if out is None else np.moveaxis(out, axes, (-2, -1))
+    transform = selected.inverse if inverse else selected.forward
+    y = transform(moved, out=moved_out)
+
+    if out is not None:
+        return out
+    return np.moveaxis(y, (-2, -1), axes)
+
+
+def dct_2D(f, plan=None, axes=(-2, -1), backend="matmul", out=None, dtype=None):
+    """
+    Computes the Discrete Cosine Transform (DCT) of a 2D matrix representing
+    the sampled values of a function in two variables. It is done by applying
+    the DCT 1D to each column and each row of the matrix, written as two
+    matrix products: C = D_M @ f @ D_N^T, where D_M and D_N are the
+    orthonormal bases of size M and N.
+    If f has more than two dimensions, the DCT is computed for every matrix
+    lying on the given axes, like scipy.fft.dctn does.
 
     Args:
-        c (np.ndarray): A 2D numpy array containing the DCT coefficients.
+        f (np.ndarray): A M x N numpy array representing the sampled values of a
+                        function, or an array of any rank containing such matrices.
+        plan (DCTPlan or tuple, optional): plan for DCT transform, or pair of
+                                            plans (columns plan, rows plan) for
+                                            a non square matrix. If not provided,
+                                            they will be taken from the cache.
+        axes (tuple, optional): the two axes holding the columns and rows of
+                                the matrices. Default is the last two axes.
+        backend (str, optional): name of the transform backend to use, see
+                                dct.backends. Default is "matmul", the two matrix
+                                products described above, which is the only one
+                                using plan. "auto" selects the fastest one.
+        out (np.ndarray, optional): array with the same shape as f receiving the
+                                    coefficients. With the "matmul" backend no new
+                                    array is allocated, the intermediate product
+                                    goes in a scratch buffer of the plan.
+        dtype (np.dtype, optional): data type of the computation and of the
+                                    coefficients, e.g. np.float32 for a faster
+                                    transform moving half the bytes. The plans
+                                    are taken from the cache for this type.
+                                    By default float64, or the type of plan.
 
     Returns:
-        np.ndarray: A 2D numpy array representing the reconstructed function.
+        np.ndarray: A numpy array with the same shape as f containing the DCT coefficients.
     """
+    if backend != "matmul":
+        return _backend_transform_2D(f, axes, backend, False, out, dtype)
+    return _transform_2D(f, plan, axes, inverse=False, out=out, dtype=dtype)
 
-    f = c.copy()
-    N = f.shape[0]
 
-    # Precompute orthonormal basis for efficiency
-    D = build_dct_orthobasis(N)
-
-    # IDCT_1D for each column
-    for i in range(N):
-        f[:, i] = idct_1D(f[:, i], D)
+def idct_2D(c, plan=None, axes=(-2, -1), backend="matmul", out=None, dtype=None):
+    """
+    Computes the Inverse Discrete Cosine Transform (IDCT) of a 2D matrix representing
+    the DCT coefficients of a function in two variables. It is done by appling the
+    IDCT 1D to each column and each row of the coefficients matrix, written as two
+    matrix products: f = D_M^T @ C @ D_N.
+    If c has more than two dimensions, the IDCT is computed for every matrix
+    lying on the given axes.
 
-    # IDCT_1D for each row
-    for i in range(N):
-        f[i, :] = idct_1D(f[i, :], D)
+    Args:
+        c (np.ndarray): A M x N numpy array containing the DCT coefficients, or an
+                        array of any rank containing such matrices.
+        plan (DCTPlan or tuple, optional): plan for DCT transform, or pair of
+                                            plans (columns plan, rows plan) for
+                                            a non square matrix. If not provided,
+                                            they will be taken from the cache.
+        axes (tuple, optional): the two axes holding the columns and rows of
+                                the matrices. Default is the last two axes.
+        backend (str, optional): name of the transform backend to use, see
+                                dct.backends. Default is "matmul", the two matrix
+                                products described above, which is the only one
+                                using plan. "auto" selects the fastest one.
+        out (np.ndarray, optional): array with the same shape as c receiving the
+                                    reconstructed function. With the "matmul"
+                                    backend no new array is allocated.
+        dtype (np.dtype, optional): data type of the computation and of the
+                                    result, see dct_2D.
 
-    return f
+    Returns:
+        np.ndarray: A numpy array with the same shape as c representing the
+                    reconstructed function.
+    """
+    if backend != "matmul":
+        return _backend_transform_2D(c, axes, backend, True, out, dtype)
+    return _transform_2D(c, plan, axes, inverse=True, out=out, dtype=dtype)
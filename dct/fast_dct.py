@@ -0,0 +1,148 @@
+import numpy as np
+from functools import lru_cache
+from numpy.lib.array_utils import normalize_axis_index, normalize_axis_tuple
+
+# Maximum number of twiddle factor vectors kept in memory at the same time
+TWIDDLE_CACHE_SIZE = 32
+
+
+@lru_cache(maxsize=TWIDDLE_CACHE_SIZE)
+def _twiddles(N):
+    """
+    Computes the twiddle factors alpha_k * e^(-iπk/2N) for k = 0, ..., N-1
+    used to turn the FFT of the reordered samples into DCT coefficients.
+    alpha_k are the same normalization factors as build_dct_orthobasis,
+    so the result is the orthonormal DCT.
+
+    Args:
+        N (int): size of the vectors to transform.
+
+    Returns:
+        w (numpy.ndarray): read-only complex vector of N twiddle factors.
+    """
+    alpha = np.full(N, N ** (-0.5) * np.sqrt(2))  # √2/√N
+    alpha[0] = N ** (-0.5)  # 1/√N
+
+    k = np.arange(N)
+    w = alpha * np.exp(-1j * np.pi * k / (2 * N))
+    w.flags.writeable = False
+    return w
+
+
+def fast_dct_1D(f, axis=-1):
+    """
+    Computes the orthonormal Discrete Cosine Transform (DCT-II) of the vectors of f
+    along the given axis in O(N log N) operations, using Makhoul's algorithm:
+    1. Reorder the samples as v = [f_0, f_2, f_4, ..., f_5, f_3, f_1], even
+        samples first, then odd samples backwards.
+    2. Compute the FFT V of v.
+    3. The k-th DCT coefficient is Re(alpha_k * e^(-iπk/2N) * V_k).
+    The result is the same as dct_1D, up to floating point errors.
+
+    Args:
+        f (numpy.ndarray): array of any rank containing the vectors of samples.
+        axis (int, optional): axis along which the DCT is computed. Default is -1.
+
+    Returns:
+        c (numpy.ndarray): array with the same shape as f containing the DCT coefficients.
+    """
+    f = np.asarray(f)
+    axis = normalize_axis_index(axis, f.ndim)
+    x = np.moveaxis(f, axis, -1)
+    N = x.shape[-1]
+
+    # 1. Even samples, then odd samples in reverse order
+    v = np.concatenate((x[..., ::2], x[..., 1::2][..., ::-1]), axis=-1)
+
+    # 2. FFT of the real vector v, the second half of the spectrum
+    #   is the conjugate of the first one: V_k = conj(V_(N-k))
+    half = np.fft.rfft(v, axis=-1)
+    V = np.concatenate((half, half[..., 1 : (N + 1) // 2][..., ::-1].conj()), axis=-1)
+
+    # 3. Rotate and scale each frequency
+    c = (V * _twiddles(N)).real
+
+    return np.moveaxis(c, -1, axis)
+
+
+def fast_idct_1D(c, axis=-1):
+    """
+    Computes the orthonormal Inverse Discrete Cosine Transform (DCT-III) of the
+    vectors of c along the given axis in O(N log N) operations, inverting the
+    steps of fast_dct_1D:
+    1. Build the spectrum V_k = e^(iπk/2N) * (X_k - i X_(N-k)), where X_k are
+        the coefficients without the alpha_k normalization and X_N = 0.
+    2. Compute the inverse FFT v of V.
+    3. Put back the samples in their original order.
+
+    Args:
+        c (numpy.ndarray): array of any rank containing the vectors of DCT coefficients.
+        axis (int, optional): axis along which the IDCT is computed. Default is -1.
+
+    Returns:
+        f (numpy.ndarray): array with the same shape as c containing the
+                            reconstructed samples.
+    """
+    c = np.asarray(c)
+    axis = normalize_axis_index(axis, c.ndim)
+    X = np.moveaxis(c, axis, -1)
+    N = X.shape[-1]
+
+    # 1. Only the first half of the spectrum is needed, v is real.
+    #   conj(w_k) / alpha_k^2 = e^(iπk/2N) / alpha_k removes the normalization
+    w = _twiddles(N)[: N // 2 + 1]
+    alpha = np.abs(w)
+    reversed_X = np.zeros_like(X[..., : N // 2 + 1])
+    reversed_X[..., 1:] = X[..., : N - N // 2 - 1 : -1]
+    V = (X[..., : N // 2 + 1] - 1j * reversed_X) * (w.conj() / alpha**2)
+
+    # 2. Inverse FFT
+    v = np.fft.irfft(V, n=N, axis=-1)
+
+    # 3. Even samples are in the first half, odd samples in reverse order in the second
+    f = np.empty_like(v)
+    f[..., ::2] = v[..., : (N + 1) // 2]
+    f[..., 1::2] = v[..., (N + 1) // 2 :][..., ::-1]
+
+    return np.moveaxis(f, -1, axis)
+
+
+def fast_dct_2D(f, axes=(-2, -1)):
+    """
+    Computes the orthonormal Discrete Cosine Transform (DCT) of the matrices of f
+    lying on the given axes in O(MN log(MN)) operations, by applying fast_dct_1D
+    to each column and each row.
+
+    Args:
+        f (numpy.ndarray): M x N array of samples, or array of any rank containing
+                            such matrices.
+        axes (tuple, optional): the two axes holding the columns and rows of
+                                the matrices. Default is the last two axes.
+
+    Returns:
+        c (numpy.ndarray): array with the same shape as f containing the DCT coefficients.
+    """
+    f = np.asarray(f)
+    col_axis, row_axis = normalize_axis_tuple(axes, f.ndim)
+    return fast_dct_1D(fast_dct_1D(f, axis=col_axis), axis=row_axis)
+
+
+def fast_idct_2D(c, axes=(-2, -1)):
+    """
+    Computes the orthonormal Inverse Discrete Cosine Transform (IDCT) of the matrices
+    of c lying on the given axes in O(MN log(MN)) operations, by applying
+    fast_idct_1D to each column and each row.
+
+    Args:
+        c (numpy.ndarray): M x N array of DCT coefficients, or array of any rank
+                            containing such matrices.
+        axes (tuple, optional): the two axes holding the columns and rows of
+                                the matrices. Default is the last two axes.
+
+    Returns:
+        f (numpy.ndarray): array with the same shape as c containing the
+                            reconstructed samples.
+    """
+    c = np.asarray(c)
+    col_axis, row_axis = normalize_axis_tuple(axes, c.ndim)
+    return fast_idct_1D(fast_idct_1D(c, axis=col_axis), axis=row_axis)
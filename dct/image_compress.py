@@ -1,20 +1,33 @@
 import numpy as np
 import math
-from scipy.fft import dct, idct
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
 from PIL import Image
+from .backends import get_backend
+from .dct1D import get_dct_plan
+from .stats import NO_STATS
+from .truncated import truncated_dct_2D, truncated_idct_2D
+
+# Number of bands the image is split in when the progress is reported
+PROGRESS_BANDS = 16
 
 
 def _subdivide_image(pixels, f):
     """
     Subdivides an image into F x F blocks represented as matrices of pixel values.
+    The blocks are returned as a single 4D tensor which is a view on the original
+    pixels, so no data is copied. Pixels that do not fit in a whole block
+    (right and bottom borders) are discarded.
 
     Args:
         pixels (np.ndarray): 2D array of pixel values representing the image.
         f (int): size of the blocks to subdivide the image into.
 
     Returns:
-        blocks (list): list of 2D arrays representing the F x F blocks
-                        of the image. The blocks are ordered row-wise.
+        blocks (np.ndarray): 4D array of shape (n_rows, n_cols, F, F), where
+                        blocks[i, j] is the F x F block in the i-th row of
+                        blocks and j-th column of blocks.
         n_rows (int): number of rows of blocks contained in the image.
                         Corresponds to the number of the number of F x F
                         blocks that fit in the image vertically.
@@ -25,56 +38,449 @@ def _subdivide_image(pixels, f):
 
     height, width = pixels.shape
 
-    # Array of matrices representing each block
-    blocks = []
-
     # Getting number of rows of blocks in the image
     n_rows = math.floor(height / f)
 
     # Getting number of columns of blocks in the image
     n_cols = math.floor(width / f)
 
-    # Looping through rows
-    for i in range(n_rows):
-        # Looping through columns
-        for j in range(n_cols):
-            block = pixels[i * f : (i + 1) * f, j * f : (j + 1) * f]
-            blocks.append(block)
+    # Crop the image to a whole number of blocks, then split each axis in
+    # (block index, offset in block) and bring the block indices first
+    cropped = pixels[: n_rows * f, : n_cols * f]
+    blocks = cropped.reshape(n_rows, f, n_cols, f).swapaxes(1, 2)
 
     return blocks, n_rows, n_cols
 
 
-def _rebuild_image(blocks, n_rows, n_cols):
+def _rebuild_image(blocks):
     """
-    Rebuilds an image starting from a list of F x F blocks. It does so by stacking
-    the blocks horizontally based on the number of blocks in each row, and then
-    stacking the resulting rows vertically.
+    Rebuilds an image starting from a 4D tensor of F x F blocks, as returned
+    by _subdivide_image. It is the inverse operation of the subdivision.
 
     Args:
-        blocks (list): list of 2D arrays representing the F x F blocks of the image.
-        n_rows (int): number of rows of blocks contained in the image.
-                        Corresponds to the number of the number of F x F
-                        blocks that fit in the image vertically.
-        n_cols (int): number of columns of blocks contained in the image.
-                        Corresponds to the number of F x F blocks that fit
-                        in the image horizontally.
+        blocks (np.ndarray): 4D array of shape (n_rows, n_cols, F, F)
+                        containing the blocks of the image.
     Returns:
         image (np.ndarray): 2D array of pixel values representing the original image.
     """
 
-    rows = []
-
-    for i in range(n_rows):
-        # Build image row by row through concatenation of cols
-        rows.append(np.hstack(blocks[i * n_cols : (i + 1) * n_cols]))
+    n_rows, n_cols, f, _ = blocks.shape
 
-    # Stack rows to build image
-    image = np.vstack(rows)
+    # Bring the offsets in block next to their block index and merge them
+    image = blocks.swapaxes(1, 2).reshape(n_rows * f, n_cols * f)
 
     return image
 
 
-def jpg_compression(image, f, d):
+@lru_cache(maxsize=None)
+def _diagonal_mask(f, d):
+    """
+    Builds the boolean mask of the DCT coefficients that are cut when
+    compressing a F x F block with parameter d, meaning all coefficients
+    with indices (i, j) where i + j >= d.
+
+    Args:
+        f (int): size of the blocks.
+        d (int): index of the first diagonal to be cut.
+
+    Returns:
+        mask (np.ndarray): F x F read-only boolean array, True where the
+                            coefficient has to be zeroed.
+    """
+    i, j = np.indices((f, f))
+    mask = i + j >= d
+    # The mask is shared between calls, make sure nobody modifies it
+    mask.flags.writeable = False
+    return mask
+
+
+def _forward_blocks(
+    blocks, f, d, backend="scipy", out=None, stats=NO_STATS, dtype=np.float64
+):
+    """
+    Computes the DCT coefficients of all the blocks of an image at once and
+    cuts the ones to the right of the d-th diagonal.
+
+    Args:
+        blocks (np.ndarray): array of shape (..., F, F) containing the blocks.
+        f (int): size of the blocks.
+        d (int): parameter that determines how many coefficients to keep.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        out (np.ndarray, optional): float array with the same shape as blocks
+                                    receiving the coefficients.
+        stats (CompressionStats, optional): collector of the time of the
+                                    "forward_dct" and "cut" stages.
+        dtype (np.dtype, optional): floating point type of the coefficients.
+
+    Returns:
+        coeff (np.ndarray): array with the same shape as blocks containing
+                            the truncated DCT coefficients of each block.
+    """
+    transform = get_backend(backend, (f, f), dtype)
+
+    # The backends compute in the type of their input, pixels are promoted
+    # to float64 unless converted first. With a workspace they are always
+    # copied into it, since the backends would otherwise allocate a float
+    # copy of integer pixels on each call
+    if out is not None or np.result_type(blocks.dtype, 1.0) != dtype:
+        with stats.stage("convert"):
+            if out is None:
+                out = np.empty(blocks.shape, dtype=dtype)
+            out[...] = blocks
+            blocks = out
+
+    # 1. Apply DCT to each block: 1D DCT to columns, then rows
+    with stats.stage("forward_dct"):
+        coeff = transform.forward(blocks, out=out)
+
+    # 2. Cut values to the right of d-th diagonal in every block
+    with stats.stage("cut"):
+        coeff[..., _diagonal_mask(f, d)] = 0
+
+    return coeff
+
+
+def _inverse_blocks(coeff, backend="scipy", out=None, overwrite=False, stats=NO_STATS):
+    """
+    Rebuilds the pixels of all the blocks of an image at once from their
+    (truncated) DCT coefficients.
+
+    Args:
+        coeff (np.ndarray): array of shape (..., F, F) containing the DCT
+                            coefficients of each block.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        out (np.ndarray, optional): uint8 array (or view) with the same shape as
+                                    coeff receiving the pixels.
+        overwrite (bool, optional): if True, coeff is used as workspace and
+                                    its content is lost.
+        stats (CompressionStats, optional): collector of the time of the
+                                    "inverse_dct" and "round_clip" stages.
+
+    Returns:
+        blocks (np.ndarray): uint8 array with the same shape as coeff
+                                containing the pixels of each block.
+    """
+    f = coeff.shape[-1]
+    transform = get_backend(backend, (f, f), coeff.dtype)
+
+    # 3. Apply IDCT: 1D IDCT to columns, then rows
+    with stats.stage("inverse_dct"):
+        blocks = transform.inverse(coeff, out=coeff if overwrite else None)
+
+    return _round_clip(blocks, out, stats)
+
+
+def _round_clip(blocks, out=None, stats=NO_STATS):
+    """
+    Turns the float pixels rebuilt by the IDCT into uint8 pixels, using blocks
+    as workspace.
+
+    Args:
+        blocks (np.ndarray): float array of the pixels of the blocks.
+        out (np.ndarray, optional): uint8 array (or view) with the same shape as
+                                    blocks receiving the pixels.
+        stats (CompressionStats, optional): collector of the time of the
+                                    "round_clip" stage.
+
+    Returns:
+        blocks (np.ndarray): uint8 array of the pixels.
+    """
+    # 4. Round values, then clip to [0, 255]
+    #   np.rint: rounds elements to nearest integer
+    #   np.clip: sets elements < min to min and elements > max to max
+    with stats.stage("round_clip"):
+        np.rint(blocks, out=blocks)
+        np.clip(blocks, 0, 255, out=blocks)
+
+        if out is None:
+            return blocks.astype(np.uint8)
+        out[...] = blocks
+        return out
+
+
+def _compress_blocks(
+    blocks,
+    f,
+    d,
+    backend="scipy",
+    out=None,
+    workspace=False,
+    stats=NO_STATS,
+    dtype=np.float64,
+    truncated=False,
+):
+    """
+    Applies the compression to all the blocks of an image at once.
+    Each step works on the whole block tensor, so there is no
+    Python loop over the blocks.
+
+    Args:
+        blocks (np.ndarray): array of shape (..., F, F) containing the blocks.
+        f (int): size of the blocks.
+        d (int): parameter that determines how many coefficients to keep.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        out (np.ndarray, optional): uint8 array (or view) with the same shape as
+                                    blocks receiving the compressed blocks.
+        workspace (bool, optional): if True, the coefficients are computed in a
+                                    per-thread scratch buffer of the DCT plan of
+                                    size F, reused by the following calls.
+        stats (CompressionStats, optional): collector of the time of the stages.
+        dtype (np.dtype, optional): floating point type of the computation.
+        truncated (bool, optional): if True, only the kept coefficients are
+                                    computed, with the truncated transforms of
+                                    dct.truncated instead of the backend.
+
+    Returns:
+        compressed_blocks (np.ndarray): uint8 array with the same shape as
+                                        blocks containing the compressed blocks.
+    """
+    if truncated:
+        with stats.stage("forward_dct"):
+            packed = truncated_dct_2D(blocks, d, dtype)
+        with stats.stage("inverse_dct"):
+            pixels = truncated_idct_2D(packed, f, d)
+        return _round_clip(pixels, out, stats)
+
+    coeff = None
+    if workspace:
+        coeff = get_dct_plan(f).scratch(blocks.shape, dtype, name="coefficients")
+
+    coeff = _forward_blocks(blocks, f, d, backend, coeff, stats, dtype)
+    return _inverse_blocks(coeff, backend, out=out, overwrite=True, stats=stats)
+
+
+def _compress_band(
+    pixels,
+    out,
+    f,
+    d,
+    backend,
+    start,
+    stop,
+    workspace=False,
+    stats=NO_STATS,
+    dtype=np.float64,
+    truncated=False,
+):
+    """
+    Compresses the rows of blocks in [start, stop) of an image, writing the
+    result directly in the corresponding blocks of the output image.
+
+    Args:
+        pixels (np.ndarray): 2D array of pixel values of the whole image.
+        out (np.ndarray): 2D uint8 array of shape (n_rows * F, n_cols * F)
+                            receiving the compressed image.
+        f (int): size of the blocks.
+        d (int): parameter that determines how many coefficients to keep.
+        backend (str): name of the transform backend, see dct.backends.
+        start (int): index of the first row of blocks of the band.
+        stop (int): index of the row of blocks after the last one of the band.
+        workspace (bool, optional): reuse the scratch buffers of the DCT plan,
+                                    see _compress_blocks.
+        stats (CompressionStats, optional): collector of the time of the stages.
+        dtype (np.dtype, optional): floating point type of the computation.
+        truncated (bool, optional): use the truncated transforms, see
+                                    _compress_blocks.
+    """
+    # Views on the blocks of the band, in the input and in the output
+    blocks, _, _ = _subdivide_image(pixels[start * f : stop * f], f)
+    out_blocks, _, _ = _subdivide_image(out[start * f : stop * f], f)
+    _compress_blocks(
+        blocks, f, d, backend, out_blocks, workspace, stats, dtype, truncated
+    )
+
+
+def _compress_shared_band(
+    pixels_spec, out_spec, f, d, backend, start, stop, dtype, truncated
+):
+    """
+    Same as _compress_band, for a worker process. The input and output images
+    live in shared memory, only their (name, shape, dtype) specs are sent to
+    the worker, so no pixel is pickled.
+    """
+    pixels_shm = SharedMemory(name=pixels_spec[0])
+    out_shm = SharedMemory(name=out_spec[0])
+    try:
+        pixels = np.ndarray(pixels_spec[1], dtype=pixels_spec[2], buffer=pixels_shm.buf)
+        out = np.ndarray(out_spec[1], dtype=out_spec[2], buffer=out_shm.buf)
+        _compress_band(
+            pixels, out, f, d, backend, start, stop, dtype=dtype, truncated=truncated
+        )
+    finally:
+        # Views on the buffers must be released before closing them
+        del pixels, out
+        pixels_shm.close()
+        out_shm.close()
+
+
+def _split_bands(n_rows, n_bands):
+    """
+    Splits the rows of blocks [0, n_rows) in at most n_bands contiguous
+    bands of (almost) the same size.
+
+    Returns:
+        bands (list): list of (start, stop) pairs.
+    """
+    bounds = np.linspace(0, n_rows, min(n_bands, n_rows) + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _run_bands(n_rows, func, progress=None):
+    """
+    Calls func(start, stop) on horizontal bands of rows of blocks covering
+    [0, n_rows). Without a progress callback there is a single band, otherwise
+    PROGRESS_BANDS bands and progress(done, total) is called after each one.
+    """
+    if progress is None:
+        func(0, n_rows)
+        return
+
+    bands = _split_bands(n_rows, PROGRESS_BANDS)
+    for done, (start, stop) in enumerate(bands, start=1):
+        func(start, stop)
+        progress(done, len(bands))
+
+
+def _sub_progress(progress, index, count):
+    """
+    Turns the progress callback of a task made of count steps into the
+    callback of its index-th step.
+    """
+    if progress is None:
+        return None
+    return lambda done, total: progress(index * total + done, count * total)
+
+
+def _compress_parallel(
+    pixels,
+    out,
+    f,
+    d,
+    backend,
+    workers,
+    executor,
+    progress=None,
+    stats=NO_STATS,
+    dtype=np.float64,
+    truncated=False,
+):
+    """
+    Compresses an image on a pool of threads or processes, each task
+    compressing a horizontal band of whole rows of blocks.
+
+    Args:
+        pixels (np.ndarray): 2D array of pixel values of the whole image.
+        out (np.ndarray): 2D uint8 array receiving the compressed image.
+        f (int): size of the blocks.
+        d (int): parameter that determines how many coefficients to keep.
+        backend (str): name of the transform backend, see dct.backends.
+        workers (int): number of threads or processes.
+        executor (str): "thread" or "process".
+        progress (callable, optional): called as progress(done, total) after
+                                        each band is compressed.
+        stats (CompressionStats, optional): collector of the time of the
+                                        stages. The stages run by worker
+                                        processes are timed as a whole, as
+                                        "process_pool".
+        dtype (np.dtype, optional): floating point type of the computation.
+        truncated (bool, optional): use the truncated transforms, see
+                                        _compress_blocks.
+    """
+    # A few bands per worker, so that a slower worker doesn't delay the end
+    bands = _split_bands(out.shape[0] // f, 4 * workers)
+
+    def wait(futures):
+        try:
+            for done, future in enumerate(futures, start=1):
+                future.result()
+                if progress is not None:
+                    progress(done, len(futures))
+        except BaseException:
+            # Don't start the bands still waiting
+            for future in futures:
+                future.cancel()
+            raise
+
+    if executor == "thread":
+        with ThreadPoolExecutor(workers) as pool:
+            wait(
+                [
+                    pool.submit(
+                        _compress_band,
+                        pixels,
+                        out,
+                        f,
+                        d,
+                        backend,
+                        start,
+                        stop,
+                        stats=stats,
+                        dtype=dtype,
+                        truncated=truncated,
+                    )
+                    for start, stop in bands
+                ]
+            )
+        return
+
+    if executor != "process":
+        raise ValueError(f'Unknown executor {executor!r}, use "thread" or "process".')
+
+    # Only the part of the image covered by blocks is needed
+    pixels = pixels[: out.shape[0], : out.shape[1]]
+    pixels_shm = SharedMemory(create=True, size=max(pixels.nbytes, 1))
+    out_shm = None
+    shared_pixels = None
+    try:
+        out_shm = SharedMemory(create=True, size=max(out.nbytes, 1))
+        shared_pixels = np.ndarray(pixels.shape, pixels.dtype, buffer=pixels_shm.buf)
+        shared_pixels[...] = pixels
+        pixels_spec = (pixels_shm.name, pixels.shape, pixels.dtype.str)
+        out_spec = (out_shm.name, out.shape, out.dtype.str)
+
+        with stats.stage("process_pool"), ProcessPoolExecutor(workers) as pool:
+            wait(
+                [
+                    pool.submit(
+                        _compress_shared_band,
+                        pixels_spec,
+                        out_spec,
+                        f,
+                        d,
+                        backend,
+                        start,
+                        stop,
+                        dtype,
+                        truncated,
+                    )
+                    for start, stop in bands
+                ]
+            )
+
+        out[...] = np.ndarray(out.shape, out.dtype, buffer=out_shm.buf)
+    finally:
+        # Views on the buffers must be released before closing them
+        del shared_pixels
+        for shm in (pixels_shm, out_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+
+def jpg_compression(
+    image,
+    f,
+    d,
+    backend="scipy",
+    workers=1,
+    executor="thread",
+    out=None,
+    progress=None,
+    stats=None,
+    dtype=np.float64,
+    truncated=False,
+    metrics=False,
+):
     """
     Compresses a specified image using a version of the JPEG compression
     algorithm without quantization matrix. Works on square images.
@@ -91,49 +497,214 @@ def jpg_compression(image, f, d):
             them to the range [0, 255].
     3. Rebuild the original image by stacking the blocks in the correct order.
 
+    The steps in 2. are applied to all the blocks in a single pass, working
+    on a (n_rows, n_cols, F, F) tensor of blocks. With more than one worker,
+    the image is split in horizontal bands of whole rows of blocks which are
+    compressed in parallel. The result is the same for any number of workers.
+
     Args:
         image (PIL.Image): the image to be compressed to JPEG format.
         F (int): size of the blocks to subdivide the image into.
         d (int): parameter that determines how many coefficients to keep,
                     deciding how much compression will be applied to the image.
+        backend (str, optional): name of the backend computing the DCT and IDCT,
+                    see dct.backends. Default is "scipy". "auto" uses the fastest
+                    backend on this machine for the given F, found by a one-time
+                    calibration stored in dct.backends.TUNING_FILE.
+        workers (int, optional): number of threads or processes compressing
+                    the image in parallel. Default is 1, no parallelism.
+        executor (str, optional): "thread" (default) to use a pool of threads,
+                    "process" to use a pool of processes sharing the input
+                    and output pixels through shared memory.
+        out (np.ndarray, optional): uint8 array of shape (n_rows * F, n_cols * F)
+                    receiving the compressed image, where n_rows and n_cols are
+                    the number of blocks that fit in the image. The returned image
+                    shares its memory. The intermediate arrays also come from
+                    buffers reused between calls and the transforms run in
+                    place in them, so compressing a stream of images of the
+                    same size allocates no new memory beyond a fixed
+                    workspace and the array of pixels of the image (except
+                    with the "fft" backend).
+        progress (callable, optional): function called as progress(done, total)
+                    each time one of the total bands of rows of blocks is
+                    compressed. An exception raised by it stops the compression,
+                    which lets the caller cancel it.
+        stats (dct.stats.CompressionStats, optional): collector receiving the
+                    time (and peak memory) of each stage of the compression:
+                    "asarray", "convert" (with out or a dtype other than float64),
+                    "forward_dct", "cut", "inverse_dct", "round_clip" and
+                    "fromarray". Default is None, nothing is measured.
+        dtype (np.dtype, optional): floating point type the DCT, the IDCT and
+                    the intermediate coefficients are computed in. Default is
+                    np.float64. np.float32 is a faster mode moving half the
+                    bytes, whose pixels differ from the float64 ones by at most
+                    one gray level, where a value falls close to a rounding
+                    boundary.
+        truncated (bool, optional): if True, only the coefficients with
+                    i + j < d are computed, using the first d rows of the DCT
+                    basis (see dct.truncated), and backend is not used. The
+                    result is the same up to floating point errors. It is
+                    faster for small d, about up to d = F / 2 + 2, and slower
+                    when most coefficients are kept. Default is False.
+        metrics (bool, optional): if True, the quality of the compressed image
+                    is measured against the original pixels, still in memory,
+                    and stored in compressed_image.info["metrics"]: "mse",
+                    "psnr" and "ssim", see dct.metrics.compression_metrics.
+                    This is the "metrics" stage. Default is False.
 
     Returns:
         compressed_image (PIL.Image): the compressed image in JPEG format.
     """
+    if stats is None:
+        stats = NO_STATS
+    dtype = np.dtype(dtype)
 
     # Get pixel values as a numpy matrix
-    pixels = np.asarray(image)
+    with stats.stage("asarray"):
+        pixels = np.asarray(image)
+
+    # Number of FxF blocks that fit in the image
+    n_rows, n_cols = pixels.shape[0] // f, pixels.shape[1] // f
+
+    # The compressed blocks are written directly in their place in the image
+    workspace = out is not None
+    if out is None:
+        out = np.empty((n_rows * f, n_cols * f), dtype=np.uint8)
+    elif out.shape != (n_rows * f, n_cols * f) or out.dtype != np.uint8:
+        raise ValueError(
+            f"out must be a uint8 array of shape {(n_rows * f, n_cols * f)}, "
+            + f"got a {out.dtype} array of shape {out.shape}."
+        )
+
+    if workers > 1 and n_rows > 1:
+        _compress_parallel(
+            pixels,
+            out,
+            f,
+            d,
+            backend,
+            workers,
+            executor,
+            progress,
+            stats,
+            dtype,
+            truncated,
+        )
+    else:
+        _run_bands(
+            n_rows,
+            lambda start, stop: _compress_band(
+                pixels,
+                out,
+                f,
+                d,
+                backend,
+                start,
+                stop,
+                workspace,
+                stats,
+                dtype,
+                truncated,
+            ),
+            progress,
+        )
+
+    with stats.stage("fromarray"):
+        compressed_image = Image.fromarray(out)
+
+    if metrics:
+        # Imported here since dct.metrics depends on this module
+        from .metrics import compression_metrics
+
+        with stats.stage("metrics"):
+            compressed_image.info["metrics"] = compression_metrics(pixels, out, f)
 
-    # Subdividing image in FxF blocks
-    blocks, n_rows, n_cols = _subdivide_image(pixels, f)
+    return compressed_image
 
-    compressed_blocks = []
 
-    # Apply compression to each block
-    for block in blocks:
+def compute_coefficients(
+    image, f, d, backend="scipy", progress=None, stats=None, dtype=np.float64
+):
+    """
+    Computes the truncated DCT coefficients of every F x F block of an image,
+    which are the first two steps of jpg_compression. They can be turned into
+    the compressed image with reconstruct_image, or encoded to a JPEG file
+    with dct.jpeg.encode_jpeg.
 
-        # 1. Apply DCT to block: 1D DCT to columns, then rows
-        coeff = dct(dct(block, norm="ortho", axis=1), norm="ortho", axis=0)
+    Args:
+        image (PIL.Image): the image to be compressed.
+        f (int): size of the blocks to subdivide the image into.
+        d (int): parameter that determines how many coefficients to keep.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        progress (callable, optional): progress callback, see jpg_compression.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                                    the "forward_dct" and "cut" stages.
+        dtype (np.dtype, optional): floating point type of the coefficients,
+                                    see jpg_compression.
 
-        # 2. Cut values to the right of d-th diagonal
-        for i in range(f):
-            for j in range(f):
-                if i + j >= d:
-                    coeff[i, j] = 0
+    Returns:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F) where
+                                    coefficients[i, j] are the coefficients of the
+                                    block in the i-th row and j-th column of blocks.
+    """
+    if stats is None:
+        stats = NO_STATS
+    dtype = np.dtype(dtype)
+
+    blocks, n_rows, _ = _subdivide_image(np.asarray(image), f)
+    if progress is None:
+        return _forward_blocks(blocks, f, d, backend, stats=stats, dtype=dtype)
+
+    coeff = np.empty(blocks.shape, dtype=dtype)
+    _run_bands(
+        n_rows,
+        lambda start, stop: _forward_blocks(
+            blocks[start:stop], f, d, backend, coeff[start:stop], stats, dtype
+        ),
+        progress,
+    )
+    return coeff
 
-        # 3. Apply IDCT: 1D IDCT to columns, then rows
-        compressed_block = idct(idct(coeff, norm="ortho", axis=1), norm="ortho", axis=0)
 
-        # 4. Round values, then clip to [0, 255]
-        #   np.rint: rounds elements to nearest integer
-        #   np.clip: sets elements < min to min and elements > max to max
-        compressed_block = np.clip(np.rint(compressed_block), 0, 255).astype(np.uint8)
+def reconstruct_image(
+    coefficients, backend="scipy", out=None, progress=None, stats=None
+):
+    """
+    Rebuilds the compressed image from the truncated DCT coefficients returned
+    by compute_coefficients. compute_coefficients followed by reconstruct_image
+    gives the same image as jpg_compression.
 
-        compressed_blocks.append(compressed_block)
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F) of
+                                    DCT coefficients.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        out (np.ndarray, optional): uint8 array of shape (n_rows * F, n_cols * F)
+                                    receiving the image. The returned image shares
+                                    its memory.
+        progress (callable, optional): progress callback, see jpg_compression.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                                    the "inverse_dct", "round_clip" and
+                                    "fromarray" stages.
 
-    # Rebuild original image by stacking blocks horizontally and vertically
-    compressed_image = Image.fromarray(
-        _rebuild_image(compressed_blocks, n_cols=n_cols, n_rows=n_rows)
+    Returns:
+        compressed_image (PIL.Image): the compressed image.
+    """
+    if stats is None:
+        stats = NO_STATS
+
+    n_rows, n_cols, f, _ = coefficients.shape
+    if out is None:
+        out = np.empty((n_rows * f, n_cols * f), dtype=np.uint8)
+
+    # The blocks are written directly in their place in the image
+    out_blocks, _, _ = _subdivide_image(out, f)
+    _run_bands(
+        n_rows,
+        lambda start, stop: _inverse_blocks(
+            coefficients[start:stop], backend, out=out_blocks[start:stop], stats=stats
+        ),
+        progress,
     )
 
-    return compressed_image
+    with stats.stage("fromarray"):
+        return Image.fromarray(out)
@@ -0,0 +1,734 @@
+import numpy as np
+import struct
+from io import BytesIO
+from .color import color_jpg_compression, is_gray
+from .image_compress import compute_coefficients, reconstruct_image
+from .stats import NO_STATS
+
+# Size of the blocks of a JPEG image
+BLOCK_SIZE = 8
+
+# Index in the 8 x 8 block (flattened row by row) of each coefficient
+# in zig-zag order. The zig-zag scan goes through the block one
+# anti-diagonal i + j at a time, lowest frequencies first.
+ZIGZAG = np.array(
+    sorted(
+        range(64),
+        key=lambda k: (
+            k // 8 + k % 8,
+            # Odd diagonals go down, even diagonals go up
+            k // 8 if (k // 8 + k % 8) % 2 else k % 8,
+        ),
+    )
+)
+
+# Markers of the JPEG segments
+SOI = 0xD8
+EOI = 0xD9
+APP0 = 0xE0
+DQT = 0xDB
+SOF0 = 0xC0
+SOF2 = 0xC2
+DHT = 0xC4
+SOS = 0xDA
+
+# Range of the quantized coefficients allowed by baseline JPEG
+_MAX_AC = 1023
+_MAX_DC = 2047
+
+# Run length symbols of the AC coefficients
+_EOB = 0x00  # all the remaining coefficients of the block are zero
+_ZRL = 0xF0  # sixteen zero coefficients
+
+# Longest run of blocks ending with a single EOB symbol in a progressive scan
+_MAX_EOBRUN = 0x7FFF
+
+# Anti-diagonal i + j of each coefficient in zig-zag order. Each diagonal is a
+# contiguous range of the zig-zag order, so it can be sent as a progressive
+# scan of its own.
+ZIGZAG_DIAGONAL = ZIGZAG // BLOCK_SIZE + ZIGZAG % BLOCK_SIZE
+
+
+def _bit_length(values):
+    """
+    Computes the JPEG category of each value, the number of bits
+    needed to write its absolute value (0 for 0).
+
+    Args:
+        values (np.ndarray): array of integers.
+
+    Returns:
+        sizes (np.ndarray): array of categories, same shape as values.
+    """
+    # frexp writes |v| = m * 2^e with 0.5 <= m < 1, so e is the bit length
+    _, exponents = np.frexp(np.abs(values))
+    return exponents.astype(np.int32)
+
+
+def _extra_bits(values, sizes):
+    """
+    Computes the bits written after the Huffman code of each value: the value
+    itself if positive, its one's complement on sizes bits if negative.
+    """
+    values = values.astype(np.int32)
+    return np.where(values < 0, values + (1 << sizes) - 1, values)
+
+
+def _quantize(coefficients):
+    """
+    Turns the DCT coefficients of the blocks into the integers stored in the
+    JPEG stream, in zig-zag order. The quantization table is all ones, so this
+    only rounds the coefficients. JPEG applies the DCT to the pixels shifted
+    from [0, 255] to [-128, 127], which only changes the DC coefficient by
+    -128 * 8.
+
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, 8, 8).
+
+    Returns:
+        zz (np.ndarray): int32 array of shape (n_rows * n_cols, 64).
+    """
+    n_rows, n_cols, f, _ = coefficients.shape
+    if f != BLOCK_SIZE:
+        raise ValueError(f"JPEG images are made of 8x8 blocks, got {f}x{f} blocks.")
+    if n_rows * n_cols == 0:
+        raise ValueError("Can't encode an image with no blocks.")
+    if n_rows * f > 0xFFFF or n_cols * f > 0xFFFF:
+        raise ValueError("JPEG images can't be larger than 65535 pixels.")
+
+    flat = coefficients.reshape(n_rows * n_cols, 64)
+    zz = np.rint(flat[:, ZIGZAG]).astype(np.int32)
+    zz[:, 0] -= 128 * BLOCK_SIZE
+
+    # DC values in [-1024, 1023], so that their differences stay in category 11
+    np.clip(zz[:, 0], -(_MAX_DC + 1) // 2, _MAX_DC // 2, out=zz[:, 0])
+    np.clip(zz[:, 1:], -_MAX_AC, _MAX_AC, out=zz[:, 1:])
+    return zz
+
+
+def _dc_events(dc):
+    """
+    Computes the symbols of the DC coefficients of all the blocks. Each DC
+    coefficient is coded as the difference with the one of the previous block.
+
+    Args:
+        dc (np.ndarray): DC coefficients of the blocks, in scan order.
+
+    Returns:
+        symbols (np.ndarray): category of each difference, the Huffman symbol.
+        extra (np.ndarray): bits following each Huffman code.
+        extra_len (np.ndarray): number of bits following each Huffman code.
+    """
+    diff = np.diff(dc, prepend=0)
+    sizes = _bit_length(diff)
+    return sizes, _extra_bits(diff, sizes), sizes
+
+
+def _ac_events(ac):
+    """
+    Computes the run length symbols of the AC coefficients of all the blocks
+    at once. Every nonzero coefficient is coded by the symbol (run, size),
+    where run is the number of zeros before it (after any ZRL symbol standing
+    for sixteen zeros) and size is its category. The EOB symbol ends blocks
+    whose last coefficients are zero.
+
+    Args:
+        ac (np.ndarray): array of shape (n_blocks, n) of the coefficients to
+                            code for each block, in zig-zag order.
+
+    Returns:
+        symbols (np.ndarray): Huffman symbol of each event, in stream order.
+        extra (np.ndarray): bits following each Huffman code.
+        extra_len (np.ndarray): number of bits following each Huffman code.
+        counts (np.ndarray): number of events of each block.
+    """
+    n_blocks, n = ac.shape
+
+    # Nonzero coefficients, sorted by block and then by position
+    nz_blocks, nz_pos = np.nonzero(ac)
+    values = ac[nz_blocks, nz_pos]
+
+    # Position of the previous nonzero coefficient of the same block, -1 if first
+    prev_pos = np.full_like(nz_pos, -1)
+    same_block = nz_blocks[1:] == nz_blocks[:-1]
+    prev_pos[1:][same_block] = nz_pos[:-1][same_block]
+    runs = nz_pos - prev_pos - 1
+
+    # Each nonzero coefficient is preceded by one ZRL every sixteen zeros
+    n_zrl = runs // 16
+    nz_events = n_zrl + 1
+
+    # Blocks whose last coefficient is zero end with EOB
+    has_eob = ac[:, -1] == 0
+    eob_before = np.cumsum(has_eob) - has_eob
+
+    counts = np.bincount(nz_blocks, weights=nz_events, minlength=n_blocks).astype(
+        np.int32
+    )
+    counts += has_eob
+
+    # Index in the stream of the first event of each nonzero coefficient:
+    # all the events of the previous coefficients plus the EOBs of the previous blocks
+    first_event = np.cumsum(nz_events) - nz_events + eob_before[nz_blocks]
+    coeff_index = first_event + n_zrl
+
+    symbols = np.full(int(counts.sum()), _ZRL, dtype=np.int32)
+    extra = np.zeros_like(symbols)
+    extra_len = np.zeros_like(symbols)
+
+    # Every event which is not a coefficient or an EOB is a ZRL
+    sizes = _bit_length(values)
+    symbols[coeff_index] = (runs % 16) << 4 | sizes
+    extra[coeff_index] = _extra_bits(values, sizes)
+    extra_len[coeff_index] = sizes
+
+    # EOB is the last event of its block
+    symbols[(np.cumsum(counts) - 1)[has_eob]] = _EOB
+
+    return symbols, extra, extra_len, counts
+
+
+def _eob_runs(symbols, extra, extra_len):
+    """
+    Merges the EOB symbols of consecutive blocks of a progressive scan into
+    EOBRUN symbols. The EOB of a block followed by the EOB of the next one
+    means that the next block only has zeros, and the n EOBs of such a run are
+    coded by the symbol r << 4, with r the bit length of n minus one, followed
+    by the r low bits of n.
+
+    Args:
+        symbols, extra, extra_len (np.ndarray): AC events as returned by
+                                                _ac_events.
+
+    Returns:
+        symbols, extra, extra_len (np.ndarray): events with the runs merged.
+    """
+    eob = np.flatnonzero(symbols == _EOB)
+    if len(eob) == 0:
+        return symbols, extra, extra_len
+
+    # A run goes on while the EOBs are consecutive events, split every
+    # _MAX_EOBRUN blocks
+    starts_run = np.diff(eob, prepend=-2) != 1
+    run_start = np.maximum.accumulate(np.where(starts_run, np.arange(len(eob)), 0))
+    rank = np.arange(len(eob)) - run_start
+    first = rank % _MAX_EOBRUN == 0
+    lengths = np.diff(np.append(np.flatnonzero(first), len(eob)))
+
+    sizes = _bit_length(lengths) - 1
+    symbols, extra, extra_len = symbols.copy(), extra.copy(), extra_len.copy()
+    symbols[eob[first]] = sizes << 4
+    extra[eob[first]] = lengths - (1 << sizes)
+    extra_len[eob[first]] = sizes
+
+    keep = np.ones(len(symbols), dtype=bool)
+    keep[eob[~first]] = False
+    return symbols[keep], extra[keep], extra_len[keep]
+
+
+def _interleave(dc_events, ac_events):
+    """
+    Merges the DC and AC events in stream order: for each block, its DC
+    event followed by its AC events.
+
+    Args:
+        dc_events (tuple): (symbols, extra, extra_len) of the DC events, one per block.
+        ac_events (tuple): (symbols, extra, extra_len, counts) of the AC events.
+
+    Returns:
+        is_dc (np.ndarray): True for the DC events.
+        symbols, extra, extra_len (np.ndarray): merged events.
+    """
+    counts = ac_events[3]
+    n_blocks = len(counts)
+
+    # Each block starts after the events of the previous blocks
+    dc_index = np.cumsum(counts + 1) - counts - 1
+    is_dc = np.zeros(len(ac_events[0]) + n_blocks, dtype=bool)
+    is_dc[dc_index] = True
+
+    merged = []
+    for dc, ac in zip(dc_events, ac_events[:3]):
+        events = np.empty(len(is_dc), dtype=np.int32)
+        events[is_dc] = dc
+        events[~is_dc] = ac
+        merged.append(events)
+
+    return (is_dc, *merged)
+
+
+def _huffman_table(freqs):
+    """
+    Builds the optimal Huffman code for symbols with the given frequencies,
+    with codes no longer than 16 bits and no code made only of ones, following
+    sections K.2 and K.3 of the JPEG standard.
+
+    Args:
+        freqs (np.ndarray): number of occurrences of each symbol (up to 256).
+
+    Returns:
+        bits (list): bits[i] is the number of codes of length i + 1, for i < 16.
+        huffval (list): symbols sorted by code length.
+        codes (np.ndarray): code of each symbol.
+        lengths (np.ndarray): length of the code of each symbol, 0 if unused.
+    """
+    freq = [int(x) for x in freqs] + [1]  # the reserved symbol takes the all ones code
+    n_symbols = len(freq)
+    code_size = [0] * n_symbols
+    others = [-1] * n_symbols
+
+    # Merge the two least frequent trees until only one is left
+    while True:
+        used = [v for v in range(n_symbols) if freq[v] > 0]
+        if len(used) < 2:
+            break
+        # Least frequent symbols, the largest value first on ties
+        used.sort(key=lambda v: (freq[v], -v))
+        v1, v2 = used[0], used[1]
+
+        freq[v1] += freq[v2]
+        freq[v2] = 0
+
+        code_size[v1] += 1
+        while others[v1] != -1:
+            v1 = others[v1]
+            code_size[v1] += 1
+        others[v1] = v2
+
+        code_size[v2] += 1
+        while others[v2] != -1:
+            v2 = others[v2]
+            code_size[v2] += 1
+
+    # Count the codes of each length
+    count = [0] * 33
+    for size in code_size:
+        if size:
+            count[size] += 1
+
+    # Shorten the codes longer than 16 bits
+    i = 32
+    while i > 16:
+        if count[i] > 0:
+            j = i - 2
+            while count[j] == 0:
+                j -= 1
+            count[i] -= 2
+            count[i - 1] += 1
+            count[j + 1] += 2
+            count[j] -= 1
+        else:
+            i -= 1
+
+    # Remove the reserved code, which is the longest one
+    while count[i] == 0:
+        i -= 1
+    count[i] -= 1
+
+    huffval = sorted(
+        (v for v in range(n_symbols - 1) if code_size[v]), key=lambda v: code_size[v]
+    )
+
+    # Canonical codes: consecutive integers, shifted when the length grows
+    codes = np.zeros(n_symbols - 1, dtype=np.int32)
+    lengths = np.zeros(n_symbols - 1, dtype=np.int32)
+    code = 0
+    k = 0
+    for length in range(1, 17):
+        for _ in range(count[length]):
+            codes[huffval[k]] = code
+            lengths[huffval[k]] = length
+            code += 1
+            k += 1
+        code <<= 1
+
+    return count[1:17], huffval, codes, lengths
+
+
+def _pack_bits(values, lengths):
+    """
+    Writes a sequence of codes to bytes, most significant bit first, all at once.
+    The last byte is padded with ones and a zero byte is stuffed after every
+    0xFF byte, as required in the entropy coded data of JPEG.
+
+    Args:
+        values (np.ndarray): value of each code.
+        lengths (np.ndarray): number of bits of each code, at most 32.
+
+    Returns:
+        data (bytes): the packed and stuffed bits.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+
+    # Pad the last byte with ones
+    total = int(lengths.sum())
+    padding = -total % 8
+    values = np.append(values, np.uint64((1 << padding) - 1))
+    lengths = np.append(lengths, padding)
+    total += padding
+
+    # Each code starts at bit offset of a 32 bits word and may overflow in the next one
+    ends = np.cumsum(lengths)
+    offsets = ends - lengths
+    words = offsets // 32
+    last = offsets % 32 + lengths  # end of the code, counted from the start of its word
+    n_words = total // 32 + 2
+
+    fits = last <= 32
+    shift = np.where(fits, 32 - last, last - 32).astype(np.uint64)
+    first = np.where(fits, values << shift, values >> shift)
+    second = np.where(fits, 0, (values << (np.uint64(64) - last.astype(np.uint64))))
+    second &= np.uint64(0xFFFFFFFF)
+
+    # Codes in the same word don't overlap, so adding them is the same as or-ing
+    # them. All the sums are below 2^32, exact in float64.
+    packed = np.bincount(words, weights=first.astype(np.float64), minlength=n_words)
+    packed += np.bincount(
+        words + 1, weights=second.astype(np.float64), minlength=n_words + 1
+    )[:n_words]
+
+    data = packed.astype(">u4").view(np.uint8)[: total // 8]
+
+    # Stuff a zero byte after each 0xFF
+    stuffed = np.insert(data, np.flatnonzero(data == 0xFF) + 1, 0)
+    return stuffed.tobytes()
+
+
+def _segment(marker, payload=b""):
+    """
+    Builds a JPEG marker segment: 0xFF, marker, length of payload + 2, payload.
+    """
+    return struct.pack(">BBH", 0xFF, marker, len(payload) + 2) + payload
+
+
+def _huffman_segment(tables):
+    """
+    Builds the DHT segment defining the given Huffman tables.
+
+    Args:
+        tables (list): list of (table class, table id, bits, huffval),
+                        class is 0 for DC tables and 1 for AC tables.
+    """
+    payload = b""
+    for table_class, table_id, bits, huffval in tables:
+        payload += bytes([table_class << 4 | table_id]) + bytes(bits) + bytes(huffval)
+    return _segment(DHT, payload)
+
+
+def _frame_header(height, width, marker):
+    """
+    Builds the segments preceding the scans of a gray scale JPEG image:
+    JFIF header, quantization table and frame header.
+    """
+    # JFIF 1.01, no units, 1:1 pixel aspect ratio, no thumbnail
+    jfif = _segment(APP0, b"JFIF\x00" + struct.pack(">BBBHHBB", 1, 1, 0, 1, 1, 0, 0))
+    # Table 0 with 8 bits values, all ones
+    quantization = _segment(DQT, bytes([0]) + bytes([1] * 64))
+    # 8 bits samples, one component with id 1, no subsampling, quantization table 0
+    frame = _segment(
+        marker, struct.pack(">BHHB", 8, height, width, 1) + bytes([1, 0x11, 0])
+    )
+    return jfif + quantization + frame
+
+
+def _entropy_code(is_dc, symbols, extra, extra_len):
+    """
+    Builds the optimal Huffman tables for the given events and codes them.
+
+    Args:
+        is_dc (np.ndarray): True for the events coded with the DC table,
+                            False for the ones coded with the AC table.
+        symbols, extra, extra_len (np.ndarray): events in stream order.
+
+    Returns:
+        tables (list): Huffman tables for the DHT segment.
+        data (bytes): the entropy coded data.
+    """
+    tables = []
+    codes = np.zeros_like(symbols)
+    code_len = np.zeros_like(symbols)
+
+    for table_class, selected, n_symbols in [(0, is_dc, 12), (1, ~is_dc, 256)]:
+        if not selected.any():
+            continue
+        table_symbols = symbols[selected]
+        bits, huffval, table_codes, table_len = _huffman_table(
+            np.bincount(table_symbols, minlength=n_symbols)
+        )
+        tables.append((table_class, 0, bits, huffval))
+        codes[selected] = table_codes[table_symbols]
+        code_len[selected] = table_len[table_symbols]
+
+    # Each Huffman code is followed by its extra bits
+    return tables, _pack_bits(codes << extra_len | extra, code_len + extra_len)
+
+
+def _scan(tables, start, end, data):
+    """
+    Builds a scan of the only component: the DHT segment of its Huffman tables,
+    its header for the coefficients start to end of the zig-zag order (no
+    successive approximation) and its entropy coded data.
+    """
+    header = _segment(SOS, bytes([1, 1, 0x00, start, end, 0]))
+    return _huffman_segment(tables) + header + data
+
+
+def _ac_scan(ac, start, end):
+    """
+    Builds the progressive scan of the AC coefficients start to end of the
+    zig-zag order of all the blocks, ac being their array of shape
+    (n_blocks, end - start + 1).
+    """
+    events = _eob_runs(*_ac_events(ac)[:3])
+    tables, data = _entropy_code(np.zeros(len(events[0]), dtype=bool), *events)
+    return _scan(tables, start, end, data)
+
+
+def _diagonal_band(diagonal):
+    """
+    Returns the first and last index in zig-zag order of an anti-diagonal.
+    """
+    band = np.flatnonzero(ZIGZAG_DIAGONAL == diagonal)
+    return int(band[0]), int(band[-1])
+
+
+def _progressive_scans(zz):
+    """
+    Codes the coefficients of the blocks as a sequence of progressive scans
+    with spectral selection: the DC coefficients first, then each anti-diagonal
+    of AC coefficients in turn. The diagonals cut by the d parameter are sent
+    too, which costs a few tens of bytes each since their blocks are coded by
+    a single EOBRUN symbol: decoders estimate the low frequencies missing from
+    a progressive image from the neighboring blocks, which would change the
+    compressed image.
+
+    Args:
+        zz (np.ndarray): quantized coefficients in zig-zag order, as returned
+                            by _quantize.
+
+    Returns:
+        scans (bytes): the scans, each with its own Huffman tables.
+    """
+    is_dc = np.ones(len(zz), dtype=bool)
+    tables, data = _entropy_code(is_dc, *_dc_events(zz[:, 0]))
+    scans = _scan(tables, 0, 0, data)
+
+    for diagonal in range(1, 2 * BLOCK_SIZE - 1):
+        start, end = _diagonal_band(diagonal)
+        scans += _ac_scan(zz[:, start : end + 1], start, end)
+
+    return scans
+
+
+def encode_jpeg(coefficients, progressive=False):
+    """
+    Encodes the DCT coefficients of the 8 x 8 blocks of a gray scale image,
+    as returned by dct.image_compress.compute_coefficients, into a baseline
+    JPEG (JFIF) file. The coefficients are written directly, without
+    computing the DCT again: they are rounded to integers (the quantization
+    table is all ones), reordered in zig-zag order, run-length coded (the
+    coefficients cut by the d parameter become a single EOB symbol) and
+    Huffman coded with tables optimized for the image.
+    All the steps work on all the blocks at once.
+
+    With progressive=True the file is a progressive JPEG instead, sending the
+    coefficients of all the blocks one anti-diagonal at a time, in the order
+    of the d parameter: the DC coefficients, then the diagonal i + j = 1, and
+    so on. A decoder can show the image from any prefix of the file, and
+    progressive_prefix cuts the file after any diagonal, giving the image
+    compressed with that d. The file is usually a few percent larger.
+
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, 8, 8) of
+                                    DCT coefficients.
+        progressive (bool, optional): write a progressive JPEG with one scan
+                                    per diagonal. Default is False.
+
+    Returns:
+        data (bytes): the JPEG file.
+    """
+    n_rows, n_cols = coefficients.shape[:2]
+    zz = _quantize(coefficients)
+
+    if progressive:
+        marker = SOF2
+        scans = _progressive_scans(zz)
+    else:
+        marker = SOF0
+        events = _interleave(_dc_events(zz[:, 0]), _ac_events(zz[:, 1:]))
+        # One scan with all the coefficients of the only component, tables 0
+        tables, data = _entropy_code(*events)
+        scans = _scan(tables, 0, 63, data)
+
+    return (
+        bytes([0xFF, SOI])
+        + _frame_header(n_rows * BLOCK_SIZE, n_cols * BLOCK_SIZE, marker)
+        + scans
+        + bytes([0xFF, EOI])
+    )
+
+
+def _split_scans(data):
+    """
+    Finds the frame header and the scans of a JPEG file written by encode_jpeg.
+
+    Args:
+        data (bytes): the JPEG file.
+
+    Returns:
+        marker (int): SOF marker of the frame, SOF0 or SOF2.
+        header_end (int): offset of the end of the frame header.
+        n_blocks (int): number of 8 x 8 blocks of the image.
+        scans (list): for each scan, the offset of its end and the index of its
+                        last coefficient in zig-zag order.
+    """
+    marker = None
+    header_end = 0
+    n_blocks = 0
+    scans = []
+    pos = 2
+    while data[pos + 1] != EOI:
+        length = struct.unpack(">H", data[pos + 2 : pos + 4])[0]
+        end = pos + 2 + length
+        if data[pos + 1] in (SOF0, SOF2):
+            marker = data[pos + 1]
+            header_end = end
+            height, width = struct.unpack(">HH", data[pos + 5 : pos + 9])
+            n_blocks = (height // BLOCK_SIZE) * (width // BLOCK_SIZE)
+        elif data[pos + 1] == SOS:
+            last = data[end - 2]
+            # The entropy coded data ends at the first 0xFF which is not
+            # followed by a stuffed zero byte
+            end = data.index(0xFF, end)
+            while data[end + 1] == 0:
+                end = data.index(0xFF, end + 2)
+            scans.append((end, last))
+        pos = end
+
+    return marker, header_end, n_blocks, scans
+
+
+def progressive_prefix(data, d):
+    """
+    Cuts a progressive JPEG file written by encode_jpeg after the scans of
+    the diagonals before d. The result is a valid JPEG file showing the
+    image compressed with d, so a single file can be served at every quality
+    by sending a prefix of it. Like encode_jpeg, the cut diagonals are still
+    sent as scans of empty blocks, a few tens of bytes each: decoders
+    estimate the low frequencies missing from a progressive image from the
+    neighboring blocks, which would change the image for d < 4.
+
+    Args:
+        data (bytes): progressive JPEG file written by encode_jpeg.
+        d (int): index of the first diagonal of coefficients to be cut, at
+                    least 1 since the DC coefficients are always kept.
+
+    Returns:
+        prefix (bytes): the JPEG file with the scans of the diagonals i + j < d,
+                        followed by the empty scans of the other diagonals.
+    """
+    marker, size, n_blocks, scans = _split_scans(data)
+    if marker != SOF2:
+        raise ValueError("Only progressive JPEG files can be cut.")
+    if d < 1:
+        raise ValueError("The DC coefficients can't be cut, d must be at least 1.")
+
+    for end, last in scans:
+        if ZIGZAG_DIAGONAL[last] >= d:
+            break
+        size = end
+
+    empty = b""
+    for diagonal in range(d, 2 * BLOCK_SIZE - 1):
+        start, end = _diagonal_band(diagonal)
+        empty += _ac_scan(np.zeros((n_blocks, end - start + 1), np.int32), start, end)
+    return data[:size] + empty + bytes([0xFF, EOI])
+
+
+def save_jpeg(coefficients, path, progressive=False):
+    """
+    Encodes the DCT coefficients of the blocks of an image with encode_jpeg
+    and writes the result to a file.
+
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, 8, 8) of
+                                    DCT coefficients.
+        path (str): path of the file to write.
+        progressive (bool, optional): write a progressive JPEG, see encode_jpeg.
+
+    Returns:
+        size (int): number of bytes written.
+    """
+    data = encode_jpeg(coefficients, progressive)
+    with open(path, "wb") as file:
+        file.write(data)
+    return len(data)
+
+
+def compress_to_jpeg(
+    image, f, d, subsampling="4:2:0", progressive=False, backend="scipy", stats=None
+):
+    """
+    Compresses an image and encodes it as a JPEG file, a progressive one if
+    asked to, like the command line tool does. Gray scale images with 8x8
+    blocks are written with encode_jpeg, the others are compressed with
+    jpg_compression or color_jpg_compression and encoded by Pillow, with the
+    scans chosen by Pillow when progressive.
+
+    Args:
+        image (PIL.Image): the image to be compressed, in any mode.
+        f (int): size of the blocks to subdivide the image into.
+        d (int): parameter that determines how many coefficients to keep.
+        subsampling (str, optional): chroma subsampling of color images, see
+                                    dct.color.SUBSAMPLING. Default is "4:2:0".
+        progressive (bool, optional): write a progressive JPEG. Default is
+                                    False.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                                    the stages.
+
+    Returns:
+        data (bytes): content of the JPEG file.
+    """
+    if stats is None:
+        stats = NO_STATS
+
+    with stats.stage("decode"):
+        image = image.convert("RGB")
+        gray = is_gray(image)
+    buffer = BytesIO()
+
+    if gray:
+        coefficients = compute_coefficients(
+            image.convert("L"), f, d, backend, stats=stats
+        )
+        # With 8x8 blocks the DCT coefficients are written directly
+        if f == BLOCK_SIZE:
+            with stats.stage("encode_jpeg"):
+                return encode_jpeg(coefficients, progressive)
+        compressed = reconstruct_image(coefficients, backend, stats=stats)
+        with stats.stage("encode_jpeg"):
+            compressed.save(
+                buffer,
+                "JPEG",
+                quality=100,
+                subsampling=0,
+                optimize=True,
+                progressive=progressive,
+            )
+    else:
+        compressed = color_jpg_compression(
+            image, f, d, subsampling, backend, stats=stats
+        )
+        with stats.stage("encode_jpeg"):
+            compressed.save(
+                buffer,
+                "JPEG",
+                quality=100,
+                subsampling=subsampling,
+                optimize=True,
+                progressive=progressive,
+            )
+
+    return buffer.getvalue()
@@ -0,0 +1,230 @@
+import numpy as np
+from .adaptive import diagonal_energies
+
+# Constants of SSIM for 8 bits pixels, (K * 255)^2 with K1 = 0.01 and K2 = 0.03
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+# Number of pixels whose block sums are computed at once
+_METRICS_CHUNK = 1 << 18
+
+
+def _pixel_pair(original, compressed):
+    """
+    Returns the pixels of the two images as float arrays of the same shape,
+    the original being cropped to the whole blocks kept by the compression.
+    """
+    compressed = np.asarray(compressed, dtype=np.float64)
+    original = np.asarray(original)[: compressed.shape[0], : compressed.shape[1]]
+    return original.astype(np.float64), compressed
+
+
+def _psnr(mse):
+    """
+    Converts a mean squared error of 8 bits pixels to a PSNR in dB, inf when
+    the error is 0.
+    """
+    with np.errstate(divide="ignore"):
+        return 10 * np.log10(255**2 / np.asarray(mse, dtype=np.float64))
+
+
+def mse(original, compressed):
+    """
+    Computes the mean squared error between an image and its compressed version.
+
+    Args:
+        original (PIL.Image or np.ndarray): the original gray scale image.
+        compressed (PIL.Image or np.ndarray): the compressed image, which may
+                                    be smaller when the original doesn't fit a
+                                    whole number of blocks.
+
+    Returns:
+        mse (float): mean squared error of the pixels.
+    """
+    original, compressed = _pixel_pair(original, compressed)
+    return float(np.mean(np.square(compressed - original)))
+
+
+def psnr(original, compressed):
+    """
+    Computes the peak signal-to-noise ratio of a compressed image, in dB.
+
+    Args:
+        original (PIL.Image or np.ndarray): the original gray scale image.
+        compressed (PIL.Image or np.ndarray): the compressed image.
+
+    Returns:
+        psnr (float): PSNR in dB, inf if the images are equal.
+    """
+    return float(_psnr(mse(original, compressed)))
+
+
+def _ssim(mean_x, mean_y, var_x, var_y, cov):
+    """
+    SSIM formula from the means, variances and covariance of the windows.
+    """
+    luminance = (2 * mean_x * mean_y + _SSIM_C1) / (mean_x**2 + mean_y**2 + _SSIM_C1)
+    structure = (2 * cov + _SSIM_C2) / (var_x + var_y + _SSIM_C2)
+    return luminance * structure
+
+
+def _block_sums(original, compressed, f):
+    """
+    Computes the sums of x, y, x^2, y^2 and xy over every F x F block, x being
+    the pixels of the original image and y the ones of the compressed image.
+    The blocks are processed a band of rows at a time, which stays in cache.
+    With 8 bits pixels the sums are integers below 2^24, exact in float32.
+
+    Returns:
+        sums (np.ndarray): array of shape (5, n_rows, n_cols).
+    """
+    compressed = np.asarray(compressed)
+    original = np.asarray(original)[: compressed.shape[0], : compressed.shape[1]]
+    n_rows, n_cols = compressed.shape[0] // f, compressed.shape[1] // f
+    width = n_cols * f
+
+    dtype = np.float64
+    if original.dtype == np.uint8 and compressed.dtype == np.uint8 and f <= 16:
+        dtype = np.float32
+
+    sums = np.empty((5, n_rows, n_cols))
+    step = max(1, _METRICS_CHUNK // max(width * f, 1))
+    for start in range(0, n_rows, step):
+        stop = min(start + step, n_rows)
+        x = original[start * f : stop * f, :width].astype(dtype)
+        y = compressed[start * f : stop * f, :width].astype(dtype)
+        for k, values in enumerate((x, y, x * x, y * y, x * y)):
+            rows = values.reshape(stop - start, f, width).sum(axis=1)
+            sums[k, start:stop] = rows.reshape(stop - start, n_cols, f).sum(axis=-1)
+
+    return sums
+
+
+def _block_ssim(sums, f):
+    """
+    SSIM of every block from the sums returned by _block_sums.
+    """
+    n = f * f
+    sum_x, sum_y, sum_xx, sum_yy, sum_xy = sums
+    mean_x, mean_y = sum_x / n, sum_y / n
+    var_x = sum_xx / n - mean_x**2
+    var_y = sum_yy / n - mean_y**2
+    cov = sum_xy / n - mean_x * mean_y
+    return _ssim(mean_x, mean_y, var_x, var_y, cov)
+
+
+def block_ssim(original, compressed, f=8):
+    """
+    Computes the SSIM of every F x F block of a compressed image, the windows
+    of SSIM being the blocks themselves, all the blocks at once.
+
+    Args:
+        original (PIL.Image or np.ndarray): the original gray scale image.
+        compressed (PIL.Image or np.ndarray): the compressed image.
+        f (int, optional): size of the blocks. Default is 8.
+
+    Returns:
+        ssim_map (np.ndarray): array of shape (n_rows, n_cols) with the SSIM of
+                                each block, in [-1, 1]. Its mean is the SSIM
+                                of the image.
+    """
+    return _block_ssim(_block_sums(original, compressed, f), f)
+
+
+def _cut_energies(coefficients, d):
+    """
+    Energy of the coefficients of each block, and energy of the ones with
+    i + j >= d, from the energies of the diagonals.
+    """
+    energies = diagonal_energies(coefficients)
+    return energies.sum(axis=-1), energies[..., d:].sum(axis=-1)
+
+
+def estimate_mse(coefficients, d):
+    """
+    Estimates the mean squared error of the compression with parameter d
+    without the inverse DCT. Since the DCT is orthonormal, the squared error
+    of a block before the rounding of the pixels is the energy of its cut
+    coefficients (Parseval's theorem). The rounding adds about 1/12, and
+    the clipping to [0, 255] removes some error.
+
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F) of the
+                                    DCT coefficients of the blocks, with
+                                    nothing cut (compute_coefficients with
+                                    d = 2F - 1).
+        d (int): parameter that determines how many coefficients to keep.
+
+    Returns:
+        mse (float): estimated mean squared error of the pixels.
+    """
+    _, cut = _cut_energies(coefficients, d)
+    return float(cut.sum() / coefficients.size)
+
+
+def estimate_psnr(coefficients, d):
+    """
+    Estimates the PSNR of the compression with parameter d, in dB, from
+    estimate_mse.
+    """
+    return float(_psnr(estimate_mse(coefficients, d)))
+
+
+def estimate_block_ssim(coefficients, d):
+    """
+    Estimates the SSIM of every block compressed with parameter d without the
+    inverse DCT. The statistics of a block follow from its coefficients: the
+    mean is the DC coefficient divided by F, the variance the energy of the AC
+    coefficients divided by F^2, and since the compressed block has the same
+    coefficients as the original one except the cut ones, their covariance is
+    the variance of the compressed block. The rounding of the pixels is
+    ignored.
+
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F) of the
+                                    DCT coefficients of the blocks, with
+                                    nothing cut.
+        d (int): parameter that determines how many coefficients to keep.
+
+    Returns:
+        ssim_map (np.ndarray): array of shape (n_rows, n_cols) with the
+                                estimated SSIM of each block.
+    """
+    f = coefficients.shape[-1]
+    total, cut = _cut_energies(coefficients, d)
+
+    dc = coefficients[..., 0, 0]
+    mean_x = dc / f
+    mean_y = mean_x if d > 0 else np.zeros_like(mean_x)
+    var_x = (total - dc**2) / f**2
+    var_y = np.maximum(total - cut - mean_y**2 * f**2, 0) / f**2
+    return _ssim(mean_x, mean_y, var_x, var_y, var_y)
+
+
+def compression_metrics(original, compressed, f):
+    """
+    Computes the quality metrics of a compressed image reported by
+    jpg_compression, from a single pass over the pixels of the two images.
+
+    Args:
+        original (PIL.Image or np.ndarray): the original gray scale image.
+        compressed (PIL.Image or np.ndarray): the compressed image, made of
+                                    whole F x F blocks.
+        f (int): size of the blocks, the windows of SSIM.
+
+    Returns:
+        metrics (dict): "mse", "psnr" (in dB) and "ssim", the mean of
+                        block_ssim, all nan if the image has no whole block.
+    """
+    sums = _block_sums(original, compressed, f)
+    if sums[0].size == 0:
+        return {"mse": np.nan, "psnr": np.nan, "ssim": np.nan}
+
+    # Sum of (x - y)^2 over all the pixels
+    squared_error = sums[2].sum() + sums[3].sum() - 2 * sums[4].sum()
+    value = float(squared_error / (sums[0].size * f * f))
+    return {
+        "mse": value,
+        "psnr": float(_psnr(value)),
+        "ssim": float(_block_ssim(sums, f).mean()),
+    }
@@ -0,0 +1,164 @@
+import math
+import numpy as np
+from PIL import Image
+from .color import _split_planes, _forward_planes, _inverse_planes, _merge_planes
+from .image_compress import (
+    _subdivide_image,
+    _rebuild_image,
+    _diagonal_mask,
+    _inverse_blocks,
+    _run_bands,
+    compute_coefficients,
+)
+from .stats import NO_STATS
+from .thumbnail import thumbnail_blocks
+
+
+class CompressionPreview:
+    """
+    Keeps the pixels of an image and the DCT coefficients of its blocks for a
+    fixed F, so that the compressed image for any d only needs to cut the
+    coefficients and apply the inverse DCT, skipping the subdivision and the
+    forward DCT. The compressed images are the same as jpg_compression (or
+    color_jpg_compression for color images) would return. The constructor and
+    compress take an optional progress callback, called as progress(done, total)
+    after each band of blocks like in jpg_compression, and an optional stats
+    collector (dct.stats.CompressionStats) receiving the time of their stages.
+    thumbnail builds a downscaled compressed image for display straight from
+    the low frequencies, without the full inverse DCT.
+
+    Attributes:
+        image (PIL.Image): the image, in "L" mode for gray scale images.
+        f (int): size of the blocks.
+        color (bool): True for color images, compressed in YCbCr.
+        subsampling (str): chroma subsampling of color images.
+        backend (str): name of the transform backend, see dct.backends.
+    """
+
+    def __init__(
+        self, image, f, subsampling="4:2:0", backend="scipy", progress=None, stats=None
+    ):
+        if stats is None:
+            stats = NO_STATS
+
+        self.image = image
+        self.f = f
+        self.color = image.mode != "L"
+        self.subsampling = subsampling
+        self.backend = backend
+
+        if self.color:
+            fs = (f, f, f)
+            with stats.stage("to_ycbcr"):
+                planes = _split_planes(image, fs, subsampling)
+            self._groups = _forward_planes(planes, fs, backend, progress, stats)
+        else:
+            # All the coefficients, nothing is cut
+            self._coefficients = compute_coefficients(
+                image, f, 2 * f - 1, backend, progress, stats
+            )
+            self._workspace = np.empty_like(self._coefficients)
+
+    def coefficients(self, d):
+        """
+        Returns the truncated coefficients of a gray scale image, the same as
+        compute_coefficients(image, F, d).
+
+        Args:
+            d (int): parameter that determines how many coefficients to keep.
+
+        Returns:
+            coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F).
+        """
+        if self.color:
+            raise ValueError("Color images have no single array of coefficients.")
+        return np.where(_diagonal_mask(self.f, d), 0.0, self._coefficients)
+
+    def compress(self, d, progress=None, stats=None):
+        """
+        Builds the compressed image for a value of d.
+
+        Args:
+            d (int): parameter that determines how many coefficients to keep.
+            progress (callable, optional): progress callback.
+            stats (CompressionStats, optional): collector of the time of the
+                                                stages.
+
+        Returns:
+            compressed_image (PIL.Image): the compressed image.
+        """
+        if stats is None:
+            stats = NO_STATS
+
+        if self.color:
+            planes = _inverse_planes(
+                self._groups, (d, d, d), self.backend, progress=progress, stats=stats
+            )
+            with stats.stage("to_rgb"):
+                return _merge_planes(planes, self.subsampling)
+
+        # Cut the coefficients in the workspace, which the inverse DCT overwrites
+        with stats.stage("cut"):
+            coeff = self._workspace
+            np.copyto(coeff, self._coefficients)
+            coeff[..., _diagonal_mask(self.f, d)] = 0
+
+        n_rows, n_cols, f, _ = coeff.shape
+        out = np.empty((n_rows * f, n_cols * f), dtype=np.uint8)
+        out_blocks, _, _ = _subdivide_image(out, f)
+        _run_bands(
+            n_rows,
+            lambda start, stop: _inverse_blocks(
+                coeff[start:stop],
+                self.backend,
+                out=out_blocks[start:stop],
+                overwrite=True,
+                stats=stats,
+            ),
+            progress,
+        )
+
+        with stats.stage("fromarray"):
+            return Image.fromarray(out)
+
+    def thumbnail(self, d, k=1, stats=None):
+        """
+        Builds the compressed image for a value of d downscaled by k / F,
+        decoding only the k x k corner of low frequencies of each block, see
+        dct.thumbnail.thumbnail_blocks. For color images the chroma planes
+        are decoded at the same scale.
+
+        Args:
+            d (int): parameter that determines how many coefficients to keep.
+            k (int, optional): size of the decoded blocks of the Y plane, in
+                                [1, F]. Default is 1, one pixel per block.
+            stats (CompressionStats, optional): collector of the time of the
+                                stages.
+
+        Returns:
+            thumbnail (PIL.Image): the downscaled compressed image.
+        """
+        if stats is None:
+            stats = NO_STATS
+
+        if not self.color:
+            pixels = _rebuild_image(thumbnail_blocks(self._coefficients, k, d, stats))
+            with stats.stage("fromarray"):
+                return Image.fromarray(pixels)
+
+        planes = [None] * 3
+        for f, coeff, layout in self._groups:
+            # Same scale as the Y plane, rounded up so that the chroma planes
+            # still cover it
+            k_plane = min(f, math.ceil(k * f / self.f))
+            pixels = thumbnail_blocks(coeff, k_plane, d, stats)
+
+            start = 0
+            for i, n_rows, n_cols in layout:
+                stop = start + n_rows * n_cols
+                blocks = pixels[start:stop].reshape(n_rows, n_cols, k_plane, k_plane)
+                planes[i] = _rebuild_image(blocks)
+                start = stop
+
+        with stats.stage("to_rgb"):
+            return _merge_planes(planes, self.subsampling)
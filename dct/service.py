@@ -0,0 +1,577 @@
+"""
+Local compression service, keeping a pool of worker processes warm so that
+other processes can compress images without paying the start up of Python,
+NumPy and SciPy for each of them.
+
+Example:
+    python -m dct.service --port 8765 --workers 4
+
+The service speaks HTTP/1.1 on localhost (or on a Unix socket with --unix):
+
+    POST /compress?f=8&d=6  with the image file (BMP, PNG, ...) as body,
+                            answers the JPEG file. Optional parameters:
+                            subsampling (of color images) and progressive=1.
+    GET /stats              answers the counters of the service as JSON.
+
+Requests beyond the capacity of the pool (the requests being compressed plus
+a bounded queue) are rejected with 503 and a Retry-After header before their
+image is read, and so are the connections beyond a limit, so a burst of
+clients gets an answer instead of piling up in memory.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from .backends import get_backend
+from .color import SUBSAMPLING
+from .dct1D import get_dct_plan
+from .image_compress import jpg_compression
+from .jpeg import compress_to_jpeg
+
+# Block sizes whose plans are built by each worker when it starts
+PRELOAD_SIZES = (8, 16)
+
+# Number of latencies kept to compute the percentiles
+_LATENCY_WINDOW = 10000
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class _HTTPError(Exception):
+    """
+    Raised while handling a request to answer it with an error status.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _warm_up(backend, sizes):
+    """
+    Initializer of the worker processes: imports the transforms, builds the
+    DCT plans and backends of the given block sizes and compresses a small
+    image with each of them, so that the first request is as fast as the
+    next ones.
+    """
+    for f in sizes:
+        get_dct_plan(f)
+        get_backend(backend, (f, f))
+        jpg_compression(Image.new("L", (4 * f, 4 * f)), f, f, backend)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _compress_request(data, f, d, subsampling, progressive, backend):
+    """
+    Compresses an image file to a JPEG file, like the command line tool does.
+    Runs in the worker processes.
+
+    Returns:
+        jpeg (bytes): the JPEG file.
+        megapixels (float): size of the image.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            megapixels = image.width * image.height / 1e6
+            jpeg = compress_to_jpeg(image, f, d, subsampling, progressive, backend)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Can't read the image: {e}")
+    return jpeg, megapixels
+
+
+class ServiceCounters:
+    """
+    Counters of the requests of a CompressionService.
+
+    Attributes:
+        requests (int): number of requests received.
+        completed (int): number of images compressed.
+        rejected (int): number of requests rejected because the service
+                        was full.
+        failed (int): number of requests answered with another error.
+        in_flight (int): number of images being received, compressed or
+                        waiting for a worker.
+        max_in_flight (int): largest value of in_flight so far.
+        pool_restarts (int): number of times the pool was replaced after a
+                        worker process died.
+        bytes_in (int): total size of the images compressed.
+        bytes_out (int): total size of the JPEG files sent.
+        megapixels (float): total size of the images compressed.
+        latencies (deque): time between the arrival and the answer of the
+                        last compressions, in seconds.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.requests = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.pool_restarts = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.megapixels = 0.0
+        self.latencies = deque(maxlen=_LATENCY_WINDOW)
+
+    def as_dict(self):
+        """
+        Returns the counters, the throughput since the start of the service
+        and the percentiles of the recent latencies, which can be written as
+        JSON.
+        """
+        uptime = time.monotonic() - self.start
+        counters = {
+            "uptime": uptime,
+            "requests": self.requests,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "pool_restarts": self.pool_restarts,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "images_per_s": self.completed / uptime if uptime > 0 else 0.0,
+            "mp_per_s": self.megapixels / uptime if uptime > 0 else 0.0,
+        }
+        if self.latencies:
+            p50, p99 = np.percentile(self.latencies, [50, 99])
+            counters["latency_p50"] = float(p50)
+            counters["latency_p99"] = float(p99)
+            counters["latency_max"] = float(max(self.latencies))
+        return counters
+
+
+class CompressionService:
+    """
+    Asyncio HTTP front end of a pool of worker processes compressing images.
+    The event loop only parses the requests and sends the answers, the
+    compressions run in the pool. When a worker dies (killed when out of
+    memory for instance) the pool is broken for good, so it is replaced by a
+    new one, warmed up in the background.
+
+    Attributes:
+        workers (int): number of worker processes.
+        max_queue (int): number of requests allowed to wait for a worker,
+                        beyond it the requests are rejected with 503.
+        backend (str): name of the transform backend, see dct.backends.
+        max_body (int): largest image file accepted, in bytes.
+        max_connections (int): number of open connections, beyond it new
+                        connections are answered with 503 and closed.
+        counters (ServiceCounters): counters of the requests.
+    """
+
+    def __init__(
+        self,
+        workers=1,
+        max_queue=8,
+        backend="scipy",
+        max_body=64 << 20,
+        max_connections=128,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.backend = backend
+        self.max_body = max_body
+        self.max_connections = max_connections
+        self.counters = ServiceCounters()
+        self._pool = None
+        self._warming = None
+        self._server = None
+        self._connections = set()
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """
+        Starts the worker processes, waits for them to be warm, then listens
+        on the given host and port (0 for any free port) or Unix socket path.
+
+        Returns:
+            address: the (host, port) pair or the path the service listens on.
+        """
+        await self._start_pool()
+
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+            return path
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    def _start_pool(self):
+        """
+        Creates the pool of worker processes.
+
+        Returns:
+            warm (asyncio.Future): done when all the workers are warm.
+        """
+        loop = asyncio.get_running_loop()
+        self._pool = ProcessPoolExecutor(
+            self.workers, initializer=_warm_up, initargs=(self.backend, PRELOAD_SIZES)
+        )
+        # The processes are started on demand, make them all start now
+        return asyncio.gather(
+            *(loop.run_in_executor(self._pool, _ping) for _ in range(self.workers))
+        )
+
+    def _replace_pool(self, broken):
+        """
+        Replaces the pool after one of its workers died, unless another
+        request already did.
+        """
+        if self._pool is not broken:
+            return
+        broken.shutdown(wait=False)
+        self.counters.pool_restarts += 1
+        self._warming = self._start_pool()
+
+    async def _run(self, *args):
+        """
+        Runs _compress_request in the pool. A compression submitted to a
+        pool found broken never ran, so it is submitted again to the new pool.
+        """
+        try:
+            future = self._pool.submit(_compress_request, *args)
+        except BrokenProcessPool:
+            self._replace_pool(self._pool)
+            future = self._pool.submit(_compress_request, *args)
+
+        pool = self._pool
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops listening, drops the open connections and shuts the worker
+        processes down.
+        """
+        if self._server is not None:
+            self._server.close()
+            connections = list(self._connections)
+            for task in connections:
+                task.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+            await self._server.wait_closed()
+        if self._pool is not None:
+            # Waiting for the running compressions would block the event loop
+            shutdown = functools.partial(self._pool.shutdown, cancel_futures=True)
+            await asyncio.get_running_loop().run_in_executor(None, shutdown)
+
+    async def _handle(self, reader, writer):
+        """
+        Answers the requests of a connection, which is kept alive until the
+        client closes it or asks to.
+        """
+        if len(self._connections) >= self.max_connections:
+            self.counters.rejected += 1
+            message = b"Too many connections, retry later."
+            self._write_response(writer, 503, "text/plain", message)
+            writer.close()
+            return
+
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, length = request
+
+                status, content_type, payload = await self._respond(
+                    method, target, reader, length
+                )
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, content_type, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except _HTTPError as e:
+            # The request can't be read, answer and drop the connection
+            self.counters.failed += 1
+            self._write_response(writer, e.status, "text/plain", str(e).encode())
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # The service is closing, end the connection quietly
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        Reads the request line and the headers of a request, its body being
+        read only once the request is accepted.
+
+        Returns:
+            request (tuple): method, target, headers (lower case names) and
+                            length of the body, or None if the connection
+                            was closed.
+        """
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise _HTTPError(400, "Malformed request line.")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise _HTTPError(400, "Malformed Content-Length.")
+        if length > self.max_body:
+            raise _HTTPError(413, f"Images are limited to {self.max_body} bytes.")
+        return method, target, headers, length
+
+    @staticmethod
+    async def _discard(reader, length):
+        """
+        Skips the body of a rejected request, a chunk at a time.
+        """
+        while length > 0:
+            chunk = await reader.read(min(length, 1 << 16))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", length)
+            length -= len(chunk)
+
+    @staticmethod
+    def _write_response(writer, status, content_type, payload, keep_alive=False):
+        head = f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        head += f"Content-Type: {content_type}\r\n"
+        head += f"Content-Length: {len(payload)}\r\n"
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        head += f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        writer.write(head.encode("latin-1") + payload)
+
+    async def _respond(self, method, target, reader, length):
+        """
+        Routes a request, whose body of the given length is still to be read
+        from reader.
+
+        Returns:
+            status (int): HTTP status of the answer.
+            content_type (str): type of the payload.
+            payload (bytes): body of the answer.
+        """
+        self.counters.requests += 1
+        url = urlsplit(target)
+        if url.path != "/compress" or method != "POST":
+            await self._discard(reader, length)
+        try:
+            if url.path == "/stats":
+                if method != "GET":
+                    raise _HTTPError(405, "Use GET for /stats.")
+                stats = json.dumps(self.counters.as_dict()).encode()
+                return 200, "application/json", stats
+            if url.path == "/compress":
+                if method != "POST":
+                    raise _HTTPError(405, "Use POST for /compress.")
+                jpeg = await self._compress(url.query, reader, length)
+                return 200, "image/jpeg", jpeg
+            raise _HTTPError(404, f"Unknown path {url.path}.")
+        except _HTTPError as e:
+            if e.status == 503:
+                self.counters.rejected += 1
+            else:
+                self.counters.failed += 1
+            return e.status, "text/plain", str(e).encode()
+
+    def _parse_compression(self, query):
+        """
+        Validates the parameters of a compression.
+
+        Returns:
+            params (tuple): f, d, subsampling and progressive.
+        """
+        params = parse_qs(query)
+        try:
+            f = int(params.get("f", ["8"])[0])
+            d = int(params["d"][0])
+        except (KeyError, ValueError):
+            raise _HTTPError(400, "The parameters f and d must be integers.")
+        subsampling = params.get("subsampling", ["4:2:0"])[0]
+        progressive = params.get("progressive", ["0"])[0] in ("1", "true")
+        if f < 1 or not 0 <= d <= 2 * f - 1:
+            raise _HTTPError(400, "f must be positive and d in [0, 2f - 1].")
+        if subsampling not in SUBSAMPLING:
+            raise _HTTPError(400, f"Unknown subsampling {subsampling}.")
+        return f, d, subsampling, progressive
+
+    async def _compress(self, query, reader, length):
+        """
+        Validates the parameters of a compression, then reads the image and
+        runs it in the pool, unless the pool and its queue are full. The
+        image is only read once accepted, so at most the images in flight
+        are held in memory. Images above the pixel limit of Pillow are
+        answered with 413, any other error of the compression with 500.
+        """
+        start = time.perf_counter()
+        counters = self.counters
+        try:
+            params = self._parse_compression(query)
+            if counters.in_flight >= self.workers + self.max_queue:
+                raise _HTTPError(503, "The service is full, retry later.")
+        except _HTTPError:
+            await self._discard(reader, length)
+            raise
+
+        counters.in_flight += 1
+        counters.max_in_flight = max(counters.max_in_flight, counters.in_flight)
+        try:
+            body = await reader.readexactly(length)
+            try:
+                jpeg, megapixels = await self._run(body, *params, self.backend)
+            except ValueError as e:
+                raise _HTTPError(400, str(e))
+            except Image.DecompressionBombError as e:
+                raise _HTTPError(413, str(e))
+            except BrokenProcessPool:
+                raise _HTTPError(500, "A worker process died.")
+            except Exception as e:
+                raise _HTTPError(500, f"The compression failed: {e}")
+        finally:
+            counters.in_flight -= 1
+
+        counters.completed += 1
+        counters.bytes_in += len(body)
+        counters.bytes_out += len(jpeg)
+        counters.megapixels += megapixels
+        counters.latencies.append(time.perf_counter() - start)
+        return jpeg
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m dct.service",
+        description="Serve image compression over HTTP on localhost.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument(
+        "--port", type=int, default=8765, help="port to listen on, 0 for any"
+    )
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes",
+    )
+    parser.add_argument(
+        "--queue",
+        type=int,
+        default=None,
+        help="requests waiting for a worker before rejecting new ones "
+        + "(default 2 per worker)",
+    )
+    parser.add_argument(
+        "--backend", default="scipy", help="DCT backend, see dct.backends"
+    )
+    parser.add_argument(
+        "--max-body", type=int, default=64, help="largest image accepted, in MB"
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=128,
+        help="open connections before rejecting new ones",
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("the number of workers must be positive.")
+    if args.queue is None:
+        args.queue = 2 * args.workers
+    if args.queue < 0:
+        parser.error("the queue can't be negative.")
+    if args.max_connections < 1:
+        parser.error("the number of connections must be positive.")
+    return args
+
+
+async def _serve(args):
+    service = CompressionService(
+        args.workers,
+        args.queue,
+        args.backend,
+        args.max_body << 20,
+        args.max_connections,
+    )
+    try:
+        address = await service.start(args.host, args.port, args.unix)
+        print(json.dumps({"status": "listening", "address": address}), flush=True)
+
+        # Stop on SIGTERM like on Ctrl+C, so that the workers are shut down
+        serving = asyncio.ensure_future(service.serve_forever())
+        try:
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+        except NotImplementedError:
+            # No signal handlers in the event loops of Windows
+            pass
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    """
+    Runs the service until interrupted.
+
+    Args:
+        argv (list, optional): command line arguments, sys.argv[1:] by default.
+    """
+    args = _parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+class CompressionStats:
+    """
+    Collects the wall time, the number of calls and the peak memory allocated
+    by each stage of a compression. Pass it as the stats argument of
+    jpg_compression (and of the other functions accepting one), then read the
+    stages attribute or print it.
+
+    Memory is traced with tracemalloc, which slows down the allocations, so it
+    is only measured when asked for, and only while a stage runs: the tracing
+    started by the collector stops when its last running stage ends, even if
+    the compression raises or is cancelled. The peak of a stage is the largest
+    amount of memory allocated during it on top of what was allocated when it
+    started. The collector can also be used as a context manager, which calls
+    stop on exit.
+    With more than one worker the stages of the threads overlap, their times
+    add up and their peaks are not meaningful.
+
+    Attributes:
+        memory (bool): whether the peak allocation of the stages is measured.
+        stages (dict): for each stage name, in order of first call, a dict with
+                        the total "time" in seconds, the number of "calls" and
+                        the "peak" allocation in bytes (0 without memory).
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._tracing = False
+        # Number of stages running, in all the threads
+        self._running = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager measuring a stage, adding its time and memory to
+        the ones of the previous calls of the stage with the same name.
+        """
+        if self.memory:
+            with self._lock:
+                self._running += 1
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._tracing = True
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = 0
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1] - start_memory, 0)
+
+            with self._lock:
+                if self.memory:
+                    self._running -= 1
+                    if self._running == 0:
+                        self._stop_tracing()
+                stats = self.stages.setdefault(
+                    name, {"time": 0.0, "calls": 0, "peak": 0}
+                )
+                stats["time"] += elapsed
+                stats["calls"] += 1
+                stats["peak"] = max(stats["peak"], peak)
+
+    def _stop_tracing(self):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def stop(self):
+        """
+        Stops tracing the memory, if the tracing was started by this collector
+        and a stage is still running, for instance in a thread which outlived
+        the compression. The tracing otherwise stops with the last stage.
+        """
+        with self._lock:
+            self._stop_tracing()
+
+    def total_time(self):
+        """
+        Returns the sum of the times of all the stages, in seconds.
+        """
+        return sum(stats["time"] for stats in self.stages.values())
+
+    def as_dict(self):
+        """
+        Returns a copy of the stages, which can be written as JSON.
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.stages.items()}
+
+    def __str__(self):
+        parts = []
+        for name, stats in self.as_dict().items():
+            part = f"{name} {stats['time'] * 1e3:.1f} ms"
+            if stats["calls"] > 1:
+                part += f" ({stats['calls']} calls)"
+            if self.memory:
+                part += f" {stats['peak'] / 1e6:.1f} MB"
+            parts.append(part)
+        return ", ".join(parts)
+
+
+class _NoStats:
+    """
+    Stands for a disabled collector, its stages cost a method call.
+    """
+
+    _stage = nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+
+NO_STATS = _NoStats()
@@ -0,0 +1,241 @@
+import numpy as np
+import struct
+from .image_compress import _compress_band
+
+# Weights of the conversion from RGB to gray scale, as fixed point numbers
+# with 16 fractional bits. They are the same used by PIL's convert("L").
+_GRAY_WEIGHTS = (19595, 38470, 7471)
+
+
+def _to_gray(r, g, b):
+    """
+    Converts RGB values to gray levels like PIL's convert("L").
+    """
+    r, g, b = (np.asarray(x, dtype=np.uint32) for x in (r, g, b))
+    wr, wg, wb = _GRAY_WEIGHTS
+    return ((r * wr + g * wg + b * wb + 0x8000) >> 16).astype(np.uint8)
+
+
+def _mask_byte(mask):
+    """
+    Returns the index of the byte of a pixel selected by a bit field mask,
+    which must be a whole byte.
+    """
+    for byte in range(4):
+        if mask == 0xFF << (8 * byte):
+            return byte
+    raise ValueError(f"Unsupported BMP bit field mask {mask:#010x}.")
+
+
+class BMPReader:
+    """
+    Reads the rows of an uncompressed BMP file a few at a time, converted to
+    gray scale, without ever loading the whole image in memory.
+    Supports 8 bits images with a color palette and 24 or 32 bits images,
+    the latter also with bit fields giving each channel a byte of the pixels.
+
+    Attributes:
+        width (int): width of the image in pixels.
+        height (int): height of the image in pixels.
+        bits (int): number of bits per pixel.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self._read_header()
+        except Exception:
+            self.file.close()
+            raise
+
+    def _read_header(self):
+        file_header = self.file.read(14)
+        if len(file_header) < 14 or file_header[:2] != b"BM":
+            raise ValueError("Not a BMP file.")
+        (self.data_offset,) = struct.unpack("<I", file_header[10:14])
+
+        (header_size,) = struct.unpack("<I", self.file.read(4))
+        if header_size < 40:
+            raise ValueError("Unsupported BMP header, only BITMAPINFOHEADER and later.")
+        info = self.file.read(header_size - 4)
+        width, height, _, self.bits, compression = struct.unpack("<iiHHI", info[:16])
+        (n_colors,) = struct.unpack("<I", info[28:32])
+
+        # Rows are stored bottom-up, unless the height is negative
+        self.width = width
+        self.height = abs(height)
+        self.bottom_up = height > 0
+
+        if self.bits not in (8, 24, 32) or compression not in (0, 3):
+            raise ValueError(
+                f"Unsupported BMP format: {self.bits} bits, compression {compression}."
+            )
+        if compression == 3 and self.bits != 32:
+            raise ValueError(
+                "Unsupported BMP format: bit fields with less than 32 bits."
+            )
+
+        # Byte of the pixels holding each of the R, G and B channels
+        self.channel_bytes = (2, 1, 0)
+        if compression == 3:
+            # The masks are in the V2 and later headers, after the
+            # BITMAPINFOHEADER otherwise
+            masks = info[36:48] if header_size >= 52 else self.file.read(12)
+            self.channel_bytes = tuple(
+                _mask_byte(mask) for mask in struct.unpack("<III", masks)
+            )
+
+        # Each row is padded to a multiple of 4 bytes
+        self.row_size = (self.bits * self.width + 31) // 32 * 4
+
+        if self.bits == 8:
+            # The palette follows the headers, 4 bytes (B, G, R, 0) per color
+            n_colors = n_colors or 256
+            palette = np.frombuffer(self.file.read(4 * n_colors), dtype=np.uint8)
+            palette = palette.reshape(-1, 4)
+            self.lut = np.zeros(256, dtype=np.uint8)
+            self.lut[: len(palette)] = _to_gray(
+                palette[:, 2], palette[:, 1], palette[:, 0]
+            )
+
+    def read_rows(self, start, count):
+        """
+        Reads count rows of the image starting from row start (counted from the top).
+
+        Returns:
+            rows (np.ndarray): uint8 array of shape (count, width) of gray levels.
+        """
+        # First row to read in file order
+        first = self.height - start - count if self.bottom_up else start
+        self.file.seek(self.data_offset + first * self.row_size)
+        data = self.file.read(count * self.row_size)
+        if len(data) < count * self.row_size:
+            raise ValueError("Truncated BMP file.")
+        rows = np.frombuffer(data, dtype=np.uint8).reshape(count, self.row_size)
+        if self.bottom_up:
+            rows = rows[::-1]
+
+        if self.bits == 8:
+            return self.lut[rows[:, : self.width]]
+
+        # Pixels are stored as (B, G, R) or (B, G, R, A), or in the order of
+        # the bit fields
+        channels = self.bits // 8
+        pixels = rows[:, : self.width * channels].reshape(count, self.width, channels)
+        r, g, b = self.channel_bytes
+        return _to_gray(pixels[..., r], pixels[..., g], pixels[..., b])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BMPWriter:
+    """
+    Writes an 8 bits gray scale BMP file a few rows at a time. The rows are
+    stored top-down, so they can be appended in the order they are produced.
+
+    Attributes:
+        width (int): width of the image in pixels.
+        height (int): height of the image in pixels.
+    """
+
+    def __init__(self, path, width, height):
+        self.width = width
+        self.height = height
+        self.row_size = (8 * width + 31) // 32 * 4
+        self.rows_written = 0
+
+        palette_size = 256 * 4
+        data_offset = 14 + 40 + palette_size
+        file_size = data_offset + self.row_size * height
+
+        self.file = open(path, "wb")
+        # File header
+        self.file.write(struct.pack("<2sIHHI", b"BM", file_size, 0, 0, data_offset))
+        # Info header, negative height means top-down rows
+        self.file.write(
+            struct.pack(
+                "<IiiHHIIiiII",
+                40,
+                width,
+                -height,
+                1,
+                8,
+                0,
+                self.row_size * height,
+                2835,  # 72 DPI
+                2835,
+                256,
+                0,
+            )
+        )
+        # Gray scale palette
+        levels = np.arange(256, dtype=np.uint8)
+        self.file.write(
+            np.stack([levels, levels, levels, np.zeros_like(levels)], axis=1)
+        )
+
+    def write_rows(self, rows):
+        """
+        Appends rows of gray levels to the image.
+
+        Args:
+            rows (np.ndarray): uint8 array of shape (count, width).
+        """
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError("Writing more rows than the height of the image.")
+        padded = np.zeros((len(rows), self.row_size), dtype=np.uint8)
+        padded[:, : self.width] = rows
+        self.file.write(padded)
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def compress_bmp_file(src_path, dst_path, f, d, backend="scipy"):
+    """
+    Compresses a BMP image like jpg_compression, reading it one band of F rows
+    of pixels at a time and writing each compressed band straight to the output
+    file. The memory used is proportional to the width of the image times F,
+    whatever the height of the image, so even huge images can be compressed.
+    The output is an 8 bits gray scale BMP file with the same pixels that
+    jpg_compression would return for the image converted to gray scale.
+
+    Args:
+        src_path (str): path of the BMP image to compress.
+        dst_path (str): path of the BMP file to write.
+        f (int): size of the blocks to subdivide the image into.
+        d (int): parameter that determines how many coefficients to keep.
+        backend (str, optional): name of the transform backend, see dct.backends.
+
+    Returns:
+        size (tuple): (width, height) of the compressed image.
+    """
+    with BMPReader(src_path) as reader:
+        # Pixels that do not fit in a whole block are discarded
+        n_rows, n_cols = reader.height // f, reader.width // f
+        width, height = n_cols * f, n_rows * f
+
+        # Buffer for one compressed band, reused for all the bands
+        out = np.empty((f, width), dtype=np.uint8)
+
+        with BMPWriter(dst_path, width, height) as writer:
+            for row in range(n_rows):
+                band = reader.read_rows(row * f, f)
+                _compress_band(band, out, f, d, backend, 0, 1, workspace=True)
+                writer.write_rows(out)
+
+    return width, height
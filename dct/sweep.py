@@ -0,0 +1,105 @@
+import numpy as np
+from .image_compress import (
+    _subdivide_image,
+    _diagonal_mask,
+    _forward_blocks,
+    reconstruct_image,
+)
+from .jpeg import _bit_length
+
+# Rough number of bits of the Huffman code of a (run, size) symbol, and of
+# the end of block symbol, used to estimate the size of the compressed image
+_SYMBOL_BITS = 3
+_EOB_BITS = 2
+
+
+def _per_diagonal(values, f):
+    """
+    Sums the values of a F x F array along each anti-diagonal i + j = k.
+
+    Returns:
+        sums (np.ndarray): array of length 2F - 1, sums[k] is the sum of
+                            the values with indices i + j = k.
+    """
+    i, j = np.indices((f, f))
+    return np.bincount((i + j).ravel(), weights=values.ravel(), minlength=2 * f - 1)
+
+
+def rd_sweep(image, f, backend="scipy", reconstruct=()):
+    """
+    Estimates the rate-distortion curve of the compression of an image for all
+    the values of d in [0, 2F - 2], computing the DCT of the blocks only once.
+
+    Since the DCT is orthonormal, the squared error of a compressed block is
+    the energy of its cut coefficients (Parseval's theorem). Summing the energy
+    of each diagonal of coefficients over all the blocks, the error for every d
+    follows from cumulative sums. The estimate ignores the final rounding and
+    clipping of the pixels, which change the MSE by about 1/12.
+
+    The size is estimated from the coefficients rounded to integers, as written
+    by dct.jpeg.encode_jpeg: every nonzero AC coefficient and every difference
+    of DC coefficients costs its category bits plus a Huffman symbol, and every
+    block an end of block symbol.
+
+    Args:
+        image (PIL.Image): the image to be compressed.
+        f (int): size of the blocks to subdivide the image into.
+        backend (str, optional): name of the transform backend, see dct.backends.
+        reconstruct (iterable, optional): values of d whose compressed image
+                                    is actually built, equal to the output of
+                                    jpg_compression for the same F and d.
+
+    Returns:
+        curve (dict): with the following entries, arrays indexed by d
+            "d" (np.ndarray): values of d, from 0 to 2F - 2.
+            "mse" (np.ndarray): estimated mean squared error.
+            "psnr" (np.ndarray): estimated PSNR in dB, inf when the MSE is 0.
+            "zeros" (np.ndarray): number of coefficients equal to 0 after
+                                    the cut and the rounding.
+            "size" (np.ndarray): estimated size in bytes of the coefficients.
+            "images" (dict): compressed image for each d in reconstruct.
+    """
+    blocks, n_rows, n_cols = _subdivide_image(np.asarray(image), f)
+    n_blocks = n_rows * n_cols
+    n_pixels = n_blocks * f * f
+
+    # Coefficients of all the blocks, with nothing cut
+    coeff = _forward_blocks(blocks, f, 2 * f - 1, backend)
+
+    # Energy, nonzero count and category bits of each diagonal
+    energy = _per_diagonal(np.einsum("rcij,rcij->ij", coeff, coeff), f)
+    rounded = np.rint(coeff)
+    nonzero = _per_diagonal(np.count_nonzero(rounded, axis=(0, 1)), f)
+    bits = _per_diagonal(_bit_length(rounded).sum(axis=(0, 1)), f)
+    bits += _SYMBOL_BITS * nonzero
+
+    # The DC coefficients are coded as differences from the previous block,
+    # with a symbol even when the difference is 0
+    dc = rounded[..., 0, 0].ravel() - 1024
+    bits[0] = _bit_length(np.diff(dc, prepend=0)).sum() + _SYMBOL_BITS * n_blocks
+
+    # With parameter d the diagonals from d on are cut: the error is the energy
+    # of the diagonals >= d, the rate comes from the diagonals < d
+    d = np.arange(2 * f - 1)
+    cut_energy = np.cumsum(energy[::-1])[::-1][: 2 * f - 1]
+    kept_nonzero = np.concatenate([[0], np.cumsum(nonzero)])[: 2 * f - 1]
+    kept_bits = np.concatenate([[0], np.cumsum(bits)])
+
+    mse = cut_energy / n_pixels
+    with np.errstate(divide="ignore"):
+        psnr = 10 * np.log10(255**2 / mse)
+
+    images = {}
+    for value in reconstruct:
+        truncated = coeff.copy()
+        truncated[..., _diagonal_mask(f, value)] = 0
+        images[value] = reconstruct_image(truncated, backend)
+
+    return {
+        "d": d,
+        "mse": mse,
+        "psnr": psnr,
+        "zeros": n_pixels - kept_nonzero.astype(np.int64),
+        "size": (kept_bits[: 2 * f - 1] + _EOB_BITS * n_blocks) / 8,
+        "images": images,
+    }
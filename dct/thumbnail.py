@@ -0,0 +1,87 @@
+import math
+import numpy as np
+from PIL import Image
+from .dct2D import idct_2D
+from .image_compress import _diagonal_mask, _rebuild_image, _round_clip
+from .stats import NO_STATS
+
+
+def thumbnail_scale(f, width, max_width):
+    """
+    Chooses the size k of the low frequency corner to decode so that the
+    thumbnail of an image is at least max_width pixels wide, or as wide as
+    the image if it is narrower.
+
+    Args:
+        f (int): size of the blocks.
+        width (int): width of the image in pixels, a multiple of F.
+        max_width (int): width of the thumbnail to be displayed.
+
+    Returns:
+        k (int): size of the corner, in [1, F].
+    """
+    n_cols = width // f
+    return max(1, min(f, math.ceil(max_width / max(n_cols, 1))))
+
+
+def thumbnail_blocks(coeff, k, d=None, stats=NO_STATS):
+    """
+    Decodes every F x F block of DCT coefficients to a k x k block of pixels,
+    a downscaled version of the block by k / F. Only the k x k corner of low
+    frequencies is used: the k-point IDCT of the corner, multiplied by k / F,
+    samples the block at the centers of a k x k grid up to the frequencies
+    that a k x k grid can represent. With k = 1 this is the average of the
+    block, its DC coefficient divided by F, and with k = F the full inverse
+    DCT.
+
+    Args:
+        coeff (np.ndarray): array of shape (..., F, F) of DCT coefficients.
+        k (int): size of the decoded blocks, in [1, F].
+        d (int, optional): parameter that determines how many coefficients to
+                            keep, all of them by default.
+        stats (CompressionStats, optional): collector of the time of the
+                            "thumbnail_idct" and "round_clip" stages.
+
+    Returns:
+        pixels (np.ndarray): uint8 array of shape (..., k, k).
+    """
+    f = coeff.shape[-1]
+    if not 1 <= k <= f:
+        raise ValueError(f"The corner size must be in [1, {f}], got {k}.")
+
+    with stats.stage("thumbnail_idct"):
+        corner = coeff[..., :k, :k] * (k / f)
+        if d is not None:
+            corner[..., _diagonal_mask(k, d)] = 0
+        pixels = idct_2D(corner, out=corner)
+
+    return _round_clip(pixels, stats=stats)
+
+
+def thumbnail_from_coefficients(coefficients, k=1, d=None, stats=None):
+    """
+    Builds a thumbnail of a gray scale image from the DCT coefficients of its
+    blocks, as returned by compute_coefficients, without the full inverse DCT:
+    each block becomes k x k pixels, see thumbnail_blocks. The thumbnail is
+    the compressed image downscaled by k / F, at a fraction of the cost of
+    reconstruct_image.
+
+    Args:
+        coefficients (np.ndarray): array of shape (n_rows, n_cols, F, F) of
+                                    DCT coefficients.
+        k (int, optional): size of the decoded blocks, in [1, F]. Default is
+                                    1, one pixel per block.
+        d (int, optional): parameter that determines how many coefficients to
+                                    keep, all of them by default.
+        stats (dct.stats.CompressionStats, optional): collector of the time of
+                                    the stages.
+
+    Returns:
+        thumbnail (PIL.Image): image of size (n_cols * k, n_rows * k).
+    """
+    if stats is None:
+        stats = NO_STATS
+
+    pixels = _rebuild_image(thumbnail_blocks(coefficients, k, d, stats))
+    with stats.stage("fromarray"):
+        return Image.fromarray(pixels)
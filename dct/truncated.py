@@ -0,0 +1,108 @@
+import numpy as np
+from functools import lru_cache
+from .dct1D import get_dct_plan
+
+
+@lru_cache(maxsize=None)
+def triangle_indices(f, d):
+    """
+    Computes the positions of the coefficients kept by the cut at the d-th
+    diagonal of a F x F block, all the (i, j) with i + j < d, in the order of
+    the packed layout: diagonal by diagonal, and by increasing i within a
+    diagonal. For d <= F there are d(d + 1) / 2 of them.
+
+    Args:
+        f (int): size of the blocks.
+        d (int): index of the first diagonal to be cut.
+
+    Returns:
+        rows (np.ndarray): read-only array of the row index i of each kept
+                            coefficient.
+        cols (np.ndarray): read-only array of the column index j of each kept
+                            coefficient.
+    """
+    i, j = np.indices((f, f))
+    kept = i + j < d
+    i, j = i[kept], j[kept]
+
+    # Sort by diagonal, then by row
+    order = np.lexsort((i, i + j))
+    rows, cols = i[order], j[order]
+    rows.flags.writeable = False
+    cols.flags.writeable = False
+    return rows, cols
+
+
+def _truncated_basis(f, d, dtype):
+    """
+    Returns the first min(d, F) rows of the DCT basis of size F, the only
+    frequencies the kept coefficients depend on.
+    """
+    if not 0 <= d <= 2 * f - 1:
+        raise ValueError(f"d must be in [0, {2 * f - 1}], got {d}.")
+    return get_dct_plan(f, dtype).D[: min(d, f)]
+
+
+def truncated_dct_2D(x, d, dtype=np.float64):
+    """
+    Computes only the DCT coefficients with indices i + j < d of every F x F
+    matrix of x, which are the ones jpg_compression keeps. Since they all have
+    i < d and j < d, only the first d rows D_d of the basis are needed:
+    C_d = D_d @ x @ D_d^T is a d x d matrix instead of F x F, and its upper
+    left triangle is packed in a vector. For small d this costs a fraction of
+    the full transform, and the coefficients take d(d + 1) / 2 values per
+    block instead of F^2.
+
+    Args:
+        x (np.ndarray): array of shape (..., F, F).
+        d (int): index of the first diagonal of coefficients to be cut, in
+                    [0, 2F - 1].
+        dtype (np.dtype, optional): floating point type of the computation.
+
+    Returns:
+        packed (np.ndarray): array of shape (..., n) with the n kept coefficients
+                            of each matrix, in the order of triangle_indices.
+    """
+    x = np.asarray(x)
+    f = x.shape[-1]
+    if x.shape[-2] != f:
+        raise ValueError(f"Expected square matrices, got {x.shape[-2]}x{f}.")
+
+    basis = _truncated_basis(f, d, dtype)
+    coeff = np.matmul(np.matmul(basis, x, dtype=dtype), basis.T)
+
+    rows, cols = triangle_indices(f, d)
+    return coeff[..., rows, cols]
+
+
+def truncated_idct_2D(packed, f, d, out=None):
+    """
+    Rebuilds the F x F matrices from the kept DCT coefficients packed by
+    truncated_dct_2D, all the other coefficients being zero:
+    x = D_d^T @ C_d @ D_d, with C_d the d x d matrix of the kept coefficients.
+
+    Args:
+        packed (np.ndarray): array of shape (..., n) of packed coefficients.
+        f (int): size of the matrices.
+        d (int): index of the first diagonal of coefficients that was cut, in
+                    [0, 2F - 1].
+        out (np.ndarray, optional): array of shape (..., F, F) receiving the
+                                    matrices.
+
+    Returns:
+        x (np.ndarray): array of shape (..., F, F) containing the matrices.
+    """
+    packed = np.asarray(packed)
+    rows, cols = triangle_indices(f, d)
+    if packed.shape[-1] != len(rows):
+        raise ValueError(
+            f"Expected {len(rows)} coefficients per block for F = {f} and "
+            + f"d = {d}, got {packed.shape[-1]}."
+        )
+
+    basis = _truncated_basis(f, d, np.result_type(packed.dtype, 1.0))
+    k = len(basis)
+    coeff = np.zeros((*packed.shape[:-1], k, k), dtype=basis.dtype)
+    coeff[..., rows, cols] = packed
+
+    return np.matmul(np.matmul(basis.T, coeff), basis, out=out)
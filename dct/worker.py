@@ -0,0 +1,128 @@
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job when it has been cancelled, to stop it at the next
+    progress report.
+    """
+
+
+class CompressionJob:
+    """
+    A task run by a CompressionWorker. The task reports its progress through
+    the job, which is where it notices that it has been cancelled. The thread
+    that submitted the job reads the progress and the result from the job
+    attributes, for instance polling them from a GUI event loop.
+
+    Attributes:
+        func (callable): the task, called as func(job) on the worker thread.
+        cancelled (bool): True once the job has been cancelled.
+        progress (float): fraction of the task done, in [0, 1].
+        done (bool): True once the task has returned, failed or been cancelled.
+        result: value returned by the task.
+        error (Exception): exception raised by the task, if any.
+        elapsed (float): time spent running the task, in seconds.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.cancelled = False
+        self.progress = 0.0
+        self.done = False
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, progress):
+        """
+        Sets the progress of the job, raising JobCancelled if it has been
+        cancelled.
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        self.progress = progress
+
+    def stage(self, start, stop):
+        """
+        Returns a progress callback for a stage of the job going from start to
+        stop, called as callback(done, total) like the progress callbacks of
+        dct.image_compress.
+        """
+        return lambda done, total: self.report(start + (stop - start) * done / total)
+
+    def run(self):
+        """
+        Runs the task, catching its exceptions.
+        """
+        start = time.perf_counter()
+        try:
+            self.report(0.0)
+            self.result = self.func(self)
+            self.progress = 1.0
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.done = True
+
+
+class CompressionWorker:
+    """
+    Runs jobs one at a time on a background thread. Each new job supersedes
+    the previous ones: the running job is cancelled and a job still waiting
+    is dropped, so only the latest request gets done. A dropped job never
+    runs, so it is never done.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = None
+        self._running = None
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        """
+        Queues a job, cancelling the ones submitted before.
+
+        Returns:
+            job (CompressionJob): the submitted job.
+        """
+        with self._condition:
+            self._cancel_jobs()
+            self._pending = job
+            self._condition.notify()
+        return job
+
+    def cancel(self):
+        """
+        Cancels the running job and drops the waiting one.
+        """
+        with self._condition:
+            self._cancel_jobs()
+
+    def _cancel_jobs(self):
+        for job in (self._pending, self._running):
+            if job is not None:
+                job.cancel()
+        self._pending = None
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                job, self._pending = self._pending, None
+                self._running = job
+
+            job.run()
+
+            with self._condition:
+                self._running = None
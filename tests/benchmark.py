@@ -0,0 +1,252 @@
+"""
+Benchmark suite of the hot paths of the compressor, runnable offline.
+
+Every case is run a few times to warm up caches and plans, then timed over
+repeated samples, each sample looping over the case long enough to be
+measured reliably. The median and the interquartile range (IQR) of the
+samples are reported, and can be written to a JSON file.
+
+The results are compared with a stored baseline: the run fails if the median
+time of a case grows by more than the threshold (see compare). The baseline
+depends on the machine, regenerate it on the reference machine with
+
+    python -m tests.benchmark --output tests/benchmark_baseline.json
+"""
+
+from dct.dct1D import build_dct_orthobasis, dct_1D, get_dct_plan
+from dct.dct2D import dct_2D
+from dct.image_compress import compute_coefficients, jpg_compression
+from dct.jpeg import encode_jpeg
+from dct.thumbnail import thumbnail_from_coefficients
+from PIL import Image
+import argparse
+import json
+import math
+import numpy as np
+import os
+import platform
+import scipy
+import sys
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+
+def measure(func, warmup=2, repeat=15, min_time=0.01):
+    """
+    Times a function with warmup and repeated samples.
+
+    Args:
+        func (callable): function to time, called without arguments.
+        warmup (int, optional): number of untimed calls before the samples.
+        repeat (int, optional): number of samples.
+        min_time (float, optional): minimum duration of a sample in seconds,
+                                    fast functions are called several times
+                                    per sample to reach it.
+
+    Returns:
+        stats (dict): median, first and third quartile and IQR of the time of
+                        a call in seconds, number of samples and of calls per
+                        sample.
+    """
+    for _ in range(warmup):
+        func()
+
+    # Number of calls per sample
+    start = time.perf_counter()
+    func()
+    single = time.perf_counter() - start
+    loops = max(1, math.ceil(min_time / max(single, 1e-9)))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+
+    q1, median, q3 = np.percentile(samples, [25, 50, 75])
+    return {
+        "median": float(median),
+        "q1": float(q1),
+        "q3": float(q3),
+        "iqr": float(q3 - q1),
+        "samples": repeat,
+        "loops": loops,
+    }
+
+
+def _test_image(n):
+    """
+    Deterministic n x n gray scale image, a gradient with some noise.
+    """
+    rng = np.random.default_rng(42)
+    i, j = np.mgrid[0:n, 0:n]
+    pixels = 255 * (i + j) / (2 * n) + rng.normal(0, 20, (n, n))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def build_cases(quick=False):
+    """
+    Builds the benchmark cases, all their inputs are prepared here so that
+    only the work of the hot paths is timed.
+
+    Args:
+        quick (bool, optional): only the smaller sizes, for a fast check.
+
+    Returns:
+        cases (dict): name of each case and the function running it.
+    """
+    cases = {}
+    rng = np.random.default_rng(42)
+    matrix_sizes = [8, 64] if quick else [8, 64, 512]
+    image_sizes = [256] if quick else [256, 1024]
+
+    for n in matrix_sizes:
+        mat = rng.random((n, n))
+        plan = get_dct_plan(n)
+        cases[f"build_dct_orthobasis[{n}]"] = lambda n=n: build_dct_orthobasis(n)
+        cases[f"dct_1D[{n}x{n}]"] = lambda mat=mat, plan=plan: dct_1D(mat, plan=plan)
+        cases[f"dct_2D[{n}x{n}]"] = lambda mat=mat: dct_2D(mat)
+
+    for n in image_sizes:
+        image = _test_image(n)
+        for f in [8, 16]:
+            for d in [2, f]:
+                cases[f"jpg_compression[{n}x{n},F={f},d={d}]"] = (
+                    lambda image=image, f=f, d=d: jpg_compression(image, f, d)
+                )
+
+        # Butterflies specialized for 8x8 blocks
+        for backend in ["aan", "islow"]:
+            cases[f"jpg_compression[{n}x{n},F=8,d=6,{backend}]"] = (
+                lambda image=image, backend=backend: jpg_compression(
+                    image, 8, 6, backend
+                )
+            )
+
+        # Only the kept coefficients, for a small d
+        cases[f"jpg_compression[{n}x{n},F=8,d=2,truncated]"] = (
+            lambda image=image: jpg_compression(image, 8, 2, truncated=True)
+        )
+
+        # Opt-in single precision mode
+        cases[f"jpg_compression[{n}x{n},F=8,d=6,float32]"] = (
+            lambda image=image: jpg_compression(image, 8, 6, dtype=np.float32)
+        )
+
+        # Decoding for display, at a quarter of the size
+        coefficients = compute_coefficients(image, 8, 6)
+        cases[f"thumbnail[{n}x{n},F=8,k=2]"] = (
+            lambda coefficients=coefficients: thumbnail_from_coefficients(
+                coefficients, 2
+            )
+        )
+
+        # What saving a JPEG file costs, without the GUI
+        cases[f"save_jpeg[{n}x{n},F=8,d=6]"] = lambda image=image: encode_jpeg(
+            compute_coefficients(image, 8, 6)
+        )
+
+    return cases
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the results of a run with a baseline. A case regresses when its
+    median time grows by more than the threshold and the interquartile ranges
+    of the two runs don't overlap, so that a few noisy samples can't fail
+    the run.
+
+    Args:
+        results (dict): statistics of each case, as returned by measure.
+        baseline (dict): statistics of the baseline run.
+        threshold (float): relative growth of the median time considered a
+                            regression, 0.25 meaning 25% slower.
+
+    Returns:
+        ratios (dict): ratio between the median time and the baseline median
+                        for each case present in both runs.
+        regressions (list): names of the cases that regressed.
+    """
+    ratios = {}
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        ratios[name] = stats["median"] / baseline[name]["median"]
+        if ratios[name] > 1 + threshold and stats["q1"] > baseline[name]["q3"]:
+            regressions.append(name)
+    return ratios, regressions
+
+
+def _metadata(quick):
+    return {
+        "quick": quick,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite of CompressIt.")
+    parser.add_argument("--quick", action="store_true", help="only small sizes")
+    parser.add_argument("--filter", default="", help="only cases containing this")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE,
+        help="JSON file of the baseline results, empty to skip the comparison",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="relative slowdown of a case that fails the run (default 0.25)",
+    )
+    parser.add_argument("--repeat", type=int, default=15, help="samples per case")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            stored = json.load(file)
+        # The cases run before a case change its timings (caches, allocator),
+        # so only runs of the same kind can be compared
+        if stored["meta"].get("quick") == args.quick:
+            baseline = stored["results"]
+        else:
+            print("The baseline was run with a different --quick, not comparing.")
+
+    results = {}
+    for name, func in build_cases(args.quick).items():
+        if args.filter not in name:
+            continue
+        stats = measure(func, repeat=args.repeat)
+        results[name] = stats
+
+        line = f"{name:45s} median {stats['median'] * 1e3:10.4f} ms"
+        line += f"   IQR {stats['iqr'] * 1e3:9.4f} ms"
+        if name in baseline:
+            line += f"   x{stats['median'] / baseline[name]['median']:.2f} baseline"
+        print(line, flush=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"meta": _metadata(args.quick), "results": results}, file, indent=2
+            )
+
+    ratios, regressions = compare(results, baseline, args.threshold)
+    for name in regressions:
+        print(f"REGRESSION: {name} is {ratios[name]:.2f}x slower than the baseline")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from dct.adaptive import adaptive_coefficients
+from dct.image_compress import compute_coefficients, reconstruct_image
+from dct.jpeg import encode_jpeg
+from dct.stats import CompressionStats
+from PIL import Image
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def psnr(compressed, pixels):
+    compressed = np.asarray(compressed).astype(float)
+    mse = (
+        (compressed - pixels[: compressed.shape[0], : compressed.shape[1]]) ** 2
+    ).mean()
+    return 10 * np.log10(255**2 / mse)
+
+
+def main():
+    f = 8
+    image = Image.open("test_images/deer.bmp").convert("L")
+    pixels = np.asarray(image).astype(float)
+
+    # A single d for all the blocks
+    global_psnr, global_size = [], []
+    for d in range(1, 2 * f - 1):
+        coefficients = compute_coefficients(image, f, d)
+        global_psnr.append(psnr(reconstruct_image(coefficients), pixels))
+        global_size.append(len(encode_jpeg(coefficients)) / 1e3)
+
+    # A d for each block, for targets covering the same range of PSNR
+    adaptive_psnr, adaptive_size = [], []
+    for target in np.linspace(global_psnr[0], min(global_psnr[-1], 50), 10):
+        stats = CompressionStats()
+        coefficients, d_map = adaptive_coefficients(image, f, target, stats=stats)
+        adaptive_psnr.append(psnr(reconstruct_image(coefficients), pixels))
+        adaptive_size.append(len(encode_jpeg(coefficients)) / 1e3)
+
+        share = stats.stages["select_d"]["time"] / stats.total_time()
+        print(
+            f"Target {target:.1f} dB:\tPSNR {adaptive_psnr[-1]:.2f} dB"
+            + f"\tsize {adaptive_size[-1]:.1f} kB\td in [{d_map.min()}, {d_map.max()}]"
+            + f"\tchoice of d {100 * share:.0f}% of the time"
+        )
+
+    # Plot result
+    plt.figure(figsize=(12, 6))
+    plt.plot(global_size, global_psnr, marker="o", label="Same d for all the blocks")
+    plt.plot(adaptive_size, adaptive_psnr, marker="x", label="d of each block")
+    plt.xlabel("JPEG size (kB)")
+    plt.ylabel("PSNR (dB)")
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from dct.color import color_jpg_compression, SUBSAMPLING
+from dct.image_compress import jpg_compression
+from PIL import Image
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+
+
+def planes_jpg_compression(image, f, d):
+    """
+    Compresses the three RGB channels separately as gray scale images,
+    which is how color images had to be compressed before.
+    """
+    channels = [jpg_compression(channel, f, d) for channel in image.split()]
+    return Image.merge("RGB", channels)
+
+
+def time_it(func, n_reps, *args):
+    best = float("inf")
+    for _ in range(n_reps):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n_reps = 3
+    f, d = 8, 6
+    test_sizes = [256, 512, 1024, 2048]
+
+    np.random.seed(42)
+
+    throughputs = {name: [] for name in ["3 gray planes", *SUBSAMPLING]}
+
+    for N in test_sizes:
+        print(f"Testing {N}x{N} image...")
+        pixels = np.random.randint(0, 256, (N, N, 3), dtype=np.uint8)
+        image = Image.fromarray(pixels)
+        megapixels = N * N / 1e6
+
+        for name in throughputs:
+            if name in SUBSAMPLING:
+                best = time_it(color_jpg_compression, n_reps, image, f, d, name)
+            else:
+                best = time_it(planes_jpg_compression, n_reps, image, f, d)
+
+            throughputs[name].append(megapixels / best)
+            print(f"\t{name}: {best:.6f}s\t{throughputs[name][-1]:.2f} MP/s")
+
+    # Plot result
+    plt.figure(figsize=(12, 6))
+    for name, values in throughputs.items():
+        plt.plot(test_sizes, values, marker="o", label=name)
+    plt.xlabel("N (size of NxN image)")
+    plt.ylabel("Throughput (megapixels per second)")
+    plt.xscale("log", base=2)
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from scipy.fft import dct, idct
+from dct.image_compress import jpg_compression
+from PIL import Image
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+
+
+def loop_jpg_compression(image, f, d):
+    """
+    Reference block by block implementation of jpg_compression, used to
+    check that the batched engine gives the same result and to measure
+    the speedup.
+    """
+    pixels = np.asarray(image)
+    n_rows, n_cols = pixels.shape[0] // f, pixels.shape[1] // f
+    out = np.empty((n_rows * f, n_cols * f), dtype=np.uint8)
+
+    for r in range(n_rows):
+        for c in range(n_cols):
+            block = pixels[r * f : (r + 1) * f, c * f : (c + 1) * f]
+            coeff = dct(dct(block, norm="ortho", axis=1), norm="ortho", axis=0)
+            for i in range(f):
+                for j in range(f):
+                    if i + j >= d:
+                        coeff[i, j] = 0
+            res = idct(idct(coeff, norm="ortho", axis=1), norm="ortho", axis=0)
+            out[r * f : (r + 1) * f, c * f : (c + 1) * f] = np.clip(
+                np.rint(res), 0, 255
+            )
+
+    return Image.fromarray(out)
+
+
+def time_it(func, n_reps, *args):
+    times = []
+    for _ in range(n_reps):
+        start = time.perf_counter()
+        res = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), res
+
+
+def main():
+    n_reps = 3
+    test_sizes = [2**i for i in range(6, 12)]
+    test_fs = [4, 8, 16]
+
+    np.random.seed(42)
+
+    speedups = {f: [] for f in test_fs}
+
+    for N in test_sizes:
+        image = Image.fromarray(np.random.randint(0, 256, (N, N), dtype=np.uint8))
+
+        for f in test_fs:
+            d = f
+            print(f"Testing {N}x{N} image, F = {f}, d = {d}...")
+
+            loop_time, loop_res = time_it(loop_jpg_compression, n_reps, image, f, d)
+            batch_time, batch_res = time_it(jpg_compression, n_reps, image, f, d)
+
+            # The batched engine must not change the result
+            assert np.array_equal(np.asarray(loop_res), np.asarray(batch_res))
+
+            speedups[f].append(loop_time / batch_time)
+            print(
+                f"\tLoop: {loop_time:.6f}s\tBatched: {batch_time:.6f}s"
+                + f"\tSpeedup: {speedups[f][-1]:.1f}x"
+            )
+
+    # Plot result
+    plt.figure(figsize=(12, 6))
+    for f in test_fs:
+        plt.plot(test_sizes, speedups[f], marker="o", label=f"F = {f}")
+    plt.xlabel("N (size of NxN image)")
+    plt.ylabel("Speedup (loop time / batched time)")
+    plt.xscale("log", base=2)
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,21 @@
 from scipy.fft import dct
 from dct.dct2D import dct_2D
+from dct.fast_dct import fast_dct_2D
 import numpy as np
+import os
 import time
 import matplotlib.pyplot as plt
 import math
 
-plt.style.use(
-    "https://github.com/dhaitz/matplotlib-stylesheets/raw/master/pitayasmoothie-light.mplstyle"
-)
+plt.style.use(os.path.join(os.path.dirname(__file__), "plot_style.mplstyle"))
 
 
 def main():
     n_reps = 5
     cust_times = []
+    fast_times = []  # should follow O(N^2log(N)) like scipy
     lib_times = []
+    blas_times = []  # single N x N matrix product, reference for the manual DCT
     cust_times_t = []  # should be O(N^3)
     lib_times_t = []  # should be O(N^2log(N))
 
@@ -50,6 +52,19 @@ def main():
 
         cust_times.append(mean / n_reps)
 
+        # Compute manual FFT based DCT
+        print("\tFast custom DCT...")
+        mean = 0
+        for j in range(n_reps):
+            start = time.perf_counter()
+            res4 = fast_dct_2D(mat)
+            end = time.perf_counter()
+            elapsed = end - start
+            mean += elapsed
+            print(f"\t\tTest {j+1}: {elapsed:.6f}s")
+
+        fast_times.append(mean / n_reps)
+
         # Compute fast DCT from library
         # Apply it two times, once on rows, obnce on cols
         print("\tScipy DCT...")
@@ -64,10 +79,27 @@ def main():
 
         lib_times.append(mean / n_reps)
 
+        # Compute a single matrix product with BLAS, the manual DCT
+        # does two of them so it should stay within a small factor of it
+        print("\tBLAS matmul...")
+        mean = 0
+        for j in range(n_reps):
+            start = time.perf_counter()
+            res3 = mat @ mat
+            end = time.perf_counter()
+            elapsed = end - start
+            mean += elapsed
+            print(f"\t\tTest {j+1}: {elapsed:.6f}s")
+
+        blas_times.append(mean / n_reps)
+        print(f"\tCustom DCT / BLAS matmul: {cust_times[-1] / blas_times[-1]:.2f}")
+
     # Plot result
     plt.figure(figsize=(12, 6))
     (line1,) = plt.plot(test_sizes, cust_times, label="Custom DCT")
     (line2,) = plt.plot(test_sizes, lib_times, label="Scipy DCT")
+    plt.plot(test_sizes, fast_times, label="Fast custom DCT")
+    plt.plot(test_sizes, blas_times, label="BLAS matmul", color="gray")
     plt.plot(
         test_sizes,
         cust_times_t,
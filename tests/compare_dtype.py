@@ -0,0 +1,71 @@
+from dct.image_compress import jpg_compression
+from PIL import Image
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+
+
+def time_it(func, n_reps, *args, **kwargs):
+    best = float("inf")
+    for _ in range(n_reps):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n_reps = 5
+    f, d = 8, 6
+    test_sizes = [256, 512, 1024, 2048, 4096]
+    backends = ["scipy", "matmul", "fused"]
+    dtypes = [np.float64, np.float32]
+
+    np.random.seed(42)
+
+    speedups = {backend: [] for backend in backends}
+
+    for N in test_sizes:
+        print(f"Testing {N}x{N} image...")
+        image = Image.fromarray(np.random.randint(0, 256, (N, N), dtype=np.uint8))
+        expected = np.asarray(jpg_compression(image, f, d)).astype(int)
+
+        for backend in backends:
+            times = []
+            for dtype in dtypes:
+                result = jpg_compression(image, f, d, backend, dtype=dtype)
+                # Single precision may only move pixels by one gray level
+                assert np.abs(np.asarray(result) - expected).max() <= 1
+
+                best = time_it(
+                    jpg_compression, n_reps, image, f, d, backend, dtype=dtype
+                )
+                times.append(best)
+
+                # Bandwidth of the float coefficients, written by the DCT
+                # and read back by the IDCT
+                gigabytes = 2 * N * N * np.dtype(dtype).itemsize / 1e9
+                print(
+                    f"\t{backend} {np.dtype(dtype).name}: {best:.6f}s"
+                    + f"\t{N * N / 1e6 / best:.2f} MP/s"
+                    + f"\t{gigabytes / best:.2f} GB/s of coefficients"
+                )
+
+            speedups[backend].append(times[0] / times[1])
+            print(f"\t{backend} float32 speedup: {speedups[backend][-1]:.2f}x")
+
+    # Plot result
+    plt.figure(figsize=(12, 6))
+    for backend, values in speedups.items():
+        plt.plot(test_sizes, values, marker="o", label=backend)
+    plt.axhline(1, linestyle="dashed", color="gray")
+    plt.xlabel("N (size of NxN image)")
+    plt.ylabel("Speedup of float32 over float64")
+    plt.xscale("log", base=2)
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
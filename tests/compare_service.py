@@ -0,0 +1,108 @@
+from PIL import Image
+from io import BytesIO
+import numpy as np
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import matplotlib.pyplot as plt
+
+
+async def _client(address, target, body, n_requests, latencies, statuses):
+    """
+    Sends n_requests compressions one after the other on a kept alive
+    connection, recording the latency and status of each of them.
+    """
+    reader, writer = await asyncio.open_connection(*address)
+    head = f"POST {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n"
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await reader.readexactly(length)
+
+        latencies.append(time.perf_counter() - start)
+        statuses.append(status)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def _load(address, target, body, concurrency, n_requests):
+    latencies, statuses = [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(address, target, body, n_requests, latencies, statuses)
+            for _ in range(concurrency)
+        )
+    )
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main():
+    n_requests = 20
+    f, d = 8, 6
+    N = 1024
+    workers = os.cpu_count() or 1
+    test_concurrency = [1, 2, 4, 8, 16, 32]
+
+    np.random.seed(42)
+    buffer = BytesIO()
+    Image.fromarray(np.random.randint(0, 256, (N, N), dtype=np.uint8)).save(
+        buffer, "BMP"
+    )
+    body = buffer.getvalue()
+    target = f"/compress?f={f}&d={d}"
+
+    # The service runs in its own process, as it would for its clients
+    service = subprocess.Popen(
+        [sys.executable, "-m", "dct.service", "--port", "0", "-j", str(workers)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        address = json.loads(service.stdout.readline())["address"]
+        print(f"Service with {workers} workers listening on {address}")
+
+        p50s, p99s = [], []
+        for concurrency in test_concurrency:
+            latencies, statuses, elapsed = asyncio.run(
+                _load(address, target, body, concurrency, n_requests)
+            )
+            # Latencies of the compressed images only, rejections are immediate
+            served = [t for t, s in zip(latencies, statuses) if s == 200]
+            p50, p99 = np.percentile(served, [50, 99]) * 1000
+            p50s.append(p50)
+            p99s.append(p99)
+            print(
+                f"\t{concurrency} clients: p50 {p50:.1f}ms\tp99 {p99:.1f}ms"
+                + f"\t{len(served) / elapsed:.1f} images/s"
+                + f"\t{statuses.count(503)} rejected"
+            )
+    finally:
+        service.terminate()
+        service.wait()
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(test_concurrency, p50s, marker="o", label="p50")
+    plt.plot(test_concurrency, p99s, marker="o", label="p99")
+    plt.xscale("log", base=2)
+    plt.xlabel("Concurrent clients")
+    plt.ylabel("Latency (ms)")
+    plt.title(f"{N}x{N} images, F = {f}, d = {d}, {workers} workers")
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
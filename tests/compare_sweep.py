@@ -0,0 +1,50 @@
+from dct.image_compress import jpg_compression
+from dct.sweep import rd_sweep
+from PIL import Image
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+
+
+def main():
+    f = 8
+    image = Image.open("test_images/deer.bmp").convert("L")
+    pixels = np.asarray(image).astype(float)
+
+    # One compression per value of d
+    start = time.perf_counter()
+    exact_psnr = []
+    for d in range(2 * f - 1):
+        compressed = np.asarray(jpg_compression(image, f, d))
+        mse = (
+            (compressed - pixels[: compressed.shape[0], : compressed.shape[1]]) ** 2
+        ).mean()
+        exact_psnr.append(10 * np.log10(255**2 / mse) if mse > 0 else np.inf)
+    loop_time = time.perf_counter() - start
+
+    # A single sweep
+    start = time.perf_counter()
+    curve = rd_sweep(image, f)
+    sweep_time = time.perf_counter() - start
+
+    print(f"Compression for each d: {loop_time:.6f}s")
+    print(f"Sweep: {sweep_time:.6f}s\tSpeedup: {loop_time / sweep_time:.1f}x")
+    for d, psnr, size in zip(curve["d"], curve["psnr"], curve["size"]):
+        print(
+            f"\td = {d}:\tPSNR {psnr:.2f} dB (exact {exact_psnr[d]:.2f} dB)"
+            + f"\testimated size {size / 1e3:.1f} kB"
+        )
+
+    # Plot result
+    plt.figure(figsize=(12, 6))
+    plt.plot(curve["size"] / 1e3, curve["psnr"], marker="o", label="Sweep estimate")
+    plt.plot(curve["size"] / 1e3, exact_psnr, marker="x", label="Exact PSNR")
+    plt.xlabel("Estimated size (kB)")
+    plt.ylabel("PSNR (dB)")
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from dct.image_compress import jpg_compression
+from PIL import Image
+import numpy as np
+import os
+import time
+import matplotlib.pyplot as plt
+
+
+def main():
+    n_reps = 3
+    f, d = 8, 6
+    test_sizes = [1024, 2048, 4096]
+    test_workers = list(range(1, (os.cpu_count() or 1) + 1))
+
+    np.random.seed(42)
+
+    plt.figure(figsize=(12, 6))
+
+    for N in test_sizes:
+        image = Image.fromarray(np.random.randint(0, 256, (N, N), dtype=np.uint8))
+        serial = np.asarray(jpg_compression(image, f, d))
+
+        for executor in ["thread", "process"]:
+            print(f"Testing {N}x{N} image with a {executor} pool...")
+            times = []
+
+            for workers in test_workers:
+                best = float("inf")
+                for _ in range(n_reps):
+                    start = time.perf_counter()
+                    res = jpg_compression(
+                        image, f, d, workers=workers, executor=executor
+                    )
+                    best = min(best, time.perf_counter() - start)
+
+                # Parallel compression must give the serial result
+                assert np.array_equal(np.asarray(res), serial)
+
+                times.append(best)
+                print(
+                    f"\t{workers} workers: {best:.6f}s"
+                    + f"\tSpeedup: {times[0] / best:.2f}x"
+                )
+
+            plt.plot(
+                test_workers,
+                [times[0] / t for t in times],
+                marker="o",
+                label=f"{N}x{N}, {executor}",
+            )
+
+    # Ideal linear scaling
+    plt.plot(
+        test_workers, test_workers, linestyle="dashed", color="gray", label="Linear"
+    )
+    plt.xlabel("Workers")
+    plt.ylabel("Speedup")
+    plt.legend()
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import numpy as np
+from PIL import Image
+from dct.adaptive import (
+    adaptive_coefficients,
+    adaptive_jpg_compression,
+    diagonal_energies,
+    select_block_d,
+)
+from dct.image_compress import compute_coefficients, jpg_compression
+from dct.jpeg import encode_jpeg
+
+
+def _psnr(compressed, image):
+    compressed = np.asarray(compressed).astype(float)
+    pixels = np.asarray(image)[: compressed.shape[0], : compressed.shape[1]]
+    return 10 * np.log10(255**2 / np.mean((compressed - pixels) ** 2))
+
+
+def test_diagonal_energies():
+    # More blocks than a chunk
+    coeff = np.random.normal(0, 10, (40, 30, 8, 8))
+    energies = diagonal_energies(coeff)
+    assert energies.shape == (40, 30, 15)
+
+    i, j = np.indices((8, 8))
+    for k in [0, 3, 7, 14]:
+        expected = (coeff**2)[..., i + j == k].sum(axis=-1)
+        assert np.allclose(energies[..., k], expected)
+
+
+def test_select_block_d():
+    coeff = np.random.normal(0, 20, (4, 4, 8, 8))
+    coeff[:2] = 0
+    coeff[:2, :, 0, 0] = 1000
+    d_map = select_block_d(coeff, 30)
+
+    # Flat blocks only need their DC coefficient
+    assert d_map.shape == (4, 4)
+    assert np.all(d_map[:2] == 1) and d_map[2:].mean() > 4
+    # Higher quality keeps more coefficients
+    assert np.all(select_block_d(coeff, 40) >= d_map)
+    assert np.all(select_block_d(coeff, 200) == 15)
+    # Never below the DC coefficient
+    assert np.all(select_block_d(coeff, 5) == 1)
+    assert np.all(select_block_d(np.zeros((2, 3, 8, 8)), 30) == 1)
+
+
+def test_adaptive_jpg_compression():
+    image = Image.open("test_images/deer.bmp").convert("L")
+
+    for target in [30, 38]:
+        compressed = adaptive_jpg_compression(image, 8, target)
+        psnr = _psnr(compressed, image)
+        assert abs(psnr - target) < 0.5
+
+        coefficients, d_map = adaptive_coefficients(image, 8, target)
+        assert np.array_equal(compressed.info["d_map"], d_map)
+        assert d_map.min() < d_map.max()
+
+        # Smaller than with the first d reaching the same PSNR for all the blocks
+        d = next(
+            d for d in range(16) if _psnr(jpg_compression(image, 8, d), image) >= psnr
+        )
+        size = len(encode_jpeg(compute_coefficients(image, 8, d)))
+        assert len(encode_jpeg(coefficients)) < size
@@ -0,0 +1,37 @@
+import json
+import numpy as np
+from scipy.fft import dctn
+from dct import backends
+from dct.backends import available_backends, get_backend, select_backend
+from dct.dct2D import dct_2D, idct_2D
+
+
+def test_backends_match_scipy():
+    blocks = np.random.rand(10, 8, 8)
+    expected = dctn(blocks, norm="ortho", axes=(-2, -1))
+
+    for name in available_backends():
+        backend = get_backend(name)
+        if not backend.exact:
+            continue
+        c = backend.forward(blocks)
+        assert np.allclose(c, expected)
+        assert np.allclose(backend.inverse(c), blocks)
+
+        assert np.allclose(dct_2D(blocks, backend=name), expected)
+        assert np.allclose(idct_2D(expected, backend=name), blocks)
+
+
+def test_auto_backend_is_persisted(tmp_path, monkeypatch):
+    tuning_file = tmp_path / "backends.json"
+    monkeypatch.setattr(backends, "TUNING_FILE", str(tuning_file))
+    monkeypatch.setattr(backends, "_tuning", None)
+
+    backend = select_backend(8)
+    with open(tuning_file) as file:
+        assert json.load(file) == {"8x8:float64": backend.name}
+
+    # A new process reads the winner from the file instead of calibrating again
+    monkeypatch.setattr(backends, "_tuning", None)
+    monkeypatch.setattr(backends, "calibrate", None)
+    assert select_backend(8) is backend
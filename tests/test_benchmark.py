@@ -0,0 +1,37 @@
+from tests.benchmark import build_cases, compare, measure
+
+
+def test_measure():
+    stats = measure(lambda: sum(range(100)), warmup=1, repeat=5, min_time=0.001)
+
+    assert stats["samples"] == 5 and stats["loops"] >= 1
+    assert stats["q1"] <= stats["median"] <= stats["q3"]
+    assert stats["iqr"] == stats["q3"] - stats["q1"]
+
+
+def test_compare():
+    def stats(q1, median, q3):
+        return {"q1": q1, "median": median, "q3": q3}
+
+    baseline = {
+        "a": stats(0.9, 1.0, 1.1),
+        "b": stats(1.9, 2.0, 2.1),
+        "c": stats(0.5, 1.0, 2.0),
+        "d": stats(0.9, 1.0, 1.1),
+    }
+    results = {
+        "a": stats(1.1, 1.2, 1.3),
+        "b": stats(2.8, 3.0, 3.2),
+        "c": stats(1.8, 2.0, 2.2),
+        "e": stats(4.0, 5.0, 6.0),
+    }
+
+    # c is much slower, but its samples overlap with the noisy baseline
+    ratios, regressions = compare(results, baseline, 0.25)
+    assert ratios == {"a": 1.2, "b": 1.5, "c": 2.0}
+    assert regressions == ["b"]
+
+
+def test_cases_run():
+    for func in build_cases(quick=True).values():
+        func()
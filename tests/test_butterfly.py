@@ -0,0 +1,94 @@
+import math
+import numpy as np
+import pytest
+from PIL import Image
+from dct import butterfly
+from dct.butterfly import aan_dct_8x8, aan_idct_8x8, islow_dct_8x8, islow_idct_8x8
+from dct.dct2D import dct_2D, idct_2D
+from dct.image_compress import jpg_compression
+
+
+def test_butterfly_constants():
+    c = [math.cos(k * math.pi / 16) for k in range(8)]
+    s = math.sqrt(2)
+
+    # Values of the constants of libjpeg's jfdctint.c and jidctint.c
+    fix = {
+        "FIX_0_298631336": s * (-c[1] + c[3] + c[5] - c[7]),
+        "FIX_0_390180644": s * (c[3] - c[5]),
+        "FIX_0_541196100": s * c[6],
+        "FIX_0_765366865": s * (c[2] - c[6]),
+        "FIX_0_899976223": s * (c[3] - c[7]),
+        "FIX_1_175875602": s * c[3],
+        "FIX_1_501321110": s * (c[1] + c[3] - c[5] - c[7]),
+        "FIX_1_847759065": s * (c[2] + c[6]),
+        "FIX_1_961570560": s * (c[3] + c[5]),
+        "FIX_2_053119869": s * (c[1] + c[3] - c[5] + c[7]),
+        "FIX_2_562915447": s * (c[1] + c[3]),
+        "FIX_3_072711026": s * (c[1] + c[3] + c[5] - c[7]),
+    }
+    for name, value in fix.items():
+        # The name spells the value with 9 decimals
+        assert abs(value - float(name[4:].replace("_", "."))) < 1e-9
+        assert getattr(butterfly, name) == round(value * 2**butterfly.CONST_BITS)
+
+    # The multipliers of the float butterflies, named after their value
+    for name in dir(butterfly):
+        if name.startswith("_F_"):
+            value = float(name[3:].replace("_", "."))
+            assert abs(getattr(butterfly, name) - value) < 1e-9
+
+
+def test_aan_matches_dct_2D():
+    blocks = np.random.rand(6, 5, 8, 8) * 255
+    expected = dct_2D(blocks)
+
+    c = aan_dct_8x8(blocks)
+    assert np.allclose(c, expected)
+    assert np.allclose(aan_idct_8x8(c), blocks)
+    assert np.allclose(aan_idct_8x8(expected), idct_2D(expected))
+
+    # In place, in a strided view and in single precision
+    out = np.zeros((6, 8, 5, 8)).swapaxes(1, 2)
+    assert aan_dct_8x8(blocks, out=out) is out
+    assert np.allclose(out, expected)
+    assert aan_idct_8x8(out, out=out) is out
+    assert np.allclose(out, blocks)
+    c = aan_dct_8x8(blocks.astype(np.float32))
+    assert c.dtype == np.float32
+    assert np.allclose(c, expected, atol=1e-3)
+
+    with pytest.raises(ValueError):
+        aan_dct_8x8(np.zeros((4, 16, 16)))
+
+
+def test_islow_matches_dct_2D():
+    pixels = np.random.randint(0, 256, (20, 20, 8, 8))
+    expected = dct_2D(pixels)
+
+    # Coefficients in steps of 1/8, within a fraction of a unit
+    c = islow_dct_8x8(pixels)
+    assert np.array_equal(c * 8, np.rint(c * 8))
+    assert np.abs(c - expected).max() < 0.25
+
+    # The integer inverse gives back the pixels, and rounds the IDCT of
+    # any coefficients to integers within one unit
+    assert np.array_equal(islow_idct_8x8(c), pixels)
+    coeff = np.random.normal(0, 50, (20, 20, 8, 8))
+    samples = islow_idct_8x8(coeff)
+    assert np.array_equal(samples, np.rint(samples))
+    assert np.abs(samples - idct_2D(coeff)).max() <= 1
+
+
+def test_jpg_compression_butterflies():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    expected = np.asarray(jpg_compression(image, 8, 6)).astype(int)
+
+    result = jpg_compression(image, 8, 6, backend="aan")
+    assert np.array_equal(np.asarray(result), expected)
+
+    # Integer arithmetic only, the same result whatever the band split
+    islow = np.asarray(jpg_compression(image, 8, 6, backend="islow"))
+    assert np.abs(islow - expected).max() <= 1
+    result = jpg_compression(image, 8, 6, backend="islow", workers=3)
+    assert np.array_equal(np.asarray(result), islow)
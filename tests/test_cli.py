@@ -0,0 +1,55 @@
+import json
+import shutil
+from dct.__main__ import main
+
+
+def _run(capsys, *argv):
+    code = main(list(argv))
+    lines = capsys.readouterr().out.splitlines()
+    return code, [json.loads(line) for line in lines]
+
+
+def test_cli(tmp_path, capsys):
+    for name in ["20x20.bmp", "40x40.bmp", "prova.bmp"]:
+        shutil.copy(f"test_images/{name}", tmp_path / name)
+    pattern, out = str(tmp_path / "*.bmp"), str(tmp_path / "out")
+
+    code, records = _run(capsys, pattern, "-d", "5", "-o", out, "-j", "2")
+    assert code == 0
+    assert sorted(record["status"] for record in records) == ["ok"] * 3 + ["summary"]
+    summary = records[-1]
+    assert summary["compressed"] == 3 and summary["bytes_out"] > 0
+    assert (tmp_path / "out" / "prova.jpg").exists()
+
+    # Outputs are up to date, until the parameters change
+    code, records = _run(capsys, pattern, "-d", "5", "-o", out)
+    assert records[-1]["skipped"] == 3 and records[-1]["compressed"] == 0
+    code, records = _run(capsys, pattern, "-q", "50", "-o", out)
+    assert records[-1]["compressed"] == 3
+    code, records = _run(capsys, pattern, "-q", "50", "-o", out, "--progressive")
+    assert records[-1]["compressed"] == 3
+
+    # Files that can't be compressed are reported
+    (tmp_path / "broken.bmp").write_bytes(b"not an image")
+    code, records = _run(capsys, pattern, "-q", "50", "-o", out)
+    assert code == 1
+    assert [record["status"] for record in records].count("error") == 1
+
+
+def test_cli_keeps_directories(tmp_path, capsys):
+    for name in ["a/x.bmp", "b/x.bmp", "c/y.bmp", "c/y.png"]:
+        (tmp_path / "in" / name).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy("test_images/20x20.bmp", tmp_path / "in" / name)
+    pattern, out = str(tmp_path / "in" / "**" / "*.*"), tmp_path / "out"
+
+    code, records = _run(capsys, pattern, "-d", "5", "-o", str(out), "-j", "2")
+    assert (out / "a" / "x.jpg").exists() and (out / "b" / "x.jpg").exists()
+
+    # Inputs that would overwrite each other are not compressed
+    assert code == 1 and records[-1]["compressed"] == 2
+    errors = [record for record in records if record["status"] == "error"]
+    assert sorted(record["input"][-5:] for record in errors) == ["y.bmp", "y.png"]
+    assert not (out / "c" / "y.jpg").exists()
+
+    code, records = _run(capsys, pattern, "-d", "5", "-o", str(out))
+    assert records[-1]["skipped"] == 2
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from PIL import Image
+from dct.color import color_jpg_compression, _compress_planes
+from dct.image_compress import jpg_compression
+
+
+def _color_image(height, width):
+    i, j = np.mgrid[0:height, 0:width]
+    rgb = np.stack([2 * i, 3 * j, 255 - i - j], axis=-1)
+    return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8))
+
+
+def test_compress_planes_matches_jpg_compression():
+    rng = np.random.default_rng(0)
+    planes = [rng.integers(0, 256, shape, dtype=np.uint8) for shape in [(40, 56)] * 3]
+    fs, ds = (8, 4, 8), (5, 3, 9)
+
+    # Planes with the same F are batched, each keeps its own d
+    for plane, f, d, result in zip(planes, fs, ds, _compress_planes(planes, fs, ds)):
+        expected = np.asarray(jpg_compression(Image.fromarray(plane), f, d))
+        assert np.array_equal(result, expected)
+
+
+def test_color_jpg_compression():
+    image = _color_image(101, 77)
+    pixels = np.asarray(image).astype(int)
+
+    # Keeping all the coefficients only the color conversions lose something
+    for subsampling, tolerance in [("4:4:4", 3), ("4:2:2", 6), ("4:2:0", 6)]:
+        result = color_jpg_compression(image, 8, 15, subsampling)
+        assert result.mode == "RGB" and result.size == (72, 96)
+        assert np.abs(np.asarray(result) - pixels[:96, :72]).max() <= tolerance
+
+    # Per channel parameters, the chroma planes don't need to fit in Y blocks
+    result = color_jpg_compression(image, (8, 16, 5), (5, 7, 3))
+    assert result.size == (72, 96)
+
+    with pytest.raises(ValueError):
+        color_jpg_compression(image, 8, 5, "4:1:1")
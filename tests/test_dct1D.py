@@ -1,11 +1,19 @@
 import matplotlib.pyplot as plt
 import numpy as np
-from dct.dct1D import dct_1D, idct_1D
+import os
+import math
+from scipy.fft import dct
+from dct.dct1D import (
+    dct_1D,
+    idct_1D,
+    build_dct_orthobasis,
+    get_dct_plan,
+    dct_plan_cache_info,
+    clear_dct_plan_cache,
+)
 
 def visualize_dct_1D(f, compression):
-    plt.style.use(
-        "https://github.com/dhaitz/matplotlib-stylesheets/raw/master/pitayasmoothie-light.mplstyle"
-    )
+    plt.style.use(os.path.join(os.path.dirname(__file__), "plot_style.mplstyle"))
     # Sampling the function f at N equidistant points
     N = 100
     x = (2 * np.arange(N) + 1) / (2 * N)
@@ -57,6 +65,46 @@ def visualize_dct_1D(f, compression):
     plt.show()
 
 
+def test_build_dct_orthobasis():
+    N = 12
+    D = build_dct_orthobasis(N)
+
+    # Same samples as the cosine definition of the basis
+    for k in range(N):
+        alpha = N ** (-0.5) if k == 0 else N ** (-0.5) * math.sqrt(2)
+        for i in range(N):
+            assert math.isclose(
+                D[k, i],
+                alpha * math.cos(k * math.pi * (2 * i + 1) / (2 * N)),
+                abs_tol=1e-12,
+            )
+
+    # Basis is orthonormal
+    assert np.allclose(D @ D.T, np.eye(N))
+
+
+def test_dct_plan_cache():
+    clear_dct_plan_cache()
+    f = np.random.rand(16)
+
+    plan = get_dct_plan(16)
+    assert get_dct_plan(16) is plan
+    assert np.allclose(idct_1D(dct_1D(f, plan=plan), plan=plan), f)
+    assert np.allclose(dct_1D(f), dct_1D(f, D=build_dct_orthobasis(16)))
+
+    info = dct_plan_cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+def test_dct_1D_along_axis():
+    f = np.random.rand(3, 10, 7)
+
+    for axis in [0, 1, 2, -1]:
+        c = dct_1D(f, axis=axis)
+        assert np.allclose(c, dct(f, norm="ortho", axis=axis))
+        assert np.allclose(idct_1D(c, axis=axis), f)
+
+
 def main():
     f = lambda x: 0 if x - 0.5 < 0 else 1
     # f = lambda x: 1
@@ -1,12 +1,13 @@
 import numpy as np
+import os
 import matplotlib.pyplot as plt
+from scipy.fft import dctn
 from dct.dct2D import dct_2D, idct_2D
+from dct.dct1D import get_dct_plan
 
 
 def visualize_dct_2D(f, compression):
-    plt.style.use(
-        "https://github.com/dhaitz/matplotlib-stylesheets/raw/master/pitayasmoothie-light.mplstyle"
-    )
+    plt.style.use(os.path.join(os.path.dirname(__file__), "plot_style.mplstyle"))
 
     # Sampling the function f at N equidistant points
     N = 10
@@ -89,6 +90,70 @@ def visualize_dct_2D(f, compression):
     plt.show()
 
 
+def test_dct_2D_matches_scipy():
+    for shape in [(8, 8), (10, 10), (7, 12), (16, 5)]:
+        f = np.random.rand(*shape)
+        c = dct_2D(f)
+
+        assert np.allclose(c, dctn(f, norm="ortho"))
+        assert np.allclose(idct_2D(c), f)
+
+
+def test_dct_2D_with_plans():
+    f = np.random.rand(6, 9)
+    plans = (get_dct_plan(6), get_dct_plan(9))
+
+    assert np.allclose(dct_2D(f, plans), dctn(f, norm="ortho"))
+    assert np.allclose(idct_2D(dct_2D(f, plans), plans), f)
+
+
+def test_dct_2D_on_stack_of_blocks():
+    blocks = np.random.rand(50, 8, 8)
+    c = dct_2D(blocks)
+
+    assert np.allclose(c, dctn(blocks, norm="ortho", axes=(-2, -1)))
+    assert np.allclose(idct_2D(c), blocks)
+
+    # Frames stacked on the last axis
+    frames = np.random.rand(12, 10, 4)
+    c = dct_2D(frames, axes=(0, 1))
+
+    assert np.allclose(c, dctn(frames, norm="ortho", axes=(0, 1)))
+    assert np.allclose(idct_2D(c, axes=(0, 1)), frames)
+
+
+def test_dct_2D_out():
+    blocks = np.random.rand(3, 4, 8, 8)
+    expected = dctn(blocks, norm="ortho", axes=(-2, -1))
+
+    # Output written in a strided view of a bigger array
+    buffer = np.zeros((3, 8, 4, 8))
+    out = buffer.swapaxes(1, 2)
+    for backend in ["matmul", "fused", "fft", "scipy"]:
+        assert dct_2D(blocks, backend=backend, out=out) is out
+        assert np.allclose(buffer.swapaxes(1, 2), expected)
+
+    # In place inverse
+    assert idct_2D(out, out=out) is out
+    assert np.allclose(out, blocks)
+
+
+def test_dct_2D_float32():
+    blocks = np.random.rand(3, 4, 8, 8)
+    expected = dctn(blocks, norm="ortho", axes=(-2, -1))
+
+    for backend in ["matmul", "fused", "scipy"]:
+        c = dct_2D(blocks, backend=backend, dtype=np.float32)
+        assert c.dtype == np.float32
+        assert np.allclose(c, expected, atol=1e-5)
+        assert np.allclose(
+            idct_2D(c, backend=backend, dtype=np.float32), blocks, atol=1e-5
+        )
+
+    # The float32 plans are cached apart from the float64 ones
+    assert get_dct_plan(8, np.float32).D.dtype == np.float32
+
+
 # Defining main function
 def main():
     # f = lambda x, y: 1
@@ -0,0 +1,32 @@
+import numpy as np
+from scipy.fft import dct, dctn
+from dct.dct1D import dct_1D
+from dct.dct2D import dct_2D, idct_2D
+from dct.fast_dct import fast_dct_1D, fast_idct_1D, fast_dct_2D, fast_idct_2D
+
+
+def test_fast_dct_1D_matches_manual_and_scipy():
+    # Both even and odd sizes
+    for N in [1, 2, 7, 8, 33, 64]:
+        f = np.random.rand(5, N)
+        c = fast_dct_1D(f)
+
+        assert np.allclose(c, dct_1D(f))
+        assert np.allclose(c, dct(f, norm="ortho"))
+        assert np.allclose(fast_idct_1D(c), f)
+
+
+def test_fast_dct_2D_matches_manual_and_scipy():
+    for shape in [(8, 8), (15, 10), (4, 6, 9)]:
+        f = np.random.rand(*shape)
+        c = fast_dct_2D(f)
+
+        assert np.allclose(c, dct_2D(f))
+        assert np.allclose(c, dctn(f, norm="ortho", axes=(-2, -1)))
+        assert np.allclose(fast_idct_2D(c), f)
+        assert np.allclose(fast_idct_2D(c), idct_2D(c))
+
+    f = np.random.rand(6, 3, 10)
+    c = fast_dct_2D(f, axes=(0, 2))
+    assert np.allclose(c, dctn(f, norm="ortho", axes=(0, 2)))
+    assert np.allclose(fast_idct_2D(c, axes=(0, 2)), f)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from PIL import Image
+from dct.image_compress import (
+    _subdivide_image,
+    _rebuild_image,
+    compute_coefficients,
+    jpg_compression,
+)
+from dct.stats import CompressionStats
+from tests.compare_compression import loop_jpg_compression
+
+
+def test_subdivide_and_rebuild_image():
+    pixels = np.arange(20 * 30).reshape(20, 30)
+    blocks, n_rows, n_cols = _subdivide_image(pixels, 8)
+
+    assert (n_rows, n_cols) == (2, 3)
+    assert np.array_equal(blocks[1, 2], pixels[8:16, 16:24])
+    assert np.array_equal(_rebuild_image(blocks), pixels[:16, :24])
+
+
+def test_jpg_compression_matches_block_by_block():
+    image = Image.open("test_images/deer.bmp").convert("L")
+
+    for f, d in [(8, 0), (8, 5), (8, 14), (5, 3), (16, 10)]:
+        expected = np.asarray(loop_jpg_compression(image, f, d))
+        result = np.asarray(jpg_compression(image, f, d))
+        assert np.array_equal(result, expected)
+
+
+def test_jpg_compression_workers():
+    image = Image.open("test_images/gradient.bmp").convert("L")
+    expected = np.asarray(jpg_compression(image, 8, 4))
+
+    for executor in ["thread", "process"]:
+        result = jpg_compression(image, 8, 4, workers=3, executor=executor)
+        assert np.array_equal(np.asarray(result), expected)
+
+
+def test_jpg_compression_out():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    expected = np.asarray(jpg_compression(image, 8, 5))
+
+    # The same buffer is reused for several images
+    out = np.empty(expected.shape, dtype=np.uint8)
+    for backend in ["scipy", "matmul", "fused", "fft"]:
+        out[...] = 0
+        result = jpg_compression(image, 8, 5, backend=backend, out=out)
+        assert np.array_equal(out, expected)
+        assert np.array_equal(np.asarray(result), expected)
+
+    # The transforms run in place in the workspace, without a float copy
+    # of the pixels
+    for backend in ["scipy", "matmul", "fused"]:
+        stats = CompressionStats(memory=True)
+        try:
+            jpg_compression(image, 8, 5, backend=backend, out=out, stats=stats)
+        finally:
+            stats.stop()
+        for stage in ["forward_dct", "inverse_dct"]:
+            assert stats.stages[stage]["peak"] < out.size
+
+    with pytest.raises(ValueError):
+        jpg_compression(image, 8, 5, out=np.empty((8, 8), dtype=np.uint8))
+
+
+def test_jpg_compression_float32():
+    # Float32 rounding only moves pixels lying close to a rounding boundary
+    for path in ["test_images/deer.bmp", "test_images/gradient.bmp"]:
+        image = Image.open(path).convert("L")
+        for f, d in [(8, 6), (16, 10)]:
+            expected = np.asarray(jpg_compression(image, f, d)).astype(int)
+            for backend in ["scipy", "matmul", "fused", "fft"]:
+                result = jpg_compression(image, f, d, backend, dtype=np.float32)
+                assert np.abs(np.asarray(result) - expected).max() <= 1
+
+    # Also with the reused workspace and the parallel bands
+    out = np.empty(expected.shape, dtype=np.uint8)
+    jpg_compression(image, 16, 10, out=out, dtype=np.float32)
+    assert np.abs(out - expected).max() <= 1
+    result = jpg_compression(image, 16, 10, workers=2, dtype=np.float32)
+    assert np.abs(np.asarray(result) - expected).max() <= 1
+
+    assert compute_coefficients(image, 8, 6, dtype=np.float32).dtype == np.float32
@@ -0,0 +1,122 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from dct.image_compress import compute_coefficients, jpg_compression, reconstruct_image
+from dct.jpeg import (
+    ZIGZAG,
+    ZIGZAG_DIAGONAL,
+    _dc_events,
+    _eob_runs,
+    _huffman_table,
+    encode_jpeg,
+    _quantize,
+    progressive_prefix,
+)
+
+
+def test_zigzag_order():
+    assert list(ZIGZAG[:10]) == [0, 1, 8, 16, 9, 2, 3, 10, 17, 24]
+    assert sorted(ZIGZAG) == list(range(64))
+    # Each diagonal is a contiguous range of the zig-zag order
+    assert list(ZIGZAG_DIAGONAL[:10]) == [0, 1, 1, 2, 2, 2, 3, 3, 3, 3]
+    assert np.all(np.diff(ZIGZAG_DIAGONAL) >= 0)
+
+
+def test_eob_runs():
+    # Blocks: [EOB], [EOB], [5, EOB], [EOB], [7]
+    symbols = np.array([0, 0, 0x03, 0, 0, 0x03])
+    extra = np.array([0, 0, 5, 0, 0, 7])
+    extra_len = np.array([0, 0, 3, 0, 0, 3])
+    symbols, extra, extra_len = _eob_runs(symbols, extra, extra_len)
+
+    # Runs of 2 blocks (symbol 1 << 4, one extra bit 0) and 2 blocks
+    assert list(symbols) == [0x10, 0x03, 0x10, 0x03]
+    assert list(extra) == [0, 5, 0, 7]
+    assert list(extra_len) == [1, 3, 1, 3]
+
+
+def test_quantize_out_of_range():
+    # Alternating extreme DC values, beyond what pixels can give
+    coefficients = np.zeros((1, 4, 8, 8))
+    coefficients[0, :, 0, 0] = [-1e6, 1e6, -1e6, 1e6]
+    zz = _quantize(coefficients)
+    assert list(zz[:, 0]) == [-1024, 1023, -1024, 1023]
+
+    # Baseline JPEG has DC categories up to 11
+    assert _dc_events(zz[:, 0])[0].max() <= 11
+    decoded = np.asarray(Image.open(io.BytesIO(encode_jpeg(coefficients))))
+    assert decoded.shape == (8, 32)
+
+
+def test_huffman_table():
+    freqs = np.random.randint(0, 1000, 256)
+    freqs[:5] = [10**6, 1, 0, 0, 1]
+    bits, huffval, codes, lengths = _huffman_table(freqs)
+
+    assert sum(bits) == np.count_nonzero(freqs) == len(huffval)
+    assert lengths.max() <= 16
+    assert lengths[0] == lengths[lengths > 0].min()
+
+    # Prefix free and no code made only of ones
+    used = [(int(codes[v]), int(lengths[v])) for v in huffval]
+    for code, length in used:
+        assert code != (1 << length) - 1
+        for other, other_length in used:
+            if other_length > length:
+                assert other >> (other_length - length) != code
+
+
+def test_encode_jpeg_decodes_to_compressed_image():
+    image = Image.open("test_images/deer.bmp").convert("L")
+
+    for d in [0, 1, 4, 14]:
+        coefficients = compute_coefficients(image, 8, d)
+        decoded = Image.open(io.BytesIO(encode_jpeg(coefficients)))
+
+        assert decoded.format == "JPEG"
+        assert decoded.mode == "L"
+        # Only the rounding of the coefficients differs from the compressed image
+        expected = np.asarray(reconstruct_image(coefficients)).astype(int)
+        assert np.abs(np.asarray(decoded).astype(int) - expected).max() <= 2
+
+
+def test_encode_progressive_jpeg():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    coefficients = compute_coefficients(image, 8, 15)
+    data = encode_jpeg(coefficients, progressive=True)
+
+    decoded = Image.open(io.BytesIO(data))
+    assert decoded.info.get("progressive")
+    baseline = Image.open(io.BytesIO(encode_jpeg(coefficients)))
+    assert np.array_equal(np.asarray(decoded), np.asarray(baseline))
+
+    # Each prefix is the image compressed with a smaller d
+    sizes = []
+    for d in [1, 2, 4, 6, 10]:
+        prefix = progressive_prefix(data, d)
+        sizes.append(len(prefix))
+        expected = reconstruct_image(compute_coefficients(image, 8, d))
+        decoded = np.asarray(Image.open(io.BytesIO(prefix))).astype(int)
+        assert np.abs(decoded - np.asarray(expected)).max() <= 2
+    assert sizes == sorted(sizes) and sizes[-1] < len(data)
+
+    with pytest.raises(ValueError):
+        progressive_prefix(encode_jpeg(coefficients), 4)
+
+
+def test_compute_and_reconstruct_match_jpg_compression():
+    image = Image.open("test_images/gradient.bmp").convert("L")
+    coefficients = compute_coefficients(image, 8, 6)
+
+    assert np.array_equal(
+        np.asarray(reconstruct_image(coefficients)),
+        np.asarray(jpg_compression(image, 8, 6)),
+    )
+
+
+def test_encode_jpeg_needs_8x8_blocks():
+    image = Image.open("test_images/gradient.bmp").convert("L")
+
+    with pytest.raises(ValueError):
+        encode_jpeg(compute_coefficients(image, 10, 6))
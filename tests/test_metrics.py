@@ -0,0 +1,68 @@
+import numpy as np
+from PIL import Image
+from dct.image_compress import compute_coefficients, jpg_compression
+from dct.metrics import (
+    block_ssim,
+    compression_metrics,
+    estimate_block_ssim,
+    estimate_mse,
+    estimate_psnr,
+    mse,
+    psnr,
+)
+
+
+def _reference_ssim(x, y):
+    x, y = x.astype(float), y.astype(float)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    cov = ((x - x.mean()) * (y - y.mean())).mean()
+    return ((2 * x.mean() * y.mean() + c1) * (2 * cov + c2)) / (
+        (x.mean() ** 2 + y.mean() ** 2 + c1) * (x.var() + y.var() + c2)
+    )
+
+
+def test_mse_and_psnr():
+    original = np.random.randint(0, 256, (20, 30)).astype(np.uint8)
+    compressed = original[:16, :24].astype(int) + np.random.choice([-2, 2], (16, 24))
+
+    assert mse(original, compressed) == 4
+    assert np.isclose(psnr(original, compressed), 10 * np.log10(255**2 / 4))
+    assert psnr(original, original) == np.inf
+
+
+def test_block_ssim():
+    original = np.random.randint(0, 256, (16, 24)).astype(np.uint8)
+    compressed = np.clip(original + np.random.normal(0, 10, (16, 24)), 0, 255)
+    compressed = compressed.astype(np.uint8)
+
+    ssim_map = block_ssim(original, compressed, 8)
+    assert ssim_map.shape == (2, 3)
+    block = (slice(8, 16), slice(16, 24))
+    assert np.isclose(
+        ssim_map[1, 2], _reference_ssim(original[block], compressed[block])
+    )
+    assert np.allclose(block_ssim(original, original, 4), 1)
+
+
+def test_jpg_compression_metrics():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    coefficients = compute_coefficients(image, 8, 15)
+
+    for d in [1, 4, 9]:
+        compressed = jpg_compression(image, 8, d, metrics=True)
+        metrics = compressed.info["metrics"]
+        assert metrics == compression_metrics(image, compressed, 8)
+        assert np.isclose(metrics["mse"], mse(image, compressed))
+        assert np.isclose(metrics["ssim"], block_ssim(image, compressed).mean())
+
+        # The estimates in the DCT domain only miss the rounding of the pixels
+        assert abs(estimate_mse(coefficients, d) - metrics["mse"]) < 1
+        assert abs(estimate_psnr(coefficients, d) - metrics["psnr"]) < 0.2
+        estimate = estimate_block_ssim(coefficients, d)
+        assert abs(estimate.mean() - metrics["ssim"]) < 0.01
+
+    assert "metrics" not in jpg_compression(image, 8, 4).info
+
+    # No whole block, no pixels to compare
+    compressed = jpg_compression(Image.new("L", (5, 5)), 8, 4, metrics=True)
+    assert all(np.isnan(value) for value in compressed.info["metrics"].values())
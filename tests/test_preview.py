@@ -0,0 +1,26 @@
+import numpy as np
+from PIL import Image
+from dct.color import color_jpg_compression
+from dct.image_compress import compute_coefficients, jpg_compression
+from dct.preview import CompressionPreview
+
+
+def test_compression_preview_gray():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    preview = CompressionPreview(image, 8)
+
+    for d in [0, 5, 14, 3]:
+        expected = np.asarray(jpg_compression(image, 8, d))
+        assert np.array_equal(np.asarray(preview.compress(d)), expected)
+        assert np.allclose(preview.coefficients(d), compute_coefficients(image, 8, d))
+
+
+def test_compression_preview_color():
+    i, j = np.mgrid[0:50, 0:70]
+    pixels = np.stack([3 * i, 2 * j, 255 - i - j], axis=-1).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    preview = CompressionPreview(image, 4, subsampling="4:2:2")
+
+    for d in [1, 4, 2]:
+        expected = np.asarray(color_jpg_compression(image, 4, d, "4:2:2"))
+        assert np.array_equal(np.asarray(preview.compress(d)), expected)
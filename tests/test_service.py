@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import signal
+import struct
+from io import BytesIO
+import numpy as np
+from PIL import Image
+from dct.service import CompressionService
+
+
+async def _request(address, method, target, body=b""):
+    reader, writer = await asyncio.open_connection(*address)
+    head = f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+    writer.write(head.encode() + b"Connection: close\r\n\r\n" + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    payload = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    await writer.wait_closed()
+    return status, payload
+
+
+def _bmp(image):
+    buffer = BytesIO()
+    image.save(buffer, "BMP")
+    return buffer.getvalue()
+
+
+def test_service():
+    async def run():
+        service = CompressionService(workers=1, max_queue=0)
+        address = await service.start()
+        try:
+            with open("test_images/prova.bmp", "rb") as file:
+                data = file.read()
+            status, jpeg = await _request(address, "POST", "/compress?d=6", data)
+            assert status == 200
+            with Image.open(BytesIO(jpeg)) as image:
+                assert image.format == "JPEG"
+
+            # Invalid requests
+            status, _ = await _request(address, "POST", "/compress?d=20", data)
+            assert status == 400
+            status, _ = await _request(address, "POST", "/compress?d=6", b"junk")
+            assert status == 400
+            status, _ = await _request(address, "GET", "/compress?d=6")
+            assert status == 405
+            status, _ = await _request(address, "GET", "/nothing")
+            assert status == 404
+
+            # Header of a 20000x20000 BMP file, beyond the pixel limit of PIL
+            header = struct.pack("<IiiHHIIiiII", 40, 20000, 20000, 1, 8, *[0] * 6)
+            bomb = b"BM" + struct.pack("<IHHI", 54, 0, 0, 54) + header
+            status, _ = await _request(address, "POST", "/compress?d=6", bomb)
+            assert status == 413
+
+            # With no queue, a request arriving while the worker is busy is
+            # rejected at once
+            noise = np.random.default_rng(0).integers(0, 256, (3000, 3000))
+            big = _bmp(Image.fromarray(noise.astype(np.uint8)))
+            busy = asyncio.create_task(_request(address, "POST", "/compress?d=15", big))
+            while service.counters.in_flight == 0:
+                await asyncio.sleep(0.001)
+            status, _ = await _request(address, "POST", "/compress?d=6", data)
+            assert status == 503
+            status, _ = await busy
+            assert status == 200
+
+            status, payload = await _request(address, "GET", "/stats")
+            counters = json.loads(payload)
+            assert status == 200
+            assert counters["completed"] == 2 and counters["rejected"] == 1
+            assert counters["failed"] == 5 and counters["in_flight"] == 0
+            assert counters["latency_p99"] >= counters["latency_p50"] > 0
+        finally:
+            await service.close()
+
+    asyncio.run(run())
+
+
+def test_service_replaces_dead_workers():
+    async def run():
+        service = CompressionService(workers=1)
+        address = await service.start()
+        try:
+            with open("test_images/prova.bmp", "rb") as file:
+                data = file.read()
+
+            # A worker killed between two requests breaks the pool
+            pool = service._pool
+            os.kill(next(iter(pool._processes)), signal.SIGKILL)
+            while not pool._broken:
+                await asyncio.sleep(0.01)
+
+            for _ in range(2):
+                status, _ = await _request(address, "POST", "/compress?d=6", data)
+                assert status == 200
+            assert service.counters.pool_restarts == 1
+        finally:
+            await service.close()
+
+    asyncio.run(run())
+
+
+def test_service_limits_connections():
+    async def run():
+        service = CompressionService(workers=1, max_connections=1)
+        address = await service.start()
+        try:
+            reader, writer = await asyncio.open_connection(*address)
+            await asyncio.sleep(0.05)
+
+            # A second connection is rejected at once, the first one is served
+            other_reader, other_writer = await asyncio.open_connection(*address)
+            assert b" 503 " in await other_reader.readline()
+            other_writer.close()
+
+            writer.write(b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+            assert b" 200 " in await reader.readline()
+            writer.close()
+            assert service.counters.rejected == 1
+        finally:
+            await service.close()
+
+    asyncio.run(run())
@@ -0,0 +1,82 @@
+import json
+import tracemalloc
+import pytest
+import numpy as np
+from PIL import Image
+from dct.__main__ import main
+from dct.color import color_jpg_compression
+from dct.image_compress import jpg_compression
+from dct.preview import CompressionPreview
+from dct.stats import CompressionStats
+
+
+def test_jpg_compression_stats():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    expected = jpg_compression(image, 8, 6)
+
+    stats = CompressionStats()
+    compressed = jpg_compression(image, 8, 6, stats=stats, progress=lambda *_: None)
+    assert np.array_equal(np.asarray(compressed), np.asarray(expected))
+
+    stages = ["asarray", "forward_dct", "cut", "inverse_dct", "round_clip"]
+    assert list(stats.stages) == stages + ["fromarray"]
+    # One call for each band of rows of blocks
+    assert stats.stages["forward_dct"]["calls"] > 1
+    assert stats.stages["fromarray"]["calls"] == 1
+    assert all(s["time"] >= 0 and s["peak"] == 0 for s in stats.stages.values())
+    assert stats.total_time() > 0
+    assert "forward_dct" in str(stats)
+
+    # The threads of a parallel compression share the collector
+    threads = CompressionStats()
+    jpg_compression(image, 8, 6, workers=2, stats=threads)
+    assert threads.stages["forward_dct"]["calls"] > 1
+
+
+def test_stats_memory():
+    image = Image.open("test_images/deer.bmp").convert("RGB")
+    with CompressionStats(memory=True) as stats:
+        color_jpg_compression(image, 8, 6, stats=stats)
+        CompressionPreview(image.convert("L"), 8, stats=stats).compress(6, stats=stats)
+    assert not tracemalloc.is_tracing()
+
+    # The forward DCT of the Y plane allocates at least its float coefficients
+    width, height = image.size
+    assert stats.stages["to_ycbcr"]["peak"] > 0
+    assert stats.stages["subdivide"]["peak"] >= (width // 8) * (height // 8) * 8 * 8 * 8
+    assert {"to_rgb", "fromarray", "inverse_dct"} <= set(stats.stages)
+    assert "MB" in str(stats)
+
+
+def test_stats_memory_cancelled():
+    image = Image.open("test_images/deer.bmp").convert("L")
+
+    def cancel(done, total):
+        raise KeyboardInterrupt
+
+    # The tracing stops with the stages, even without stop
+    stats = CompressionStats(memory=True)
+    with pytest.raises(KeyboardInterrupt):
+        jpg_compression(image, 8, 6, progress=cancel, stats=stats)
+    with pytest.raises(KeyboardInterrupt):
+        CompressionPreview(image, 8, progress=cancel, stats=stats)
+    assert stats.stages["forward_dct"]["peak"] > 0
+    assert not tracemalloc.is_tracing()
+
+    # A tracing started by someone else is left alone
+    tracemalloc.start()
+    try:
+        jpg_compression(image, 8, 6, stats=CompressionStats(memory=True))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_cli_stats(tmp_path, capsys):
+    src = tmp_path / "gray.bmp"
+    Image.open("test_images/deer.bmp").convert("L").save(src)
+
+    assert main([str(src), "-o", str(tmp_path / "out"), "-d", "6", "--stats"]) == 0
+    record = json.loads(capsys.readouterr().out.splitlines()[0])
+    assert {"forward_dct", "encode_jpeg", "write"} <= set(record["stages"])
+    assert record["stages"]["write"]["calls"] == 1
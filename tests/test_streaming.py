@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import struct
+import tracemalloc
+from PIL import Image
+from dct.image_compress import jpg_compression
+from dct.streaming import compress_bmp_file
+
+
+def test_compress_bmp_file_matches_jpg_compression(tmp_path):
+    # 8 bits gray scale and 24 bits color images
+    for path in ["test_images/gradient.bmp", "test_images/deer.bmp"]:
+        out_path = tmp_path / "compressed.bmp"
+        compress_bmp_file(path, out_path, 8, 5)
+
+        expected = jpg_compression(Image.open(path).convert("L"), 8, 5)
+        assert np.array_equal(np.asarray(Image.open(out_path)), np.asarray(expected))
+
+
+def test_compress_bmp_file_bounded_memory(tmp_path):
+    width, height = 200, 8000
+    pixels = np.random.randint(0, 256, (height, width), dtype=np.uint8)
+    Image.fromarray(pixels).save(tmp_path / "tall.bmp")
+
+    tracemalloc.start()
+    compress_bmp_file(tmp_path / "tall.bmp", tmp_path / "compressed.bmp", 8, 5)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Far less than the image itself, which is width * height bytes
+    assert peak < width * height / 10
+
+
+def _bitfields_bmp(path, rgb, masks):
+    """
+    Writes a 32 bits BMP file with bit fields, top-down, the masks following
+    the BITMAPINFOHEADER.
+    """
+    height, width, _ = rgb.shape
+    pixels = np.zeros((height, width), dtype="<u4")
+    for channel, mask in zip(np.moveaxis(rgb.astype("<u4"), -1, 0), masks):
+        shift = (mask & -mask).bit_length() - 1
+        pixels |= channel << shift
+    offset = 14 + 40 + 12
+    with open(path, "wb") as file:
+        file.write(struct.pack("<2sIHHI", b"BM", offset + pixels.nbytes, 0, 0, offset))
+        file.write(
+            struct.pack("<IiiHHIIiiII", 40, width, -height, 1, 32, 3, 0, 0, 0, 0, 0)
+        )
+        file.write(struct.pack("<III", *masks) + pixels.tobytes())
+
+
+def test_compress_bmp_file_bit_fields(tmp_path):
+    rgb = np.asarray(Image.open("test_images/deer.bmp").convert("RGB"))
+    expected = jpg_compression(Image.fromarray(rgb).convert("L"), 8, 5)
+
+    # RGBA and ABGR byte orders
+    for masks in [(0xFF, 0xFF00, 0xFF0000), (0xFF000000, 0xFF0000, 0xFF00)]:
+        _bitfields_bmp(tmp_path / "bitfields.bmp", rgb, masks)
+        compress_bmp_file(tmp_path / "bitfields.bmp", tmp_path / "out.bmp", 8, 5)
+        result = np.asarray(Image.open(tmp_path / "out.bmp"))
+        assert np.array_equal(result, np.asarray(expected))
+
+    # Channels which are not whole bytes
+    _bitfields_bmp(tmp_path / "bitfields.bmp", rgb >> 3, (0x7C00, 0x3E0, 0x1F))
+    with pytest.raises(ValueError):
+        compress_bmp_file(tmp_path / "bitfields.bmp", tmp_path / "out.bmp", 8, 5)
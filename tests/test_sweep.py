@@ -0,0 +1,28 @@
+import numpy as np
+from PIL import Image
+from dct.image_compress import compute_coefficients, jpg_compression
+from dct.jpeg import encode_jpeg
+from dct.sweep import rd_sweep
+
+
+def test_rd_sweep():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    curve = rd_sweep(image, 8, reconstruct=[3, 10])
+    pixels = np.asarray(image)[:656, :1008].astype(float)
+
+    assert np.array_equal(curve["d"], np.arange(15))
+    assert np.all(np.diff(curve["mse"]) <= 0) and np.all(np.diff(curve["zeros"]) <= 0)
+
+    for d in [0, 3, 6, 10]:
+        compressed = np.asarray(jpg_compression(image, 8, d))
+        mse = ((compressed - pixels) ** 2).mean()
+        assert abs(curve["mse"][d] - mse) < 0.05 * mse + 0.1
+
+        size = len(encode_jpeg(compute_coefficients(image, 8, d)))
+        assert 0.5 * size < curve["size"][d] < 2 * size
+
+    # Only the requested images are built
+    assert sorted(curve["images"]) == [3, 10]
+    for d, compressed in curve["images"].items():
+        expected = np.asarray(jpg_compression(image, 8, d))
+        assert np.array_equal(np.asarray(compressed), expected)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from PIL import Image
+from dct.image_compress import compute_coefficients, reconstruct_image
+from dct.preview import CompressionPreview
+from dct.thumbnail import thumbnail_blocks, thumbnail_from_coefficients, thumbnail_scale
+
+
+def test_thumbnail_scale():
+    assert thumbnail_scale(8, 4000, 500) == 1
+    assert thumbnail_scale(8, 1000, 500) == 4
+    assert thumbnail_scale(8, 800, 500) == 5
+    # Never more than the whole block
+    assert thumbnail_scale(8, 200, 500) == 8
+
+
+def test_thumbnail_from_coefficients():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    coefficients = compute_coefficients(image, 8, 15)
+    n_rows, n_cols = coefficients.shape[:2]
+
+    # One pixel per block, the average of the block
+    thumbnail = thumbnail_from_coefficients(coefficients)
+    assert thumbnail.size == (n_cols, n_rows)
+    pixels = np.asarray(image)[: n_rows * 8, : n_cols * 8].astype(float)
+    means = pixels.reshape(n_rows, 8, n_cols, 8).mean(axis=(1, 3))
+    assert np.abs(np.asarray(thumbnail) - means).max() <= 0.5
+
+    # The whole block is the full inverse DCT
+    thumbnail = thumbnail_from_coefficients(coefficients, 8, d=5)
+    expected = reconstruct_image(compute_coefficients(image, 8, 5))
+    assert np.array_equal(np.asarray(thumbnail), np.asarray(expected))
+
+    # In between, close to the downscaled compressed image
+    thumbnail = thumbnail_from_coefficients(coefficients, 4)
+    assert thumbnail.size == (n_cols * 4, n_rows * 4)
+    downscaled = pixels.reshape(n_rows * 4, 2, n_cols * 4, 2).mean(axis=(1, 3))
+    assert np.abs(np.asarray(thumbnail) - downscaled).mean() < 5
+
+    with pytest.raises(ValueError):
+        thumbnail_blocks(coefficients, 9)
+
+
+def test_preview_thumbnail():
+    image = Image.open("test_images/deer.bmp")
+    for image in [image.convert("L"), image.convert("RGB")]:
+        preview = CompressionPreview(image, 8)
+        full = preview.compress(6)
+        assert np.array_equal(np.asarray(preview.thumbnail(6, 8)), np.asarray(full))
+
+        thumbnail = preview.thumbnail(6, 2)
+        assert thumbnail.size == (full.size[0] // 4, full.size[1] // 4)
+        assert thumbnail.mode == full.mode
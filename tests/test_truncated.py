@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from PIL import Image
+from dct.dct2D import dct_2D, idct_2D
+from dct.image_compress import _diagonal_mask, jpg_compression
+from dct.truncated import triangle_indices, truncated_dct_2D, truncated_idct_2D
+
+
+def test_triangle_indices():
+    rows, cols = triangle_indices(8, 3)
+    assert list(zip(rows, cols)) == [(0, 0), (0, 1), (1, 0), (0, 2), (1, 1), (2, 0)]
+
+    for f, d in [(8, 1), (8, 6), (8, 8), (16, 5)]:
+        assert len(triangle_indices(f, d)[0]) == d * (d + 1) // 2
+
+    # Past the main diagonal, all the coefficients of the upper left triangle
+    rows, cols = triangle_indices(4, 6)
+    assert len(rows) == 16 - 1
+    assert np.all(rows + cols < 6)
+
+
+@pytest.mark.parametrize("f, d", [(8, 1), (8, 4), (8, 8), (8, 12), (16, 5)])
+def test_truncated_matches_dct_2D(f, d):
+    blocks = np.random.rand(3, 4, f, f) * 255
+    coeff = dct_2D(blocks)
+
+    packed = truncated_dct_2D(blocks, d)
+    rows, cols = triangle_indices(f, d)
+    assert packed.shape == (3, 4, len(rows))
+    assert np.allclose(packed, coeff[..., rows, cols])
+
+    # The inverse of the cut coefficients
+    coeff[..., _diagonal_mask(f, d)] = 0
+    assert np.allclose(truncated_idct_2D(packed, f, d), idct_2D(coeff))
+
+    out = np.zeros((3, 4, f, f))
+    assert truncated_idct_2D(packed, f, d, out=out) is out
+    assert np.allclose(out, idct_2D(coeff))
+
+
+def test_truncated_errors():
+    with pytest.raises(ValueError):
+        truncated_dct_2D(np.zeros((8, 4)), 2)
+    with pytest.raises(ValueError):
+        truncated_idct_2D(np.zeros((2, 5)), 8, 2)
+    # A negative d would slice the basis from its end
+    with pytest.raises(ValueError):
+        truncated_dct_2D(np.zeros((8, 8)), -1)
+    with pytest.raises(ValueError):
+        truncated_idct_2D(np.zeros((2, 0)), 8, -1)
+
+
+def test_jpg_compression_truncated():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    for f, d in [(8, 3), (16, 10)]:
+        expected = np.asarray(jpg_compression(image, f, d)).astype(int)
+        result = jpg_compression(image, f, d, truncated=True)
+        assert np.abs(np.asarray(result) - expected).max() <= 1
+
+        result = jpg_compression(image, f, d, workers=3, truncated=True)
+        assert np.abs(np.asarray(result) - expected).max() <= 1
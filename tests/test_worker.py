@@ -0,0 +1,59 @@
+import threading
+import time
+from PIL import Image
+from dct.image_compress import jpg_compression
+from dct.worker import CompressionJob, CompressionWorker
+
+
+def _wait(job, timeout=10):
+    end = time.perf_counter() + timeout
+    while not job.done and time.perf_counter() < end:
+        time.sleep(0.01)
+    return job.done
+
+
+def test_worker_runs_latest_job():
+    image = Image.open("test_images/deer.bmp").convert("L")
+    worker = CompressionWorker()
+
+    # Blocks the worker until the next jobs are submitted
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(job):
+        started.set()
+        release.wait()
+        job.report(0.5)
+
+    first = worker.submit(CompressionJob(blocking))
+    started.wait()
+    dropped = worker.submit(CompressionJob(lambda job: 1))
+    last = worker.submit(
+        CompressionJob(
+            lambda job: jpg_compression(image, 8, 5, progress=job.stage(0, 1))
+        )
+    )
+    release.set()
+
+    # The running job stops at its next progress report, the waiting one never runs
+    assert _wait(last) and _wait(first)
+    assert first.cancelled and first.result is None and first.error is None
+    assert dropped.cancelled and not dropped.done
+    assert last.progress == 1.0 and last.result.size == (1008, 656)
+
+
+def test_worker_errors_and_cancel():
+    worker = CompressionWorker()
+
+    failing = worker.submit(CompressionJob(lambda job: 1 / 0))
+    assert _wait(failing) and isinstance(failing.error, ZeroDivisionError)
+
+    def endless(job):
+        while True:
+            job.report(0.5)
+            time.sleep(0.001)
+
+    job = worker.submit(CompressionJob(endless))
+    while job.progress == 0:
+        time.sleep(0.001)
+    worker.cancel()
+    assert _wait(job) and job.cancelled